@@ -2,14 +2,25 @@
 
 from __future__ import annotations
 
-from typing import Optional
-from difflib import SequenceMatcher
+import threading
+from collections import namedtuple
+from typing import Any, Optional
 
+import numpy as np
 import pandas as pd
 
 from app.config import ENV
 from app.domain.beneficios_planos.models import Colaborador, Dependente, PlanoOdonto
+from app.domain.beneficios_planos import schemas as _schemas  # noqa: F401 - registers them
+from app.domain.beneficios_planos.search import NameSearchIndex
 from app.infra.gateways.rm_query import RMQueryGateway
+from app.profiling import profile_section
+
+
+def _to_text(value: object) -> str:
+    if value is None or value is pd.NA:
+        return ""
+    return str(value)
 
 
 def _normalize_plano(value: object) -> Optional[str]:
@@ -29,12 +40,124 @@ def _normalize_flag(value: object) -> Optional[str]:
 
 
 def _normalize_date(value: object) -> Optional[str]:
-    if value is None:
+    if value is None or value is pd.NaT:
         return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d")
     texto = str(value).strip()
     return texto if texto else None
 
 
+def _dependente_from_row(row: Any) -> Dependente:
+    return Dependente(
+        cod_coligada=row.cod_coligada,
+        chapa=row.chapa,
+        numero=_to_text(row.nro_depend),
+        nome=_to_text(row.dependente),
+        grau_parentesco=_to_text(row.grau_parentesco),
+        plano_odonto=_normalize_plano(row.plano_odonto),
+        flag_plano_saude=_normalize_flag(row.flag_plano_saude),
+        data_inicio_plano_saude=_normalize_date(row.data_inicio_plano_saude),
+    )
+
+
+_DependenteRow = namedtuple(
+    "_DependenteRow",
+    [
+        "cod_coligada",
+        "chapa",
+        "nro_depend",
+        "dependente",
+        "grau_parentesco",
+        "plano_odonto",
+        "flag_plano_saude",
+        "data_inicio_plano_saude",
+    ],
+)
+
+
+class _DependentesIndex:
+    """Rows of the dependents dataset grouped by (cod_coligada, chapa).
+
+    The frame is stably sorted by the key, so each collaborator owns one
+    contiguous row range and keeps the dataset order of its dependents.
+    ``Dependente`` lists are built on first request and memoised.
+    """
+
+    KEY = ["cod_coligada", "chapa"]
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.ranges: dict[tuple[Any, Any], tuple[int, int]] = {}
+        self.colaboradores: list[Colaborador] = []
+        self._dependentes: dict[tuple[Any, Any], list[Dependente]] = {}
+        self._columns: dict[str, list[Any]] = {}
+        if df.empty:
+            return
+
+        frame = df.dropna(subset=self.KEY).sort_values(
+            self.KEY,
+            kind="stable",
+            ignore_index=True,
+        )
+        if frame.empty:
+            return
+
+        # Plain lists, so building a collaborator's dependents only touches
+        # its own rows instead of paying pandas' per-call overhead.
+        # Columns missing from the sentence read as None, as getattr did.
+        self._columns = {
+            column: (
+                frame[column].tolist()
+                if column in frame.columns
+                else [None] * len(frame)
+            )
+            for column in _DependenteRow._fields
+        }
+
+        cod_coligada = frame["cod_coligada"].to_numpy()
+        chapa = frame["chapa"].to_numpy()
+        boundary = np.ones(len(frame), dtype=bool)
+        boundary[1:] = (cod_coligada[1:] != cod_coligada[:-1]) | (
+            chapa[1:] != chapa[:-1]
+        )
+        starts = np.flatnonzero(boundary)
+        ends = np.append(starts[1:], len(frame))
+        self.ranges = {
+            (cod_coligada[start], chapa[start]): (start, end)
+            for start, end in zip(starts.tolist(), ends.tolist())
+        }
+
+        # Same rows and order as groupby(["cod_coligada", "chapa", "colaborador"]).
+        unicos = (
+            frame[[*self.KEY, "colaborador"]]
+            .dropna()
+            .drop_duplicates()
+            .sort_values([*self.KEY, "colaborador"], kind="stable")
+        )
+        self.colaboradores = [
+            Colaborador(row.cod_coligada, row.chapa, row.colaborador)
+            for row in unicos.itertuples(index=False)
+        ]
+
+    def dependentes(self, cod_coligada: str, chapa: str) -> list[Dependente]:
+        key = (cod_coligada, chapa)
+        dependentes = self._dependentes.get(key)
+        if dependentes is None:
+            bounds = self.ranges.get(key)
+            if bounds is None:
+                return []
+            start, end = bounds
+            columns = [
+                self._columns[field][start:end] for field in _DependenteRow._fields
+            ]
+            dependentes = [
+                _dependente_from_row(_DependenteRow(*values))
+                for values in zip(*columns)
+            ]
+            self._dependentes[key] = dependentes
+        return dependentes
+
+
 class DependentesRepository:
     """Provides access to collaborator and dependent data."""
 
@@ -49,96 +172,79 @@ class DependentesRepository:
             "INFO.DEPENDENTES",
         )
         self._cache_df: Optional[pd.DataFrame] = None
+        self._cache_lock = threading.Lock()
+        self._index: Optional[_DependentesIndex] = None
+        self._search_index: Optional[NameSearchIndex[Colaborador]] = None
+
+    def carregar_cache(self) -> None:
+        """Load the dataset ahead of time; safe to call from worker threads."""
+        self._ensure_cache()
 
     def _ensure_cache(self) -> pd.DataFrame:
-        if self._cache_df is None:
-            df = self.gateway.fetch_dataframe(self.query_name)
-            self._cache_df = df.rename(
-                columns={
-                    "CODCOLIGADA": "cod_coligada",
-                    "CHAPA": "chapa",
-                    "NOME": "colaborador",
-                    "NRODEPEND": "nro_depend",
-                    "DEPENDENTE": "dependente",
-                    "GRAUPARENTESCO": "grau_parentesco",
-                    "PLANO_ODONTO": "plano_odonto",
-                    "FLAG_PLANO_SAUDE": "flag_plano_saude",
-                    "DATA_INICIO_PLANO_SAUDE": "data_inicio_plano_saude",
-                    "DTINIASSISTMEDICA": "data_inicio_plano_saude",
-                }
-            )
+        cache_df = self._cache_df
+        if cache_df is not None:
+            return cache_df
+
+        with self._cache_lock:
+            if self._cache_df is not None:
+                return self._cache_df
+            with profile_section("DependentesRepository.carregar"):
+                self._cache_df = self.gateway.fetch_dataframe(self.query_name)
         return self._cache_df
 
-    def listar_colaboradores(self) -> list[Colaborador]:
+    def _ensure_index(self) -> _DependentesIndex:
+        index = self._index
+        if index is not None:
+            return index
+
         df = self._ensure_cache()
-        if df.empty:
-            return []
-        grouped = (
-            df.groupby(["cod_coligada", "chapa", "colaborador"]).size().reset_index()
-        )
-        return [
-            Colaborador(row.cod_coligada, row.chapa, row.colaborador)
-            for row in grouped.itertuples(index=False)
-        ]
+        with self._cache_lock:
+            if self._index is None:
+                self._index = _DependentesIndex(df)
+            return self._index
+
+    def listar_colaboradores(self) -> list[Colaborador]:
+        return list(self._ensure_index().colaboradores)
 
     def dependentes_do_colaborador(
         self,
         cod_coligada: str,
         chapa: str,
     ) -> list[Dependente]:
-        df = self._ensure_cache()
-        filtrado = df[(df.cod_coligada == cod_coligada) & (df.chapa == chapa)]
-        dependentes: list[Dependente] = []
-        for row in filtrado.itertuples(index=False):
-            plano_odonto = _normalize_plano(getattr(row, "plano_odonto", None))
-            flag_plano_saude = _normalize_flag(getattr(row, "flag_plano_saude", None))
-            data_inicio_plano_saude = _normalize_date(
-                getattr(row, "data_inicio_plano_saude", None)
-            )
-            dependentes.append(
-                Dependente(
-                    cod_coligada=row.cod_coligada,
-                    chapa=row.chapa,
-                    numero=row.nro_depend,
-                    nome=row.dependente,
-                    grau_parentesco=row.grau_parentesco,
-                    plano_odonto=plano_odonto,
-                    flag_plano_saude=flag_plano_saude,
-                    data_inicio_plano_saude=data_inicio_plano_saude,
-                )
-            )
-        return dependentes
+        return list(self._ensure_index().dependentes(cod_coligada, chapa))
 
     def buscar_por_nome(self, termo: str, limite: int = 25) -> list[Colaborador]:
-        termo_normalizado = termo.strip().lower()
-        if not termo_normalizado:
+        """Search collaborators by name, ignoring case and accents.
+
+        Names containing ``termo`` come first (in dataset order), followed by
+        similar names scoring at least 0.35; at most ``limite`` results.
+        """
+        if not termo.strip():
             return self.listar_colaboradores()
+        return self._ensure_search_index().search(termo, limite)
 
-        df = self._ensure_cache()
-        colaboradores_unicos = (
-            df[["cod_coligada", "chapa", "colaborador"]]
-            .drop_duplicates()
-            .itertuples(index=False)
-        )
+    def _ensure_search_index(self) -> NameSearchIndex[Colaborador]:
+        index = self._search_index
+        if index is not None:
+            return index
 
-        scored: list[tuple[float, Colaborador]] = []
-        for row in colaboradores_unicos:
-            nome_lower = row.colaborador.lower()
-            if termo_normalizado in nome_lower:
-                score = 1.0
-            else:
-                score = SequenceMatcher(None, termo_normalizado, nome_lower).ratio()
-            if score < 0.35:
-                continue
-            scored.append(
-                (
-                    score,
-                    Colaborador(row.cod_coligada, row.chapa, row.colaborador),
+        df = self._ensure_cache()
+        with self._cache_lock:
+            if self._search_index is None:
+                colaboradores: list[Colaborador] = []
+                if not df.empty:
+                    unicos = df[
+                        ["cod_coligada", "chapa", "colaborador"]
+                    ].drop_duplicates()
+                    colaboradores = [
+                        Colaborador(row.cod_coligada, row.chapa, row.colaborador)
+                        for row in unicos.itertuples(index=False)
+                    ]
+                self._search_index = NameSearchIndex(
+                    colaboradores,
+                    [_to_text(colaborador.nome) for colaborador in colaboradores],
                 )
-            )
-
-        scored.sort(key=lambda item: item[0], reverse=True)
-        return [colaborador for _, colaborador in scored[:limite]]
+            return self._search_index
 
 
 class PlanosRepository:
@@ -155,21 +261,29 @@ class PlanosRepository:
             "INFO.PLODONTO",
         )
         self._planos: Optional[list[PlanoOdonto]] = None
+        self._planos_lock = threading.Lock()
+
+    def carregar_cache(self) -> None:
+        """Load the plans ahead of time; safe to call from worker threads."""
+        self._ensure_planos()
+
+    def _ensure_planos(self) -> list[PlanoOdonto]:
+        planos = self._planos
+        if planos is not None:
+            return planos
+
+        with self._planos_lock:
+            if self._planos is None:
+                with profile_section("PlanosRepository.carregar"):
+                    df = self.gateway.fetch_dataframe(self.query_name)
+                    self._planos = [
+                        PlanoOdonto(row.cod_coligada, row.codigo, row.descricao)
+                        for row in df.itertuples(index=False)
+                    ]
+            return self._planos
 
     def listar_planos(self, cod_coligada: Optional[str] = None) -> list[PlanoOdonto]:
-        if self._planos is None:
-            df = self.gateway.fetch_dataframe(self.query_name)
-            df = df.rename(
-                columns={
-                    "CODCOLIGADA": "cod_coligada",
-                    "CODIGO": "codigo",
-                    "DESCRICAO": "descricao",
-                }
-            ).fillna("")
-            self._planos = [
-                PlanoOdonto(row.cod_coligada, row.codigo, row.descricao)
-                for row in df.itertuples(index=False)
-            ]
+        planos = self._ensure_planos()
         if cod_coligada is None:
-            return list(self._planos)
-        return [plano for plano in self._planos if plano.cod_coligada == cod_coligada]
+            return list(planos)
+        return [plano for plano in planos if plano.cod_coligada == cod_coligada]
@@ -0,0 +1,76 @@
+"""Column schemas of the RM queries used by the odontological module."""
+
+from __future__ import annotations
+
+from typing import Mapping
+
+from app.config import ENV
+from app.infra.soap.schema import (
+    CATEGORY,
+    DATE,
+    INTEGER,
+    SCHEMA_REGISTRY,
+    TEXT,
+    QuerySchema,
+    SchemaRegistry,
+)
+
+DEPENDENTES_SCHEMA = QuerySchema(
+    rename={
+        "CODCOLIGADA": "cod_coligada",
+        "CHAPA": "chapa",
+        "NOME": "colaborador",
+        "NRODEPEND": "nro_depend",
+        "DEPENDENTE": "dependente",
+        "GRAUPARENTESCO": "grau_parentesco",
+        "PLANO_ODONTO": "plano_odonto",
+        "FLAG_PLANO_SAUDE": "flag_plano_saude",
+        "DATA_INICIO_PLANO_SAUDE": "data_inicio_plano_saude",
+        "DTINIASSISTMEDICA": "data_inicio_plano_saude",
+    },
+    dtypes={
+        "cod_coligada": CATEGORY,
+        "chapa": CATEGORY,
+        "colaborador": CATEGORY,
+        "nro_depend": INTEGER,
+        "dependente": TEXT,
+        "grau_parentesco": CATEGORY,
+        "plano_odonto": CATEGORY,
+        "flag_plano_saude": CATEGORY,
+        "data_inicio_plano_saude": DATE,
+    },
+    date_format="ISO8601",
+)
+
+PLANOS_SCHEMA = QuerySchema(
+    rename={
+        "CODCOLIGADA": "cod_coligada",
+        "CODIGO": "codigo",
+        "DESCRICAO": "descricao",
+    },
+    dtypes={
+        "cod_coligada": CATEGORY,
+    },
+)
+
+
+def register_schemas(
+    registry: SchemaRegistry = SCHEMA_REGISTRY,
+    env: Mapping[str, str] = ENV,
+) -> None:
+    """Register the schemas under the query names configured in ``.env``.
+
+    Called once at import; repositories built with another ``query_name`` or
+    a private registry must register their schema themselves.
+    """
+    registry.register(
+        env.get("ODONTO_DEPENDENTES_QUERY", "INFO.DEPENDENTES"),
+        DEPENDENTES_SCHEMA,
+    )
+    registry.register(
+        env.get("ODONTO_PLANOS_QUERY", "INFO.PLODONTO"),
+        PLANOS_SCHEMA,
+    )
+
+
+register_schemas()
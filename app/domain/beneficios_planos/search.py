@@ -0,0 +1,249 @@
+"""In-memory name search used by the collaborator combobox."""
+
+from __future__ import annotations
+
+import heapq
+import re
+import unicodedata
+from bisect import bisect_right
+from difflib import SequenceMatcher
+from typing import Generic, Sequence, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+MIN_SCORE = 0.35
+# Names with the best trigram overlap are scored first, so the score a name
+# must beat rises quickly and the character-count bound prunes the rest.
+FUZZY_SEED_CANDIDATES = 100
+# Characters with their own count column; rarer ones share the last column,
+# which keeps the bound valid, only looser.
+MAX_ALPHABET = 40
+
+COMBINING_MARKS_PATTERN = re.compile("[\u0300-\u036f]")
+SEPARATOR = "\n"
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents: ``"João"`` -> ``"joao"``."""
+    return COMBINING_MARKS_PATTERN.sub("", unicodedata.normalize("NFKD", text.casefold()))
+
+
+def _trigram_keys(codes: np.ndarray) -> np.ndarray:
+    # Each code point fits in 21 bits, so a trigram packs into one int64.
+    return (codes[:-2] << 42) | (codes[1:-1] << 21) | codes[2:]
+
+
+def _code_points(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+
+
+class NameSearchIndex(Generic[T]):
+    """Accent-insensitive search over a fixed list of names.
+
+    Ranking follows the original linear scan: names containing the term score
+    1.0, the others are scored with ``SequenceMatcher`` and dropped below
+    ``MIN_SCORE``; ties keep the order of ``items``. Substring matches are
+    found with ``str.find`` over all names joined in one string.
+
+    Fuzzy results are the same as scoring every name. Per-name character
+    counts give, for all names at once, the upper bound of ``ratio()`` that
+    ``SequenceMatcher.quick_ratio`` computes. The names with the highest
+    trigram overlap are scored first; after them only names whose bound can
+    still reach the current ``limit``-th score are scored, best bound first.
+    """
+
+    def __init__(self, items: Sequence[T], names: Sequence[str]) -> None:
+        if len(items) != len(names):
+            raise ValueError("items e names devem ter o mesmo tamanho.")
+        self.items = list(items)
+        self.names = [fold(name).replace(SEPARATOR, " ") for name in names]
+
+        # Names padded with one space on each side, so word starts and ends
+        # form their own trigrams, and joined by SEPARATOR.
+        self._text = SEPARATOR.join(f" {name} " for name in self.names)
+        lengths = np.fromiter(
+            (len(name) + 3 for name in self.names),
+            dtype=np.int64,
+            count=len(self.names),
+        )
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        self._starts = starts.tolist()
+        self._name_lengths = lengths - 3
+
+        codes = _code_points(self._text)
+        owners = np.repeat(np.arange(len(self.names), dtype=np.int32), lengths)[: len(codes)]
+        self._build_char_counts(codes, owners)
+        self._build_postings(codes, owners)
+
+    def _build_char_counts(self, codes: np.ndarray, owners: np.ndarray) -> None:
+        in_name = codes != ord(SEPARATOR)
+        codes, owners = codes[in_name], owners[in_name]
+        alphabet, columns, frequency = np.unique(
+            codes,
+            return_inverse=True,
+            return_counts=True,
+        )
+        if len(alphabet) > MAX_ALPHABET:
+            ranked = np.argsort(-frequency, kind="stable")
+            remap = np.full(len(alphabet), MAX_ALPHABET - 1, dtype=np.int64)
+            remap[ranked[: MAX_ALPHABET - 1]] = np.arange(MAX_ALPHABET - 1)
+            columns = remap[columns]
+            width = MAX_ALPHABET
+        else:
+            remap = np.arange(len(alphabet))
+            width = len(alphabet)
+        self._char_columns = dict(zip(alphabet.tolist(), remap.tolist()))
+        self._shared_column = MAX_ALPHABET - 1 if len(alphabet) > MAX_ALPHABET else None
+
+        counts = np.bincount(
+            columns * len(self.names) + owners,
+            minlength=width * len(self.names),
+        ).reshape(width, len(self.names))
+        # Drop the two padding spaces around each name.
+        if ord(" ") in self._char_columns:
+            counts[self._char_columns[ord(" ")]] -= 2
+        self._char_counts = counts.astype(np.uint16)
+
+    def _build_postings(self, codes: np.ndarray, owners: np.ndarray) -> None:
+        if len(codes) < 3:
+            self._gram_keys = np.empty(0, dtype=np.int64)
+            self._gram_offsets = np.zeros(1, dtype=np.int64)
+            self._gram_positions = np.empty(0, dtype=np.int32)
+            self._gram_totals = np.zeros(len(self.names), dtype=np.int64)
+            return
+
+        separator = ord(SEPARATOR)
+        within_name = (codes[:-2] != separator) & (codes[1:-1] != separator) & (
+            codes[2:] != separator
+        )
+        keys = _trigram_keys(codes)[within_name]
+        owners = owners[:-2][within_name]
+
+        order = np.lexsort((owners, keys))
+        keys, owners = keys[order], owners[order]
+        # A trigram repeated inside one name is posted once.
+        distinct = np.ones(len(keys), dtype=bool)
+        distinct[1:] = (keys[1:] != keys[:-1]) | (owners[1:] != owners[:-1])
+        keys, owners = keys[distinct], owners[distinct]
+
+        self._gram_keys, first = np.unique(keys, return_index=True)
+        self._gram_offsets = np.append(first, len(keys))
+        self._gram_positions = owners
+        self._gram_totals = np.bincount(owners, minlength=len(self.names))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def search(self, term: str, limit: int = 25) -> list[T]:
+        needle = fold(term.strip())
+        if not needle or limit <= 0:
+            return []
+
+        exact = self._substring_matches(needle, limit)
+        if len(exact) >= limit:
+            return [self.items[position] for position in exact]
+
+        scored = [(1.0, position) for position in exact]
+        scored.extend(self._fuzzy_matches(needle, limit - len(exact), set(exact)))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [self.items[position] for _, position in scored[:limit]]
+
+    def _substring_matches(self, needle: str, limit: int) -> list[int]:
+        """Positions of the first ``limit`` names containing ``needle``."""
+        if SEPARATOR in needle:
+            return []
+        matches: list[int] = []
+        start = 0
+        while len(matches) < limit:
+            found = self._text.find(needle, start)
+            if found < 0:
+                break
+            position = bisect_right(self._starts, found) - 1
+            matches.append(position)
+            # Skip the rest of this name so it is counted once.
+            start = self._starts[position] + len(self.names[position]) + 3
+        return matches
+
+    def _fuzzy_matches(
+        self,
+        needle: str,
+        wanted: int,
+        exclude: set[int],
+    ) -> list[tuple[float, int]]:
+        """Best ``wanted`` names outside ``exclude`` scoring at least ``MIN_SCORE``."""
+        bounds = self._ratio_bounds(needle)
+        best: list[tuple[float, int]] = []  # min-heap of (score, -position)
+        scored = set(exclude)
+        scores: dict[str, float] = {}  # repeated names are scored once
+
+        def consider(position: int) -> None:
+            scored.add(position)
+            # Anything below the current worst kept score cannot make the cut.
+            floor = best[0][0] if len(best) >= wanted else MIN_SCORE
+            if bounds[position] < floor:
+                return
+            name = self.names[position]
+            score = scores.get(name)
+            if score is None:
+                score = scores[name] = SequenceMatcher(None, needle, name).ratio()
+            if score < floor:
+                return
+            if len(best) < wanted:
+                heapq.heappush(best, (score, -position))
+            else:
+                heapq.heappushpop(best, (score, -position))
+
+        for position in self._fuzzy_candidates(needle):
+            if position not in scored:
+                consider(position)
+
+        floor = best[0][0] if len(best) >= wanted else MIN_SCORE
+        remaining = np.flatnonzero(bounds >= floor)
+        remaining = remaining[np.argsort(-bounds[remaining], kind="stable")]
+        for position, bound in zip(remaining.tolist(), bounds[remaining].tolist()):
+            if len(best) >= wanted and bound < best[0][0]:
+                break
+            if position not in scored:
+                consider(position)
+        return [(score, -negative) for score, negative in best]
+
+    def _ratio_bounds(self, needle: str) -> np.ndarray:
+        """``quick_ratio`` of ``needle`` against every name, as an array."""
+        needed: dict[int, int] = {}
+        for char in needle:
+            column = self._char_columns.get(ord(char), self._shared_column)
+            if column is not None:
+                needed[column] = needed.get(column, 0) + 1
+
+        common = np.zeros(len(self.names), dtype=np.int64)
+        for column, count in needed.items():
+            common += np.minimum(self._char_counts[column], count)
+        return 2.0 * common / np.maximum(len(needle) + self._name_lengths, 1)
+
+    def _fuzzy_candidates(self, needle: str) -> list[int]:
+        """Names whose trigrams best overlap those of ``needle``, best first."""
+        query = np.unique(_trigram_keys(_code_points(f" {needle} ")))
+        slots = np.searchsorted(self._gram_keys, query)
+        found = slots < len(self._gram_keys)
+        found[found] = self._gram_keys[slots[found]] == query[found]
+        slots = slots[found]
+        if not len(slots):
+            return []
+
+        lists = [
+            self._gram_positions[self._gram_offsets[slot] : self._gram_offsets[slot + 1]]
+            for slot in slots.tolist()
+        ]
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        candidates = np.flatnonzero(shared)
+        # Dice coefficient of the trigram sets, which like SequenceMatcher
+        # penalises names much longer or shorter than the term.
+        similarity = shared[candidates] / (len(query) + self._gram_totals[candidates])
+        if len(candidates) > FUZZY_SEED_CANDIDATES:
+            top = np.argpartition(-similarity, FUZZY_SEED_CANDIDATES)[:FUZZY_SEED_CANDIDATES]
+            top.sort()
+            candidates, similarity = candidates[top], similarity[top]
+        order = np.argsort(-similarity, kind="stable")
+        return candidates[order].tolist()
@@ -2,29 +2,94 @@
 
 from __future__ import annotations
 
-from typing import Any, Mapping, Optional
-from xml.etree import ElementTree
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Iterable, Iterator, Mapping, Optional, TypeVar
 
 import pandas as pd
 
-from app.infra.soap.client import build_rm_service
+from app.infra.soap.client import RMQueryService
 from app.infra.soap.parser import (
     DatasetDataFrameBuilder,
     DatasetNormalizer,
     SoapResponseParser,
+    StreamingDatasetReader,
 )
+from app.infra.soap.parallel import ParallelParser, get_parallel_parser
+from app.infra.soap.registry import get_rm_service
+from app.infra.soap.schema import SCHEMA_REGISTRY, SchemaRegistry
 from app.logging import logger
 
 
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single execution.
+
+    Callers arriving while a call is in flight wait for it and receive the
+    same result object (or exception) instead of starting another request.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future[Any]] = {}
+
+    def do(self, key: Hashable, function: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            logger.debug("Aguardando chamada em andamento para %s", key)
+            return future.result()
+
+        try:
+            result = function()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+_IN_FLIGHT = SingleFlight()
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, Mapping):
+        return tuple(sorted((str(key), _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, range)):
+        return tuple(_freeze(item) for item in value)
+    return str(value)
+
+
 class RMQueryGateway:
     """High-level adapter that returns DataFrames from RM SOAP queries."""
 
-    def __init__(self, *, row_tag: Optional[str] = None) -> None:
-        self.rm_service = build_rm_service()
+    def __init__(
+        self,
+        *,
+        row_tag: Optional[str] = None,
+        rm_service: Optional[RMQueryService] = None,
+        schemas: Optional[SchemaRegistry] = None,
+        parallel: Optional[ParallelParser] = None,
+    ) -> None:
+        self.rm_service = rm_service or get_rm_service()
+        self.schemas = schemas or SCHEMA_REGISTRY
+        self.parallel = parallel or get_parallel_parser()
         self.parser = SoapResponseParser()
         self.normalizer = DatasetNormalizer()
         self.df_builder = DatasetDataFrameBuilder()
         self.row_tag_override = row_tag
+        self.single_flight = _IN_FLIGHT
 
     def fetch_dataframe(
         self,
@@ -32,63 +97,192 @@ class RMQueryGateway:
         *,
         parameters: Optional[Mapping[str, Any]] = None,
         row_tag: Optional[str] = None,
+        refresh: bool = False,
+    ) -> pd.DataFrame:
+        """Fetch the query; identical concurrent calls share one request.
+
+        Columns are renamed and typed with the schema registered for
+        ``query_name``; without one every cell is a string. The returned
+        DataFrame may be shared with other callers and must not be modified
+        in place.
+        """
+        key = (
+            "fetch",
+            id(self.rm_service),
+            query_name,
+            _freeze(parameters or {}),
+            row_tag or self.row_tag_override,
+            refresh,
+        )
+        return self.single_flight.do(
+            key,
+            lambda: self._fetch_dataframe(
+                query_name,
+                parameters=parameters,
+                row_tag=row_tag,
+                refresh=refresh,
+            ),
+        )
+
+    def _fetch_dataframe(
+        self,
+        query_name: str,
+        *,
+        parameters: Optional[Mapping[str, Any]],
+        row_tag: Optional[str],
+        refresh: bool,
     ) -> pd.DataFrame:
         payload = self.rm_service.execute(
             query_name,
             parameters=parameters,
-            timeout=None,
+            refresh=refresh,
         )
+        dataframe = self._payload_to_dataframe(
+            query_name,
+            payload,
+            row_tag=row_tag,
+        )
+        return self.schemas.apply(query_name, dataframe)
+
+    def fetch_dataframe_partitioned(
+        self,
+        query_name: str,
+        partitions: Iterable[Any],
+        *,
+        partition_key: Optional[str] = None,
+        parameters: Optional[Mapping[str, Any]] = None,
+        row_tag: Optional[str] = None,
+        max_workers: int = 4,
+        refresh: bool = False,
+    ) -> pd.DataFrame:
+        """Fetch the query split by partition and concatenate in partition order."""
+        partitions = list(partitions)
+        key = (
+            "partitioned",
+            id(self.rm_service),
+            query_name,
+            _freeze(partitions),
+            partition_key,
+            _freeze(parameters or {}),
+            row_tag or self.row_tag_override,
+            refresh,
+        )
+        return self.single_flight.do(
+            key,
+            lambda: self._fetch_dataframe_partitioned(
+                query_name,
+                partitions,
+                partition_key=partition_key,
+                parameters=parameters,
+                row_tag=row_tag,
+                max_workers=max_workers,
+                refresh=refresh,
+            ),
+        )
+
+    def _fetch_dataframe_partitioned(
+        self,
+        query_name: str,
+        partitions: list[Any],
+        *,
+        partition_key: Optional[str],
+        parameters: Optional[Mapping[str, Any]],
+        row_tag: Optional[str],
+        max_workers: int,
+        refresh: bool,
+    ) -> pd.DataFrame:
+        payloads = self.rm_service.execute_partitioned(
+            query_name,
+            partitions,
+            partition_key=partition_key,
+            parameters=parameters,
+            max_workers=max_workers,
+            refresh=refresh,
+        )
+        if self.parallel is not None:
+            # Parse every partition at once in the worker processes.
+            futures = [
+                self.parallel.submit(
+                    payload,
+                    row_tag=row_tag or self.row_tag_override,
+                    backend=self.parser.backend.name,
+                )
+                for payload in payloads
+                if payload
+            ]
+            dataframes = [
+                self.parallel.result(future, query_name=query_name)
+                for future in futures
+            ]
+        else:
+            dataframes = [
+                self._payload_to_dataframe(query_name, payload, row_tag=row_tag)
+                for payload in payloads
+            ]
+        dataframes = [dataframe for dataframe in dataframes if not dataframe.empty]
+        if not dataframes:
+            return pd.DataFrame()
+        dataframe = pd.concat(dataframes, ignore_index=True)
+        return self.schemas.apply(query_name, dataframe)
+
+    def _payload_to_dataframe(
+        self,
+        query_name: str,
+        payload: str | None,
+        *,
+        row_tag: Optional[str] = None,
+    ) -> pd.DataFrame:
         if not payload:
             logger.warning("Consulta %s retornou payload vazio.", query_name)
             return pd.DataFrame()
 
-        fault_message = self._extract_fault_message(payload)
-        if fault_message:
+        if self.parallel is not None:
+            return self.parallel.parse(
+                payload,
+                query_name=query_name,
+                row_tag=row_tag or self.row_tag_override,
+                backend=self.parser.backend.name,
+            )
+
+        envelope = self.parser.decode(payload)
+        if envelope.fault_message:
             logger.error(
                 "Consulta %s retornou Fault do servidor: %s",
                 query_name,
-                fault_message,
+                envelope.fault_message,
             )
             return pd.DataFrame()
 
-        dataset_xml = self.parser.extract_result_xml(payload)
+        dataset_xml = self.parser.result_xml(envelope)
         dataset_root = self.normalizer.parse(dataset_xml)
         if dataset_root is None:
             return pd.DataFrame()
 
-        dataframe = self.df_builder.to_dataframe(
+        return self.df_builder.to_dataframe(
             dataset_root,
             row_tag=row_tag or self.row_tag_override,
         )
-        return dataframe.fillna("")
 
-    @staticmethod
-    def _extract_fault_message(payload: str) -> Optional[str]:
-        """Return the soap fault message when present."""
-        try:
-            root = ElementTree.fromstring(payload)
-        except ElementTree.ParseError:
-            return None
-
-        namespaces = {
-            "soapenv": "http://schemas.xmlsoap.org/soap/envelope/",
-            "s": "http://schemas.xmlsoap.org/soap/envelope/",
-        }
-        fault = (
-            root.find(".//soapenv:Fault", namespaces=namespaces)
-            or root.find(".//s:Fault", namespaces=namespaces)
-            or root.find(".//Fault")
+    def iter_dataframes(
+        self,
+        query_name: str,
+        *,
+        parameters: Optional[Mapping[str, Any]] = None,
+        row_tag: Optional[str] = None,
+        batch_size: int = 5000,
+    ) -> Iterator[pd.DataFrame]:
+        """Yield the query result in DataFrame batches while it is downloaded."""
+        reader = StreamingDatasetReader(
+            self.parser,
+            self.df_builder,
+            batch_size=batch_size,
         )
-        if fault is None:
-            return None
-
-        faultstring = fault.findtext("faultstring")
-        if faultstring:
-            return faultstring.strip()
-
-        detail_message = fault.findtext(".//Message")
-        if detail_message:
-            return detail_message.strip()
-
-        return ElementTree.tostring(fault, encoding="unicode")
-
+        chunks = self.rm_service.execute_stream(
+            query_name,
+            parameters=parameters,
+        )
+        for dataframe in reader.iter_dataframes(
+            chunks,
+            row_tag=row_tag or self.row_tag_override,
+        ):
+            yield self.schemas.apply(query_name, dataframe)
@@ -1,5 +1,20 @@
 """SOAP integration utilities."""
 
+from .async_client import (
+    AsyncRMQueryService,
+    AsyncSoapClient,
+    QueryRequest,
+    build_async_rm_service,
+)
+from .batch import (
+    BatchRunner,
+    Manifest,
+    ManifestQuery,
+    QueryReport,
+    format_summary,
+    load_manifest,
+)
+from .cache import CacheEntry, ResponseCache, build_response_cache
 from .client import (
     ParametersSerializer,
     RMQueryService,
@@ -8,24 +23,113 @@ from .client import (
     SoapOperation,
     build_rm_service,
 )
+from .delta import DeltaResult, DeltaTracker, SnapshotIndex, build_delta_tracker
+from .exporters import (
+    ArrowIPCExporter,
+    CSVExporter,
+    DataFrameExporter,
+    ExportStats,
+    ParquetExporter,
+    StreamingCSVWriter,
+    build_exporter,
+    read_export,
+)
+from .limiter import (
+    AdaptiveConcurrencyLimiter,
+    FileLimiterBackend,
+    LimiterConfig,
+    LimiterTimeout,
+    MemoryLimiterBackend,
+    build_limiter,
+)
+from .metrics import METRICS, MetricsRegistry, Span, StageMetrics, write_metrics_report
+from .parallel import ParallelParser, ParsedDataset, get_parallel_parser, parse_payload
 from .parser import (
     DatasetDataFrameBuilder,
     DatasetNormalizer,
+    DecodedEnvelope,
     SoapResponseParser,
+    StreamingDatasetReader,
 )
 from .pipeline import RMQueryETLPipeline, build_pipeline
+from .policy import CallPolicy, LatencyTracker
+from .registry import RMServiceRegistry, close_rm_services, get_rm_service
+from .schema import SCHEMA_REGISTRY, QuerySchema, SchemaRegistry
+from .transport import CallStats, TransportConfig
+from .xml_backend import (
+    LxmlXmlBackend,
+    StdlibXmlBackend,
+    XmlBackend,
+    get_xml_backend,
+)
 
 __all__ = [
+    "AsyncRMQueryService",
+    "AsyncSoapClient",
+    "QueryRequest",
+    "build_async_rm_service",
+    "BatchRunner",
+    "Manifest",
+    "ManifestQuery",
+    "QueryReport",
+    "format_summary",
+    "load_manifest",
+    "CacheEntry",
+    "ResponseCache",
+    "build_response_cache",
     "ParametersSerializer",
     "RMQueryService",
     "SoapClient",
     "SoapEnvelopeBuilder",
     "SoapOperation",
     "build_rm_service",
+    "DeltaResult",
+    "DeltaTracker",
+    "SnapshotIndex",
+    "build_delta_tracker",
+    "ArrowIPCExporter",
+    "CSVExporter",
+    "DataFrameExporter",
+    "ExportStats",
+    "ParquetExporter",
+    "StreamingCSVWriter",
+    "build_exporter",
+    "read_export",
+    "AdaptiveConcurrencyLimiter",
+    "FileLimiterBackend",
+    "LimiterConfig",
+    "LimiterTimeout",
+    "MemoryLimiterBackend",
+    "build_limiter",
+    "METRICS",
+    "MetricsRegistry",
+    "Span",
+    "StageMetrics",
+    "write_metrics_report",
+    "ParallelParser",
+    "ParsedDataset",
+    "get_parallel_parser",
+    "parse_payload",
     "DatasetDataFrameBuilder",
     "DatasetNormalizer",
+    "DecodedEnvelope",
     "SoapResponseParser",
+    "StreamingDatasetReader",
     "RMQueryETLPipeline",
     "build_pipeline",
+    "CallPolicy",
+    "LatencyTracker",
+    "RMServiceRegistry",
+    "close_rm_services",
+    "get_rm_service",
+    "SCHEMA_REGISTRY",
+    "QuerySchema",
+    "SchemaRegistry",
+    "CallStats",
+    "TransportConfig",
+    "LxmlXmlBackend",
+    "StdlibXmlBackend",
+    "XmlBackend",
+    "get_xml_backend",
 ]
 
@@ -0,0 +1,201 @@
+"""asyncio counterparts of the SOAP client and RM query service.
+
+These wrap the ``requests`` based client with thread pools instead of using
+an asyncio HTTP transport, so retries, hedging, the limiter and the response
+cache are shared with the synchronous path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Hashable, Iterable, Optional
+
+from app.config import ENV
+from app.logging import logger
+from .client import RMQueryService, SoapClient, SoapOperation, TimeoutType
+from .registry import get_rm_service
+
+
+@dataclass(frozen=True)
+class QueryRequest:
+    """Arguments of a single ``RealizarConsultaSQL`` call."""
+
+    cod_sentenca: str
+    cod_coligada: str = "0"
+    cod_sistema: str = "G"
+    parameters: Any = None
+
+
+class AsyncSoapClient:
+    """Awaitable wrapper around ``SoapClient``.
+
+    This offloads the blocking ``requests`` call to threads; it is not a
+    native asyncio HTTP client. Calls run on a dedicated pool of
+    ``max_workers`` threads, so the event loop stays free, the shared session
+    keeps its pooled connections and concurrency does not depend on the
+    loop's default executor.
+    """
+
+    def __init__(
+        self,
+        client: Optional[SoapClient] = None,
+        *,
+        max_workers: int = 4,
+    ) -> None:
+        self.client = client or SoapClient()
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="rm-async",
+        )
+
+    def close(self) -> None:
+        """Stop the worker threads; the wrapped ``SoapClient`` stays open."""
+        self._executor.shutdown(wait=False)
+
+    async def call(
+        self,
+        operation: SoapOperation,
+        payload: str,
+        *,
+        extra_headers: Optional[dict[str, str]] = None,
+        timeout: TimeoutType = None,
+        sentence: Optional[str] = None,
+    ) -> str | None:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(
+                self.client.call,
+                operation,
+                payload,
+                extra_headers=extra_headers,
+                timeout=timeout,
+                sentence=sentence,
+            ),
+        )
+
+
+class AsyncRMQueryService:
+    """Facade to execute RM SQL queries concurrently from asyncio code.
+
+    Each call runs the blocking ``RMQueryService.execute`` on a pool of
+    ``max_concurrency`` threads, so the response cache behaves as in the
+    synchronous path. Identical requests issued while one is in flight share
+    its result or exception instead of reaching the server again.
+    """
+
+    def __init__(
+        self,
+        service: RMQueryService,
+        *,
+        max_concurrency: int = 4,
+    ) -> None:
+        self.service = service
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="rm-async",
+        )
+        self._in_flight: dict[Hashable, asyncio.Future[str | None]] = {}
+
+    def close(self) -> None:
+        """Stop the worker threads; the wrapped service stays open."""
+        self._executor.shutdown(wait=False)
+
+    async def execute(
+        self,
+        cod_sentenca: str,
+        *,
+        cod_coligada: str = "0",
+        cod_sistema: str = "G",
+        parameters: Any = None,
+        timeout: TimeoutType = None,
+        use_cache: bool = True,
+        refresh: bool = False,
+    ) -> str | None:
+        """Awaitable ``RMQueryService.execute``; same cache arguments."""
+        loop = asyncio.get_running_loop()
+        key = (
+            id(loop),
+            cod_sentenca,
+            str(cod_coligada),
+            cod_sistema,
+            self.service.builder.serializer.serialize(parameters),
+            use_cache,
+            refresh,
+        )
+        future = self._in_flight.get(key)
+        if future is None:
+            future = loop.run_in_executor(
+                self._executor,
+                functools.partial(
+                    self.service.execute,
+                    cod_sentenca,
+                    cod_coligada=cod_coligada,
+                    cod_sistema=cod_sistema,
+                    parameters=parameters,
+                    timeout=timeout,
+                    use_cache=use_cache,
+                    refresh=refresh,
+                ),
+            )
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _done: self._in_flight.pop(key, None))
+        else:
+            logger.debug("Aguardando chamada em andamento para %s", cod_sentenca)
+        # A cancelled caller must not cancel the call the others are waiting on.
+        return await asyncio.shield(future)
+
+    async def execute_many(
+        self,
+        requests: Iterable[QueryRequest],
+        *,
+        max_concurrency: Optional[int] = None,
+        timeout: TimeoutType = None,
+        return_exceptions: bool = False,
+    ) -> list[str | None | BaseException]:
+        """Run the requests with bounded concurrency, keeping input order.
+
+        A ``max_concurrency`` above the service's own is still capped by its
+        thread pool.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def run(request: QueryRequest) -> str | None:
+            async with semaphore:
+                logger.debug("Executando sentença %s", request.cod_sentenca)
+                return await self.execute(
+                    request.cod_sentenca,
+                    cod_coligada=request.cod_coligada,
+                    cod_sistema=request.cod_sistema,
+                    parameters=request.parameters,
+                    timeout=timeout,
+                )
+
+        return await asyncio.gather(
+            *(run(request) for request in requests),
+            return_exceptions=return_exceptions,
+        )
+
+    @classmethod
+    def from_service(
+        cls,
+        service: RMQueryService,
+        *,
+        max_concurrency: int = 4,
+    ) -> "AsyncRMQueryService":
+        return cls(service, max_concurrency=max_concurrency)
+
+
+def build_async_rm_service(max_concurrency: Optional[int] = None) -> AsyncRMQueryService:
+    """Factory for an async RM query service configured via environment variables."""
+    if max_concurrency is None:
+        max_concurrency = int(ENV.get("RM_MAX_CONCURRENCY", "4"))
+    return AsyncRMQueryService.from_service(
+        get_rm_service(),
+        max_concurrency=max_concurrency,
+    )
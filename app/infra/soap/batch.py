@@ -0,0 +1,299 @@
+"""Run many RM sentences described in a manifest file through one service."""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import threading
+import time
+import tomllib
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Mapping, Optional
+
+from app.config import ENV
+from app.logging import logger
+from .client import RMQueryService
+from .exporters import DataFrameExporter, build_exporter
+from .pipeline import RMQueryETLPipeline, build_pipeline
+
+try:  # pragma: no cover - depends on the environment
+    import yaml
+except ImportError:  # pragma: no cover - depends on the environment
+    yaml = None
+
+
+@dataclass(frozen=True)
+class ManifestQuery:
+    """One sentence of the manifest; ``name`` names the exported file."""
+
+    cod_sentenca: str
+    name: str
+    cod_coligada: str = "0"
+    cod_sistema: str = "G"
+    parameters: Optional[Mapping[str, Any]] = None
+    row_tag: Optional[str] = None
+    export_format: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Manifest:
+    """Sentences to run plus the defaults shared by all of them."""
+
+    queries: tuple[ManifestQuery, ...]
+    max_concurrency: int = 4
+    output_dir: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Manifest":
+        defaults = {
+            "cod_coligada": str(data.get("cod_coligada", "0")),
+            "cod_sistema": str(data.get("cod_sistema", "G")),
+            "row_tag": data.get("row_tag"),
+            "export_format": data.get("format"),
+        }
+        queries = []
+        for item in data.get("queries", []):
+            if isinstance(item, str):
+                item = {"cod_sentenca": item}
+            cod_sentenca = item.get("cod_sentenca") or item.get("query")
+            if not cod_sentenca:
+                raise ValueError(f"Consulta sem cod_sentenca no manifesto: {item}")
+            queries.append(
+                ManifestQuery(
+                    cod_sentenca=cod_sentenca,
+                    name=item.get("name", cod_sentenca),
+                    cod_coligada=str(item.get("cod_coligada", defaults["cod_coligada"])),
+                    cod_sistema=str(item.get("cod_sistema", defaults["cod_sistema"])),
+                    parameters=item.get("parameters"),
+                    row_tag=item.get("row_tag", defaults["row_tag"]),
+                    export_format=item.get("format", defaults["export_format"]),
+                )
+            )
+
+        names = [query.name for query in queries]
+        duplicated = sorted({name for name in names if names.count(name) > 1})
+        if duplicated:
+            raise ValueError(
+                "Nomes repetidos no manifesto (use 'name'): " + ", ".join(duplicated)
+            )
+        return cls(
+            queries=tuple(queries),
+            max_concurrency=int(data.get("max_concurrency", 4)),
+            output_dir=data.get("output_dir"),
+        )
+
+
+def load_manifest(path: Path) -> Manifest:
+    """Read a JSON, TOML or YAML manifest, chosen by the file extension."""
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+    elif suffix == ".toml":
+        data = tomllib.loads(path.read_text(encoding="utf-8"))
+    elif suffix in (".yaml", ".yml"):
+        if yaml is None:
+            raise ImportError("Manifestos YAML requerem o pacote PyYAML (pip install pyyaml).")
+        data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    else:
+        raise ValueError(f"Formato de manifesto não suportado: {path.name}")
+    return Manifest.from_dict(data)
+
+
+@dataclass
+class QueryReport:
+    """Outcome of one manifest entry."""
+
+    name: str
+    status: str = "pendente"
+    download_seconds: float = 0.0
+    parse_seconds: float = 0.0
+    bytes_received: int = 0
+    bytes_decoded: int = 0
+    rows: int = 0
+    output: Optional[Path] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class _Download:
+    query: ManifestQuery
+    payload: Optional[str]
+    report: QueryReport
+
+
+class BatchRunner:
+    """Execute the manifest sentences with a shared ``RMQueryService``.
+
+    Up to ``max_concurrency`` downloads run in worker threads while the
+    calling thread parses and exports the responses that already arrived, so
+    the next download overlaps the parsing of the previous one. When the
+    pipeline has a ``ParallelParser``, responses are parsed concurrently in
+    its worker processes instead.
+    """
+
+    def __init__(
+        self,
+        rm_service: RMQueryService,
+        *,
+        pipeline: Optional[RMQueryETLPipeline] = None,
+        env: Mapping[str, str] = ENV,
+    ) -> None:
+        self.rm_service = rm_service
+        self.pipeline = pipeline or build_pipeline()
+        self.env = env
+        self._exporters: dict[tuple[Optional[str], Optional[str]], DataFrameExporter] = {}
+        self._exporters_lock = threading.Lock()
+
+    def run(self, manifest: Manifest) -> list[QueryReport]:
+        reports = {query.name: QueryReport(query.name) for query in manifest.queries}
+        parallel = self.pipeline.parallel
+        if parallel is None:
+            for download in self._downloads(manifest, reports):
+                self._process(download, manifest)
+        else:
+            # Parsing happens in worker processes, so several can run at once.
+            with ThreadPoolExecutor(
+                max_workers=parallel.max_workers or os.cpu_count() or 1,
+                thread_name_prefix="rm-batch-parse",
+            ) as executor:
+                for download in self._downloads(manifest, reports):
+                    executor.submit(self._process, download, manifest)
+        return [reports[query.name] for query in manifest.queries]
+
+    def _downloads(
+        self,
+        manifest: Manifest,
+        reports: Mapping[str, QueryReport],
+    ) -> Iterator[_Download]:
+        max_workers = max(1, manifest.max_concurrency)
+        pending = iter(manifest.queries)
+        in_flight: set[Future[_Download]] = set()
+        with ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="rm-batch",
+        ) as executor:
+            for query in pending:
+                in_flight.add(executor.submit(self._download, query, reports[query.name]))
+                if len(in_flight) >= max_workers:
+                    break
+
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # Refill the window before parsing to keep downloads busy.
+                    query = next(pending, None)
+                    if query is not None:
+                        in_flight.add(
+                            executor.submit(self._download, query, reports[query.name])
+                        )
+                    yield future.result()
+
+    def _download(self, query: ManifestQuery, report: QueryReport) -> _Download:
+        client = self.rm_service.client
+        client.last_stats = None
+        started = time.perf_counter()
+        try:
+            payload = self.rm_service.execute(
+                query.cod_sentenca,
+                cod_coligada=query.cod_coligada,
+                cod_sistema=query.cod_sistema,
+                parameters=query.parameters,
+            )
+        except Exception as exc:  # noqa: BLE001 - reported in the summary
+            logger.error("Consulta %s falhou: %s", query.name, exc)
+            report.status = "erro"
+            report.error = str(exc)
+            payload = None
+        report.download_seconds = time.perf_counter() - started
+
+        stats = client.last_stats
+        if stats is not None:
+            report.bytes_received = stats.bytes_received
+            report.bytes_decoded = stats.bytes_decoded
+        elif payload:
+            report.bytes_decoded = len(payload.encode("utf-8"))
+        return _Download(query, payload, report)
+
+    def _process(self, download: _Download, manifest: Manifest) -> None:
+        report = download.report
+        if report.status == "erro":
+            return
+        if not download.payload:
+            report.status = "vazio"
+            return
+
+        query = download.query
+        fault = self.pipeline.soap_parser.extract_fault_message(download.payload)
+        if fault:
+            logger.error("Consulta %s retornou Fault: %s", query.name, fault)
+            report.status = "erro"
+            report.error = fault
+            return
+
+        pipeline = dataclasses.replace(
+            self.pipeline,
+            row_tag=query.row_tag or self.pipeline.row_tag,
+            exporter=self._exporter_for(query.export_format, manifest.output_dir),
+        )
+        started = time.perf_counter()
+        try:
+            result = pipeline.run(download.payload, query.name)
+        except Exception as exc:  # noqa: BLE001 - reported in the summary
+            logger.error("Falha ao processar %s: %s", query.name, exc, exc_info=True)
+            report.status = "erro"
+            report.error = str(exc)
+            return
+        finally:
+            report.parse_seconds = time.perf_counter() - started
+
+        if result is None:
+            report.status = "vazio"
+            return
+        dataframe, output = result
+        report.status = "ok"
+        report.rows = len(dataframe)
+        report.output = output
+
+    def _exporter_for(
+        self,
+        export_format: Optional[str],
+        output_dir: Optional[str],
+    ) -> DataFrameExporter:
+        key = (export_format, output_dir)
+        with self._exporters_lock:
+            exporter = self._exporters.get(key)
+            if exporter is None:
+                if export_format is None and output_dir is None:
+                    exporter = self.pipeline.exporter
+                else:
+                    env = dict(self.env)
+                    if export_format:
+                        env["EXPORT_FORMAT"] = export_format
+                    if output_dir:
+                        env["CSV_OUTPUT_DIR"] = output_dir
+                    exporter = build_exporter(env)
+                self._exporters[key] = exporter
+            return exporter
+
+
+def format_summary(reports: list[QueryReport]) -> str:
+    """Render the per-query summary table printed at the end of a batch."""
+    header = (
+        f"{'consulta':<30} {'status':<7} {'download':>9} {'parse':>8} "
+        f"{'KB rede':>10} {'KB xml':>10} {'linhas':>9}  arquivo"
+    )
+    lines = [header, "-" * len(header)]
+    for report in reports:
+        lines.append(
+            f"{report.name[:30]:<30} {report.status:<7} "
+            f"{report.download_seconds:>8.2f}s {report.parse_seconds:>7.2f}s "
+            f"{report.bytes_received / 1024:>10.1f} {report.bytes_decoded / 1024:>10.1f} "
+            f"{report.rows:>9}  {report.output or report.error or ''}"
+        )
+    total_rows = sum(report.rows for report in reports)
+    failed = sum(report.status == "erro" for report in reports)
+    lines.append(f"{len(reports)} consultas, {total_rows} linhas, {failed} com erro.")
+    return "\n".join(lines)
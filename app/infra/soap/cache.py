@@ -0,0 +1,298 @@
+"""Persistent, content-addressed disk cache for RM SOAP responses."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Optional
+
+from app.config import ENV
+from app.logging import logger
+from .parser import SoapResponseParser
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """Cached response; ``payload`` is ``None`` for a cached empty response."""
+
+    payload: Optional[str]
+    kind: str
+    created_at: float
+    expires_at: float
+
+
+class ResponseCache:
+    """Store SOAP payloads on disk, gzip-compressed, with per-query TTLs.
+
+    Only 2xx responses carrying ``RealizarConsultaSQLResult`` live for the
+    query TTL. Fault and empty responses are cached for the shorter
+    ``negative_ttl``; anything else (HTTP errors, proxy pages, truncated
+    envelopes) is not cached. The directory is trimmed to ``max_bytes`` by
+    evicting the least recently used entries; sizes are tracked in memory
+    after one initial scan, so entries written by other processes are only
+    accounted for when the cache is reopened.
+    """
+
+    # A complete success envelope closes the result element shortly before
+    # ``</Envelope>``, so the tail is enough to tell it from a truncated body.
+    _TAIL_CHARS = 1024
+
+    KIND_OK = "ok"
+    KIND_FAULT = "fault"
+    KIND_EMPTY = "empty"
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        default_ttl: float = 3600.0,
+        ttls: Optional[Mapping[str, float]] = None,
+        negative_ttl: float = 60.0,
+        max_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        self.directory = directory
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self.parser = SoapResponseParser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # key -> bytes on disk, least recently used first; built lazily.
+        self._entries: Optional[OrderedDict[str, int]] = None
+        self._total = 0
+
+    @staticmethod
+    def make_key(
+        operation: str,
+        cod_sentenca: str,
+        cod_coligada: str,
+        cod_sistema: str,
+        parameters: str,
+    ) -> str:
+        material = "\x1f".join(
+            (operation, cod_sentenca, str(cod_coligada), cod_sistema, parameters)
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def classify(
+        self,
+        payload: Optional[str],
+        *,
+        status_code: Optional[int] = None,
+    ) -> Optional[str]:
+        """Cache kind of a response, or ``None`` when it must not be cached.
+
+        Success is recognised from the status code and the envelope tail
+        without parsing; only bodies that mention ``Fault`` are decoded.
+        """
+        ok_status = status_code is None or 200 <= status_code < 300
+        if not payload:
+            return self.KIND_EMPTY if ok_status else None
+        tail = payload[-self._TAIL_CHARS:].rstrip()
+        if (
+            ok_status
+            and tail.endswith("Envelope>")
+            and "RealizarConsultaSQLResult" in tail
+        ):
+            return self.KIND_OK
+        if self.parser.extract_fault_message(payload):
+            return self.KIND_FAULT
+        return None
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        meta_path, data_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            kind = str(meta["kind"])
+            created_at = float(meta["created_at"])
+            expires_at = float(meta["expires_at"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.warning("Metadados corrompidos no cache; entrada %s descartada.", key)
+            self.invalidate(key)
+            return None
+
+        if expires_at < time.time():
+            self.invalidate(key)
+            return None
+
+        payload: Optional[str] = None
+        if kind != self.KIND_EMPTY:
+            try:
+                payload = gzip.decompress(data_path.read_bytes()).decode("utf-8")
+            except (OSError, EOFError, UnicodeDecodeError):
+                self.invalidate(key)
+                return None
+
+        self._touch(key, meta_path)
+        return CacheEntry(
+            payload=payload,
+            kind=kind,
+            created_at=created_at,
+            expires_at=expires_at,
+        )
+
+    def put(
+        self,
+        key: str,
+        payload: Optional[str],
+        *,
+        cod_sentenca: str,
+        kind: Optional[str] = None,
+        status_code: Optional[int] = None,
+    ) -> Optional[CacheEntry]:
+        """Store the response; returns ``None`` when it is not cacheable."""
+        kind = kind or self.classify(payload, status_code=status_code)
+        if kind is None:
+            logger.info(
+                "Resposta de %s não armazenada no cache (HTTP %s).",
+                cod_sentenca,
+                status_code,
+            )
+            return None
+        now = time.time()
+        ttl = (
+            self.ttls.get(cod_sentenca, self.default_ttl)
+            if kind == self.KIND_OK
+            else self.negative_ttl
+        )
+        entry = CacheEntry(payload=payload, kind=kind, created_at=now, expires_at=now + ttl)
+        if ttl <= 0:
+            return entry
+
+        data = None if payload is None else gzip.compress(payload.encode("utf-8"), 6)
+        meta = json.dumps(
+            {
+                "kind": kind,
+                "cod_sentenca": cod_sentenca,
+                "created_at": entry.created_at,
+                "expires_at": entry.expires_at,
+            }
+        ).encode("utf-8")
+        size = len(meta) + (len(data) if data is not None else 0)
+
+        meta_path, data_path = self._paths(key)
+        # Files and index change together, so concurrent puts of one key
+        # cannot leave the payload of one next to the meta of the other.
+        with self._lock:
+            meta_path.parent.mkdir(parents=True, exist_ok=True)
+            if data is not None:
+                self._write_atomic(data_path, data)
+            else:
+                data_path.unlink(missing_ok=True)
+            self._write_atomic(meta_path, meta)
+            entries = self._index()
+            self._total += size - entries.pop(key, 0)
+            entries[key] = size
+            self._evict_locked()
+        return entry
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._forget(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self.directory.glob("*/*"):
+                path.unlink(missing_ok=True)
+            self._entries = OrderedDict()
+            self._total = 0
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits ``max_bytes``."""
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        entries = self._index()
+        if self._total <= self.max_bytes:
+            return
+        while entries and self._total > self.max_bytes:
+            key, size = entries.popitem(last=False)
+            self._total -= size
+            self._unlink(key)
+        logger.info("Cache de respostas reduzido para %s bytes.", self._total)
+
+    def _index(self) -> OrderedDict[str, int]:
+        """Entry sizes in LRU order, scanned from disk on first use."""
+        if self._entries is None:
+            sizes: dict[str, int] = {}
+            used: dict[str, float] = {}
+            for path in self.directory.glob("*/*"):
+                if path.name.startswith("."):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                key = path.name.split(".", 1)[0]
+                sizes[key] = sizes.get(key, 0) + stat.st_size
+                used[key] = max(used.get(key, 0.0), stat.st_mtime)
+            self._entries = OrderedDict(
+                (key, sizes[key]) for key in sorted(sizes, key=used.__getitem__)
+            )
+            self._total = sum(sizes.values())
+        return self._entries
+
+    def _touch(self, key: str, meta_path: Path) -> None:
+        try:
+            os.utime(meta_path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._entries is not None and key in self._entries:
+                self._entries.move_to_end(key)
+
+    def _forget(self, key: str) -> None:
+        if self._entries is not None:
+            self._total -= self._entries.pop(key, 0)
+        self._unlink(key)
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        bucket = self.directory / key[:2]
+        return bucket / f"{key}.json", bucket / f"{key}.xml.gz"
+
+    def _unlink(self, key: str) -> None:
+        for path in self._paths(key):
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(
+            f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+
+def _parse_ttls(value: str) -> dict[str, float]:
+    ttls: dict[str, float] = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        name, ttl = item.split("=", 1)
+        ttls[name.strip()] = float(ttl)
+    return ttls
+
+
+def build_response_cache(env: Mapping[str, str] = ENV) -> Optional[ResponseCache]:
+    """Factory enabled when ``RM_CACHE_DIR`` is set."""
+    directory = env.get("RM_CACHE_DIR")
+    if not directory:
+        return None
+    return ResponseCache(
+        Path(directory),
+        default_ttl=float(env.get("RM_CACHE_TTL", 3600)),
+        ttls=_parse_ttls(env.get("RM_CACHE_TTLS", "")),
+        negative_ttl=float(env.get("RM_CACHE_NEGATIVE_TTL", 60)),
+        max_bytes=int(float(env.get("RM_CACHE_MAX_MB", 512)) * 1024 * 1024),
+    )
@@ -2,17 +2,37 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Mapping, Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, Mapping, Optional, Union
 
 from xml.sax.saxutils import escape
 
-from requests import Session
+from requests import Response, Session
 from requests.auth import HTTPBasicAuth
-from requests.exceptions import RequestException
+from requests.exceptions import (
+    ChunkedEncodingError,
+    ConnectionError,
+    ContentDecodingError,
+    RequestException,
+    Timeout,
+)
 
 from app.config import ENV
 from app.logging import logger
+from .cache import ResponseCache, build_response_cache
+from .limiter import AdaptiveConcurrencyLimiter, build_limiter
+from .metrics import METRICS
+from .policy import CallPolicy, LatencyTracker
+from .transport import CallStats, TransportConfig
+
+TimeoutType = Union[float, tuple[float, float], None]
+
+# Failures worth another attempt: the calls are read-only, so a dropped
+# connection or a truncated/corrupt body is simply requested again.
+RETRYABLE_ERRORS = (ConnectionError, Timeout, ChunkedEncodingError, ContentDecodingError)
 
 
 @dataclass(frozen=True)
@@ -23,6 +43,7 @@ class SoapOperation:
     endpoint: str
     soap_action: str
     envelope_template: str
+    policy: CallPolicy = field(default_factory=CallPolicy)
 
     def build_envelope(self, **payload: Any) -> str:
         return self.envelope_template.format(**payload)
@@ -77,12 +98,35 @@ class SoapClient:
         session: Optional[Session] = None,
         auth: Optional[HTTPBasicAuth] = None,
         default_headers: Optional[dict[str, str]] = None,
+        transport: Optional[TransportConfig] = None,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
     ) -> None:
-        self.session = session or Session()
+        self.transport = transport or TransportConfig()
+        self.limiter = limiter
+        self.session = session or self.transport.build_session()
         self.auth = auth
         self.default_headers = default_headers or {
             "Content-Type": "text/xml; charset=utf-8",
         }
+        self._local = threading.local()
+        self._latencies: dict[tuple[str, Optional[str]], LatencyTracker] = {}
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def last_stats(self) -> Optional[CallStats]:
+        """Stats of the last call made by the current thread."""
+        return getattr(self._local, "last_stats", None)
+
+    @last_stats.setter
+    def last_stats(self, stats: Optional[CallStats]) -> None:
+        self._local.last_stats = stats
+
+    def close(self) -> None:
+        """Release pooled connections and the hedging worker threads."""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+        self.session.close()
 
     def call(
         self,
@@ -90,33 +134,34 @@ class SoapClient:
         payload: str,
         *,
         extra_headers: Optional[dict[str, str]] = None,
-        timeout: Optional[float] = None,
+        timeout: TimeoutType = None,
+        sentence: Optional[str] = None,
     ) -> str | None:
-        headers = {**self.default_headers, **(extra_headers or {})}
-        headers["SOAPAction"] = operation.soap_action
+        """Post the envelope applying the operation ``CallPolicy``.
+
+        An explicit ``timeout`` can only shorten the policy connect/read
+        timeouts, which are capped by the remaining deadline. ``sentence``
+        (the RM ``codSentenca``) keeps separate latency statistics per query,
+        so cheap sentences do not set the hedging delay of expensive ones.
+        """
+        body, headers = self._prepare_request(operation, payload, extra_headers)
 
         logger.info("Chamando operação SOAP %s", operation.name)
         logger.debug("Envelope SOAP enviado:\n%s", payload)
 
-        try:
-            response = self.session.post(
-                operation.endpoint,
-                data=payload.encode("utf-8"),
-                headers=headers,
-                auth=self.auth,
+        with METRICS.span("http", operation=operation.name) as span:
+            response = self._post_with_policy(
+                operation,
+                body,
+                headers,
                 timeout=timeout,
+                sentence=sentence,
             )
-        except RequestException as exc:
-            logger.error(
-                "Falha ao executar operação SOAP %s: %s",
-                operation.name,
-                exc,
-                exc_info=True,
-            )
-            raise
+            span.record(bytes=len(response.content))
 
         logger.info("Resposta HTTP %s %s", response.status_code, response.reason)
         logger.debug("Headers de resposta: %s", response.headers)
+        self._record_stats(operation, len(body), response, len(response.content))
 
         if not response.content:
             logger.warning(
@@ -128,6 +173,322 @@ class SoapClient:
         logger.debug("Payload de resposta:\n%s", response.text)
         return response.text
 
+    def stream(
+        self,
+        operation: SoapOperation,
+        payload: str,
+        *,
+        extra_headers: Optional[dict[str, str]] = None,
+        timeout: TimeoutType = None,
+        chunk_size: int = 64 * 1024,
+        sentence: Optional[str] = None,
+    ) -> Iterator[bytes]:
+        """Yield the raw response body in chunks instead of buffering it.
+
+        Retries only cover establishing the response; hedging is not applied.
+        A body cut off mid-stream (``ChunkedEncodingError`` or a read timeout
+        while iterating) is raised to the caller without a retry, because the
+        chunks already yielded cannot be taken back. Callers that need the
+        retry policy for the whole body should use ``call`` or restart the
+        stream themselves.
+        """
+        body, headers = self._prepare_request(operation, payload, extra_headers)
+
+        logger.info("Chamando operação SOAP %s (streaming)", operation.name)
+        logger.debug("Envelope SOAP enviado:\n%s", payload)
+
+        response = self._post_with_policy(
+            operation,
+            body,
+            headers,
+            timeout=timeout,
+            stream=True,
+            sentence=sentence,
+        )
+
+        logger.info("Resposta HTTP %s %s", response.status_code, response.reason)
+        logger.debug("Headers de resposta: %s", response.headers)
+
+        with response:
+            received = 0
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    received += len(chunk)
+                    yield chunk
+            self._record_stats(operation, len(body), response, received)
+
+        if not received:
+            logger.warning(
+                "Resposta vazia recebida para a operação %s.",
+                operation.name,
+            )
+
+    def _post_with_policy(
+        self,
+        operation: SoapOperation,
+        body: bytes,
+        headers: dict[str, str],
+        *,
+        timeout: TimeoutType,
+        stream: bool = False,
+        sentence: Optional[str] = None,
+    ) -> Response:
+        policy = operation.policy
+        started = time.monotonic()
+        deadline = None if policy.deadline is None else started + policy.deadline
+        attempts = policy.attempts
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = None
+            if policy.deadline is not None:
+                remaining = policy.deadline - (time.monotonic() - started)
+            attempt_timeout = _shortest_timeout(timeout, policy.timeout_for(remaining))
+
+            try:
+                if stream:
+                    response = self._send(
+                        operation,
+                        body,
+                        headers,
+                        attempt_timeout,
+                        sentence,
+                        deadline,
+                        stream=True,
+                    )
+                else:
+                    response = self._send_hedged(
+                        operation, body, headers, attempt_timeout, sentence, deadline
+                    )
+            except RETRYABLE_ERRORS as exc:
+                if not self._can_retry(policy, attempt, started):
+                    logger.error(
+                        "Falha ao executar operação SOAP %s: %s",
+                        operation.name,
+                        exc,
+                        exc_info=True,
+                    )
+                    raise
+                logger.warning(
+                    "Tentativa %s/%s da operação %s falhou: %s",
+                    attempt,
+                    attempts,
+                    operation.name,
+                    exc,
+                )
+            except RequestException as exc:
+                logger.error(
+                    "Falha ao executar operação SOAP %s: %s",
+                    operation.name,
+                    exc,
+                    exc_info=True,
+                )
+                raise
+            else:
+                if response.status_code not in policy.retry_statuses or not (
+                    self._can_retry(policy, attempt, started)
+                ):
+                    return response
+                logger.warning(
+                    "Tentativa %s/%s da operação %s recebeu HTTP %s.",
+                    attempt,
+                    attempts,
+                    operation.name,
+                    response.status_code,
+                )
+                response.close()
+
+            time.sleep(self._retry_delay(policy, attempt, started))
+
+    def _can_retry(self, policy: CallPolicy, attempt: int, started: float) -> bool:
+        if attempt >= policy.attempts:
+            return False
+        if policy.deadline is None:
+            return True
+        return time.monotonic() - started < policy.deadline
+
+    def _retry_delay(self, policy: CallPolicy, attempt: int, started: float) -> float:
+        delay = policy.backoff(attempt)
+        if policy.deadline is not None:
+            remaining = policy.deadline - (time.monotonic() - started)
+            delay = min(delay, max(remaining, 0.0))
+        return delay
+
+    def _send(
+        self,
+        operation: SoapOperation,
+        body: bytes,
+        headers: dict[str, str],
+        timeout: TimeoutType,
+        sentence: Optional[str],
+        deadline: Optional[float] = None,
+        *,
+        stream: bool = False,
+    ) -> Response:
+        if self.limiter is None:
+            return self._post(operation, body, headers, timeout, sentence, stream=stream)
+
+        with self.limiter.acquire(
+            operation.name,
+            latency_key=sentence,
+            deadline=deadline,
+        ) as slot:
+            response = self._post(operation, body, headers, timeout, sentence, stream=stream)
+            slot.failed = response.status_code in operation.policy.retry_statuses
+            return response
+
+    def _post(
+        self,
+        operation: SoapOperation,
+        body: bytes,
+        headers: dict[str, str],
+        timeout: TimeoutType,
+        sentence: Optional[str],
+        *,
+        stream: bool,
+    ) -> Response:
+        started = time.monotonic()
+        response = self.session.post(
+            operation.endpoint,
+            data=body,
+            headers=headers,
+            auth=self.auth,
+            timeout=timeout,
+            stream=stream,
+        )
+        if not stream:
+            self._latency_tracker(operation, sentence).record(time.monotonic() - started)
+        return response
+
+    def _send_hedged(
+        self,
+        operation: SoapOperation,
+        body: bytes,
+        headers: dict[str, str],
+        timeout: TimeoutType,
+        sentence: Optional[str],
+        deadline: Optional[float] = None,
+    ) -> Response:
+        delay = self._latency_tracker(operation, sentence).hedge_delay(operation.policy)
+        args = (operation, body, headers, timeout, sentence, deadline)
+        if delay is None:
+            return self._send(*args)
+
+        executor = self._get_hedge_executor()
+        primary = executor.submit(self._send, *args)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        logger.info(
+            "Operação %s excedeu %.2fs; enviando requisição de hedge.",
+            operation.name,
+            delay,
+        )
+        hedge = executor.submit(self._send, *args)
+        pending: set[Future[Response]] = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.add_done_callback(_close_response)
+                    return future.result()
+                error = future.exception()
+        assert error is not None
+        raise error
+
+    def _latency_tracker(
+        self,
+        operation: SoapOperation,
+        sentence: Optional[str],
+    ) -> LatencyTracker:
+        key = (operation.name, sentence)
+        tracker = self._latencies.get(key)
+        if tracker is None:
+            tracker = self._latencies.setdefault(key, LatencyTracker())
+        return tracker
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=self.transport.pool_maxsize,
+                thread_name_prefix="soap-hedge",
+            )
+        return self._hedge_executor
+
+    def _prepare_request(
+        self,
+        operation: SoapOperation,
+        payload: str,
+        extra_headers: Optional[dict[str, str]],
+    ) -> tuple[bytes, dict[str, str]]:
+        body, encoding_headers = self.transport.encode_body(payload.encode("utf-8"))
+        headers = {
+            **self.transport.request_headers(),
+            **self.default_headers,
+            **encoding_headers,
+            **(extra_headers or {}),
+        }
+        headers["SOAPAction"] = operation.soap_action
+        return body, headers
+
+    def _record_stats(
+        self,
+        operation: SoapOperation,
+        bytes_sent: int,
+        response: Response,
+        bytes_decoded: int,
+    ) -> None:
+        stats = CallStats.from_response(
+            operation.name,
+            bytes_sent,
+            response,
+            bytes_decoded,
+        )
+        self.last_stats = stats
+        logger.info(
+            "Bytes trafegados em %s: enviados=%s recebidos=%s descompactados=%s (%s)",
+            operation.name,
+            stats.bytes_sent,
+            stats.bytes_received,
+            stats.bytes_decoded,
+            stats.content_encoding or "sem compressão",
+        )
+
+
+def _shortest_timeout(
+    explicit: TimeoutType,
+    policy_timeout: tuple[float, float],
+) -> tuple[float, float]:
+    """Combine a caller timeout with the policy one, keeping the smaller of each."""
+    if explicit is None:
+        return policy_timeout
+    connect, read = explicit if isinstance(explicit, tuple) else (explicit, explicit)
+    return min(connect, policy_timeout[0]), min(read, policy_timeout[1])
+
+
+def _close_response(future: Future[Response]) -> None:
+    if future.exception() is None:
+        future.result().close()
+
+
+def partition_parameters_for(
+    parameters: Optional[Mapping[str, Any]],
+    partition_key: Optional[str],
+    partition: Any,
+) -> dict[str, Any]:
+    """Merge a partition value into the sentence parameters."""
+    merged = dict(parameters or {})
+    if isinstance(partition, Mapping):
+        merged.update(partition)
+    elif partition_key:
+        merged[partition_key] = partition
+    else:
+        raise ValueError("partition_key é obrigatório para partições escalares.")
+    return merged
+
 
 class RMQueryService:
     """Facade to execute RM SQL queries via SOAP."""
@@ -137,10 +498,15 @@ class RMQueryService:
         client: SoapClient,
         builder: SoapEnvelopeBuilder,
         operation: SoapOperation,
+        cache: Optional[ResponseCache] = None,
     ) -> None:
         self.client = client
         self.builder = builder
         self.operation = operation
+        self.cache = cache
+
+    def close(self) -> None:
+        self.client.close()
 
     def execute(
         self,
@@ -149,8 +515,118 @@ class RMQueryService:
         cod_coligada: str = "0",
         cod_sistema: str = "G",
         parameters: Any = None,
-        timeout: Optional[float] = None,
+        timeout: TimeoutType = None,
+        use_cache: bool = True,
+        refresh: bool = False,
     ) -> str | None:
+        """Run the sentence, serving it from the response cache when possible.
+
+        ``use_cache=False`` bypasses the cache entirely; ``refresh=True`` skips
+        the lookup but stores the fresh response.
+        """
+        cache_key = None
+        if self.cache is not None and use_cache:
+            cache_key = self.cache.make_key(
+                self.operation.name,
+                cod_sentenca,
+                cod_coligada,
+                cod_sistema,
+                self.builder.serializer.serialize(parameters),
+            )
+            if not refresh:
+                entry = self.cache.get(cache_key)
+                if entry is not None:
+                    logger.info(
+                        "Consulta %s atendida pelo cache (%s).",
+                        cod_sentenca,
+                        entry.kind,
+                    )
+                    return entry.payload
+
+        envelope = self.builder.build(
+            self.operation,
+            cod_sentenca=cod_sentenca,
+            cod_coligada=cod_coligada,
+            cod_sistema=cod_sistema,
+            parameters=parameters,
+        )
+        payload = self.client.call(
+            self.operation,
+            envelope,
+            timeout=timeout,
+            sentence=cod_sentenca,
+        )
+        if cache_key is not None:
+            stats = self.client.last_stats
+            self.cache.put(
+                cache_key,
+                payload,
+                cod_sentenca=cod_sentenca,
+                status_code=stats.status_code if stats is not None else None,
+            )
+        return payload
+
+    def execute_partitioned(
+        self,
+        cod_sentenca: str,
+        partitions: Iterable[Any],
+        *,
+        partition_key: Optional[str] = None,
+        cod_coligada: str = "0",
+        cod_sistema: str = "G",
+        parameters: Optional[Mapping[str, Any]] = None,
+        timeout: TimeoutType = None,
+        max_workers: int = 4,
+        refresh: bool = False,
+    ) -> list[str | None]:
+        """Run the sentence once per partition, concurrently, in partition order.
+
+        Each partition is either a mapping merged into ``parameters`` (e.g. a
+        ``CHAPA_INI``/``CHAPA_FIM`` range) or a single value bound to
+        ``partition_key`` (e.g. each ``CODCOLIGADA``).
+        """
+        partition_parameters = [
+            partition_parameters_for(parameters, partition_key, partition)
+            for partition in partitions
+        ]
+        if not partition_parameters:
+            return []
+
+        logger.info(
+            "Executando %s em %s partições (até %s simultâneas).",
+            cod_sentenca,
+            len(partition_parameters),
+            max_workers,
+        )
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(partition_parameters))),
+            thread_name_prefix="rm-partition",
+        ) as executor:
+            return list(
+                executor.map(
+                    lambda partition: self.execute(
+                        cod_sentenca,
+                        cod_coligada=cod_coligada,
+                        cod_sistema=cod_sistema,
+                        parameters=partition,
+                        timeout=timeout,
+                        refresh=refresh,
+                    ),
+                    partition_parameters,
+                )
+            )
+
+    def execute_stream(
+        self,
+        cod_sentenca: str,
+        *,
+        cod_coligada: str = "0",
+        cod_sistema: str = "G",
+        parameters: Any = None,
+        timeout: TimeoutType = None,
+        chunk_size: int = 64 * 1024,
+    ) -> Iterator[bytes]:
+        """Same as ``execute`` but yields the SOAP response in raw chunks."""
         envelope = self.builder.build(
             self.operation,
             cod_sentenca=cod_sentenca,
@@ -158,18 +634,26 @@ class RMQueryService:
             cod_sistema=cod_sistema,
             parameters=parameters,
         )
-        return self.client.call(
+        return self.client.stream(
             self.operation,
             envelope,
             timeout=timeout,
+            chunk_size=chunk_size,
+            sentence=cod_sentenca,
         )
 
 
-def build_rm_service() -> RMQueryService:
+def build_rm_service(
+    transport: Optional[TransportConfig] = None,
+    *,
+    endpoint: Optional[str] = None,
+    user: Optional[str] = None,
+    password: Optional[str] = None,
+) -> RMQueryService:
     """Factory for a SOAP RM query service configured via environment variables."""
     operation = SoapOperation(
         name="RealizarConsultaSQL",
-        endpoint=ENV["SOAP_ACTION_ENDPOINT"],
+        endpoint=endpoint or ENV["SOAP_ACTION_ENDPOINT"],
         soap_action="http://www.totvs.com/IwsConsultaSQL/RealizarConsultaSQL",
         envelope_template="""<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:tot="http://www.totvs.com/">
    <soapenv:Header/>
@@ -183,11 +667,19 @@ def build_rm_service() -> RMQueryService:
    </soapenv:Body>
 </soapenv:Envelope>
 """,
+        policy=CallPolicy.from_env(),
     )
 
     client = SoapClient(
-        auth=HTTPBasicAuth(ENV["USER"], ENV["PASSWORD"]),
+        auth=HTTPBasicAuth(user or ENV["USER"], password or ENV["PASSWORD"]),
+        transport=transport or TransportConfig.from_env(),
+        limiter=build_limiter(),
     )
     builder = SoapEnvelopeBuilder()
-    return RMQueryService(client=client, builder=builder, operation=operation)
+    return RMQueryService(
+        client=client,
+        builder=builder,
+        operation=operation,
+        cache=build_response_cache(),
+    )
 
@@ -0,0 +1,265 @@
+"""Row-level change detection between consecutive extracts of a query."""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.config import ENV
+from app.logging import logger
+
+
+@dataclass(frozen=True)
+class DeltaResult:
+    """Rows inserted, updated and deleted since the previous snapshot.
+
+    ``deleted`` only carries the key columns, since the snapshot keeps a hash
+    of each row instead of its values.
+    """
+
+    inserted: pd.DataFrame
+    updated: pd.DataFrame
+    deleted: pd.DataFrame
+    snapshot: "SnapshotIndex"
+    first_run: bool = False
+
+    def outputs(self) -> dict[str, pd.DataFrame]:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "deleted": self.deleted,
+        }
+
+    @property
+    def changed(self) -> int:
+        return len(self.inserted) + len(self.updated) + len(self.deleted)
+
+
+@dataclass(frozen=True)
+class SnapshotIndex:
+    """Primary key values and a 64-bit hash of every row of an extract."""
+
+    key_columns: tuple[str, ...]
+    keys: dict[str, np.ndarray]
+    key_hashes: np.ndarray
+    row_hashes: np.ndarray
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        dataframe: pd.DataFrame,
+        key_columns: Sequence[str],
+    ) -> "SnapshotIndex":
+        key_columns = tuple(key_columns)
+        missing = [column for column in key_columns if column not in dataframe.columns]
+        if missing:
+            raise KeyError(f"Colunas de chave ausentes no resultado: {', '.join(missing)}")
+
+        keys = dataframe[list(key_columns)].fillna("").astype(str)
+        return cls(
+            key_columns=key_columns,
+            keys={column: keys[column].to_numpy(dtype=str) for column in key_columns},
+            key_hashes=pd.util.hash_pandas_object(keys, index=False).to_numpy(),
+            row_hashes=_row_hashes(dataframe),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "SnapshotIndex":
+        with np.load(path, allow_pickle=False) as data:
+            key_columns = tuple(str(column) for column in data["key_columns"])
+            return cls(
+                key_columns=key_columns,
+                keys={
+                    column: data[f"key_{position}"]
+                    for position, column in enumerate(key_columns)
+                },
+                key_hashes=data["key_hashes"],
+                row_hashes=data["row_hashes"],
+            )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(
+            f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        arrays = {
+            f"key_{position}": self.keys[column]
+            for position, column in enumerate(self.key_columns)
+        }
+        with open(tmp_path, "wb") as handle:
+            np.savez_compressed(
+                handle,
+                key_columns=np.array(self.key_columns, dtype=str),
+                key_hashes=self.key_hashes,
+                row_hashes=self.row_hashes,
+                **arrays,
+            )
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.key_hashes)
+
+
+def _row_hashes(dataframe: pd.DataFrame) -> np.ndarray:
+    # Sorted column order so a reordered SELECT does not mark every row updated.
+    columns = sorted(dataframe.columns, key=str)
+    values = dataframe[columns].fillna("").astype(str)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+class DeltaTracker:
+    """Compare each extract with the snapshot index saved by the previous run.
+
+    ``keys`` maps query names to their primary key columns (RM column names);
+    queries without an entry use ``default_key``.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        keys: Optional[Mapping[str, Sequence[str]]] = None,
+        default_key: Sequence[str] = (),
+    ) -> None:
+        self.directory = directory
+        self.keys = {name: tuple(columns) for name, columns in (keys or {}).items()}
+        self.default_key = tuple(default_key)
+
+    def key_for(self, query_name: str) -> tuple[str, ...]:
+        key_columns = self.keys.get(query_name, self.default_key)
+        if not key_columns:
+            raise ValueError(f"Nenhuma chave primária configurada para {query_name}.")
+        return key_columns
+
+    def snapshot_path(self, query_name: str) -> Path:
+        safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", query_name.strip()) or "consulta"
+        return self.directory / f"{safe_name}.snapshot.npz"
+
+    def diff(
+        self,
+        query_name: str,
+        dataframe: pd.DataFrame,
+        *,
+        commit: bool = True,
+    ) -> DeltaResult:
+        """Return the changes against the last snapshot and, by default, replace it."""
+        key_columns = self.key_for(query_name)
+        current = SnapshotIndex.from_dataframe(dataframe, key_columns)
+        duplicated = pd.Index(current.key_hashes).duplicated(keep="last")
+        if duplicated.any():
+            logger.warning(
+                "%s linhas com chave repetida em %s; mantida a última ocorrência.",
+                int(duplicated.sum()),
+                query_name,
+            )
+            dataframe = dataframe.loc[~duplicated]
+            current = SnapshotIndex.from_dataframe(dataframe, key_columns)
+
+        previous = self._load(query_name, key_columns)
+        if previous is None:
+            result = DeltaResult(
+                inserted=dataframe.reset_index(drop=True),
+                updated=dataframe.iloc[:0],
+                deleted=pd.DataFrame(columns=list(key_columns)),
+                snapshot=current,
+                first_run=True,
+            )
+        else:
+            result = self._compare(dataframe, current, previous)
+
+        if commit:
+            self.commit(query_name, result)
+        logger.info(
+            "Delta de %s: %s inseridas, %s alteradas, %s removidas.",
+            query_name,
+            len(result.inserted),
+            len(result.updated),
+            len(result.deleted),
+        )
+        return result
+
+    def _load(
+        self,
+        query_name: str,
+        key_columns: tuple[str, ...],
+    ) -> Optional[SnapshotIndex]:
+        path = self.snapshot_path(query_name)
+        try:
+            previous = SnapshotIndex.load(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("Snapshot %s ilegível, ignorado: %s", path, exc)
+            return None
+        if previous.key_columns != key_columns:
+            logger.warning(
+                "Chave de %s mudou (%s -> %s); snapshot anterior ignorado.",
+                query_name,
+                ",".join(previous.key_columns),
+                ",".join(key_columns),
+            )
+            return None
+        return previous
+
+    def commit(self, query_name: str, result: DeltaResult) -> None:
+        """Make the extract behind ``result`` the baseline of the next diff."""
+        result.snapshot.save(self.snapshot_path(query_name))
+
+    @staticmethod
+    def _compare(
+        dataframe: pd.DataFrame,
+        current: SnapshotIndex,
+        previous: SnapshotIndex,
+    ) -> DeltaResult:
+        previous_index = pd.Index(previous.key_hashes)
+        unique = ~previous_index.duplicated(keep="last")
+        previous_index = previous_index[unique]
+        previous_rows = previous.row_hashes[unique]
+
+        positions = previous_index.get_indexer(current.key_hashes)
+        existing = positions >= 0
+        inserted = ~existing
+        updated = existing & (previous_rows[positions] != current.row_hashes)
+        deleted = ~previous_index.isin(current.key_hashes)
+
+        deleted_keys = pd.DataFrame(
+            {column: values[unique][deleted] for column, values in previous.keys.items()}
+        )
+        return DeltaResult(
+            inserted=dataframe.loc[inserted].reset_index(drop=True),
+            updated=dataframe.loc[updated].reset_index(drop=True),
+            deleted=deleted_keys,
+            snapshot=current,
+        )
+
+
+def _parse_keys(value: str) -> dict[str, tuple[str, ...]]:
+    keys: dict[str, tuple[str, ...]] = {}
+    for item in value.split(";"):
+        if "=" not in item:
+            continue
+        name, columns = item.split("=", 1)
+        keys[name.strip()] = tuple(
+            column.strip() for column in columns.split(",") if column.strip()
+        )
+    return keys
+
+
+def build_delta_tracker(env: Mapping[str, str] = ENV) -> Optional[DeltaTracker]:
+    """Factory enabled when ``DELTA_DIR`` is set."""
+    directory = env.get("DELTA_DIR")
+    if not directory:
+        return None
+    default_key = env.get("DELTA_DEFAULT_KEY", "")
+    return DeltaTracker(
+        Path(directory),
+        keys=_parse_keys(env.get("DELTA_KEYS", "")),
+        default_key=[column.strip() for column in default_key.split(",") if column.strip()],
+    )
@@ -0,0 +1,403 @@
+"""Exporters that persist the DataFrames produced by the ETL pipeline."""
+
+from __future__ import annotations
+
+import codecs
+import gzip
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Mapping, Optional, Protocol
+
+import pandas as pd
+
+from app.config import ENV
+from app.logging import logger
+from .metrics import METRICS
+from .parser import DatasetDataFrameBuilder
+
+try:  # pragma: no cover - depends on the environment
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+
+try:  # pragma: no cover - depends on the environment
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+COMPRESSION_EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+
+def output_path(directory: Path, query_name: str, extension: str) -> Path:
+    """Return ``directory/<query_name>.<extension>`` with a filesystem-safe name."""
+    safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", query_name.strip())
+    safe_name = safe_name.strip("._") or "consulta"
+    return directory / f"{safe_name}.{extension}"
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _write_atomic(path: Path, write: Callable[[Path], None]) -> int:
+    """Run ``write`` on a temporary file, move it over ``path``, return its size."""
+    tmp_path = _tmp_path(path)
+    try:
+        write(tmp_path)
+        size = tmp_path.stat().st_size
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return size
+
+
+def _require_pyarrow(export_format: str) -> None:
+    if pa is None:
+        raise ImportError(
+            f"Exportação em {export_format} requer o pacote pyarrow "
+            "(pip install pyarrow)."
+        )
+
+
+class DataFrameExporter(Protocol):
+    """Interface shared by the pipeline exporters."""
+
+    format: str
+    directory: Path
+
+    def export(self, dataframe: pd.DataFrame, query_name: str) -> Path: ...
+
+
+@dataclass(frozen=True)
+class ExportStats:
+    """Rows and bytes written by an export."""
+
+    path: Path
+    rows: int
+    bytes_written: int
+    bytes_uncompressed: int
+
+
+class StreamingCSVWriter:
+    """Write DataFrame batches to a CSV file through a bounded buffer.
+
+    Rows go to a temporary file in the target directory, optionally gzip or
+    zstd compressed, which is renamed over ``path`` only by ``commit``. A
+    crash or ``abort`` leaves any previous file at ``path`` untouched. The
+    header comes from the first batch; later batches are aligned to it.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        encoding: str = "utf-8-sig",
+        include_index: bool = False,
+        compression: Optional[str] = None,
+        chunk_rows: int = 10000,
+        buffer_size: int = 1024 * 1024,
+    ) -> None:
+        self.path = path
+        self.include_index = include_index
+        self.chunk_rows = max(1, chunk_rows)
+        self.rows = 0
+        self.bytes_uncompressed = 0
+        self._columns: Optional[pd.Index] = None
+        self._header_written = False
+        self._encoder = codecs.getincrementalencoder(encoding)()
+        self._tmp_path = _tmp_path(path)
+        self._raw = open(self._tmp_path, "wb", buffering=buffer_size)
+        try:
+            self._stream = self._open_stream(self._raw, compression)
+        except BaseException:
+            # Unknown codec or missing zstandard: leave no stray .tmp behind.
+            self._raw.close()
+            self._tmp_path.unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _open_stream(raw: BinaryIO, compression: Optional[str]) -> BinaryIO:
+        if not compression:
+            return raw
+        if compression == "gzip":
+            return gzip.GzipFile(filename="", fileobj=raw, mode="wb", compresslevel=6)
+        if compression == "zstd":
+            if zstandard is None:
+                raise ImportError(
+                    "Compressão zstd requer o pacote zstandard (pip install zstandard)."
+                )
+            return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+        raise ValueError(f"Compressão de exportação não suportada: {compression}")
+
+    def write(self, dataframe: pd.DataFrame) -> None:
+        if self._columns is None:
+            self._columns = dataframe.columns
+        elif not dataframe.columns.equals(self._columns):
+            extra = dataframe.columns.difference(self._columns)
+            if len(extra):
+                logger.warning(
+                    "Colunas ausentes no cabeçalho do CSV foram descartadas: %s",
+                    ", ".join(map(str, extra)),
+                )
+            dataframe = dataframe.reindex(columns=self._columns)
+
+        if not self._header_written:
+            self._write_text(dataframe.iloc[:0].to_csv(index=self.include_index, sep=";"))
+            self._header_written = True
+
+        for start in range(0, len(dataframe), self.chunk_rows):
+            chunk = dataframe.iloc[start : start + self.chunk_rows]
+            if self.include_index and isinstance(chunk.index, pd.RangeIndex):
+                # Batches restart at 0; keep the index continuous across them.
+                chunk = chunk.set_axis(
+                    pd.RangeIndex(self.rows, self.rows + len(chunk)), axis=0
+                )
+            self._write_text(
+                chunk.to_csv(index=self.include_index, sep=";", header=False)
+            )
+            self.rows += len(chunk)
+
+    def _write_text(self, text: str) -> None:
+        data = self._encoder.encode(text)
+        self.bytes_uncompressed += len(data)
+        self._stream.write(data)
+
+    def commit(self) -> ExportStats:
+        """Flush everything to disk and move the file into place."""
+        self._stream.write(self._encoder.encode("", final=True))
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        bytes_written = self._tmp_path.stat().st_size
+        os.replace(self._tmp_path, self.path)
+        return ExportStats(
+            path=self.path,
+            rows=self.rows,
+            bytes_written=bytes_written,
+            bytes_uncompressed=self.bytes_uncompressed,
+        )
+
+    def abort(self) -> None:
+        """Discard the temporary file."""
+        try:
+            if self._stream is not self._raw:
+                self._stream.close()
+        finally:
+            self._raw.close()
+            self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "StreamingCSVWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is not None:
+            self.abort()
+
+
+class CSVExporter:
+    """Persist the DataFrame generated by the pipeline into a CSV file.
+
+    Exports are streamed in ``chunk_rows`` batches to a temporary file that is
+    renamed into place when complete. ``compression`` (``gzip`` or ``zstd``)
+    adds ``.gz``/``.zst`` to the file name.
+    """
+
+    format = "csv"
+    SAFE_FILENAME_PATTERN = DatasetDataFrameBuilder.ENCODED_NAME_PATTERN
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        encoding: str = "utf-8-sig",
+        include_index: bool = False,
+        compression: Optional[str] = None,
+        chunk_rows: int = 10000,
+    ) -> None:
+        self.directory = directory
+        self.encoding = encoding
+        self.include_index = include_index
+        self.compression = compression
+        self.chunk_rows = chunk_rows
+        self.last_stats: Optional[ExportStats] = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def export(self, dataframe: pd.DataFrame, query_name: str) -> Path:
+        return self.export_batches([dataframe], query_name)
+
+    def export_batches(
+        self,
+        batches: Iterable[pd.DataFrame],
+        query_name: str,
+    ) -> Path:
+        """Write batches as they are produced; the file appears only when done."""
+        with METRICS.span("export", format=self.format) as span:
+            with self.open_writer(query_name) as writer:
+                for batch in batches:
+                    writer.write(batch)
+                stats = writer.commit()
+            span.record(bytes=stats.bytes_written, rows=stats.rows)
+
+        self.last_stats = stats
+        logger.info(
+            "Resultado salvo em %s (%s linhas, %s bytes, %s bytes sem compressão)",
+            stats.path.resolve(),
+            stats.rows,
+            stats.bytes_written,
+            stats.bytes_uncompressed,
+        )
+        return stats.path
+
+    def open_writer(self, query_name: str) -> StreamingCSVWriter:
+        extension = self.format
+        if self.compression:
+            extension += "." + COMPRESSION_EXTENSIONS.get(
+                self.compression, self.compression
+            )
+        return StreamingCSVWriter(
+            output_path(self.directory, query_name, extension),
+            encoding=self.encoding,
+            include_index=self.include_index,
+            compression=self.compression,
+            chunk_rows=self.chunk_rows,
+        )
+
+
+class ParquetExporter:
+    """Persist the DataFrame as Parquet, keeping the column dtypes.
+
+    Like the CSV exports, the file is written aside and renamed into place.
+    """
+
+    format = "parquet"
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        compression: Optional[str] = "zstd",
+        include_index: bool = False,
+    ) -> None:
+        _require_pyarrow(self.format)
+        self.directory = directory
+        self.compression = compression
+        self.include_index = include_index
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def export(self, dataframe: pd.DataFrame, query_name: str) -> Path:
+        parquet_path = output_path(self.directory, query_name, self.format)
+        with METRICS.span("export", format=self.format) as span:
+            table = pa.Table.from_pandas(dataframe, preserve_index=self.include_index)
+            size = _write_atomic(
+                parquet_path,
+                lambda tmp: pq.write_table(table, tmp, compression=self.compression),
+            )
+            span.record(bytes=size, rows=len(dataframe))
+        logger.info("Resultado salvo em %s", parquet_path.resolve())
+        return parquet_path
+
+
+class ArrowIPCExporter:
+    """Persist the DataFrame as an Arrow IPC (Feather v2) file.
+
+    Like the CSV exports, the file is written aside and renamed into place.
+    """
+
+    format = "arrow"
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        compression: Optional[str] = "zstd",
+        include_index: bool = False,
+    ) -> None:
+        _require_pyarrow(self.format)
+        self.directory = directory
+        self.compression = compression or "uncompressed"
+        self.include_index = include_index
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def export(self, dataframe: pd.DataFrame, query_name: str) -> Path:
+        arrow_path = output_path(self.directory, query_name, self.format)
+        with METRICS.span("export", format=self.format) as span:
+            table = pa.Table.from_pandas(dataframe, preserve_index=self.include_index)
+            size = _write_atomic(
+                arrow_path,
+                lambda tmp: feather.write_feather(
+                    table, tmp, compression=self.compression
+                ),
+            )
+            span.record(bytes=size, rows=len(dataframe))
+        logger.info("Resultado salvo em %s", arrow_path.resolve())
+        return arrow_path
+
+
+def read_export(path: Path, *, encoding: str = "utf-8-sig") -> pd.DataFrame:
+    """Load a file written by one of the exporters, chosen by its extension."""
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        _require_pyarrow("parquet")
+        return pq.read_table(path).to_pandas()
+    if suffix == ".arrow":
+        _require_pyarrow("arrow")
+        return feather.read_table(path, memory_map=True).to_pandas()
+    return pd.read_csv(
+        path,
+        sep=";",
+        encoding=encoding,
+        dtype=str,
+        keep_default_na=False,
+        compression=_read_compression(path),
+    )
+
+
+def _read_compression(path: Path) -> Optional[str]:
+    suffix = path.suffix.lower()
+    if suffix == ".gz":
+        return "gzip"
+    if suffix == ".zst":
+        return "zstd"
+    return None
+
+
+def build_exporter(env: Mapping[str, str] = ENV) -> DataFrameExporter:
+    """Factory reading ``EXPORT_FORMAT`` (``csv``, ``parquet`` or ``arrow``)."""
+    export_format = env.get("EXPORT_FORMAT", "csv").strip().lower() or "csv"
+    directory = Path(env.get("CSV_OUTPUT_DIR", "consultas_csv"))
+    include_index = env.get("CSV_INCLUDE_INDEX", "false").lower() == "true"
+
+    if export_format == "csv":
+        csv_compression = env.get("CSV_COMPRESSION", "").strip().lower()
+        return CSVExporter(
+            directory=directory,
+            encoding=env.get("CSV_OUTPUT_ENCODING", "utf-8-sig"),
+            include_index=include_index,
+            compression=None if csv_compression in ("", "none") else csv_compression,
+            chunk_rows=int(env.get("CSV_CHUNK_ROWS", 10000)),
+        )
+
+    compression = env.get("EXPORT_COMPRESSION", "zstd").strip().lower()
+    if compression in ("", "none"):
+        compression = None
+    if export_format == "parquet":
+        return ParquetExporter(
+            directory,
+            compression=compression,
+            include_index=include_index,
+        )
+    if export_format in ("arrow", "feather", "ipc"):
+        return ArrowIPCExporter(
+            directory,
+            compression=compression,
+            include_index=include_index,
+        )
+    raise ValueError(f"EXPORT_FORMAT inválido: {export_format}")
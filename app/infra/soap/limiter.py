@@ -0,0 +1,367 @@
+"""Adaptive (AIMD) concurrency and rate limiting for calls to the RM server."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Mapping, Optional
+
+from app.config import ENV
+from app.logging import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+
+class LimiterTimeout(TimeoutError):
+    """No limiter slot became available before the caller's deadline."""
+
+
+@dataclass(frozen=True)
+class LimiterConfig:
+    """Bounds and tuning knobs of the AIMD limiter."""
+
+    initial_limit: float = 4.0
+    min_limit: float = 1.0
+    max_limit: float = 32.0
+    additive_increase: float = 1.0
+    multiplicative_decrease: float = 0.5
+    latency_tolerance: float = 2.0
+    error_threshold: float = 0.1
+    decrease_cooldown: float = 1.0
+    max_rate: Optional[float] = None
+    lease_seconds: float = 900.0
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str] = ENV) -> "LimiterConfig":
+        max_rate = env.get("RM_LIMITER_MAX_RATE")
+        return cls(
+            initial_limit=float(env.get("RM_LIMITER_INITIAL", cls.initial_limit)),
+            min_limit=float(env.get("RM_LIMITER_MIN", cls.min_limit)),
+            max_limit=float(env.get("RM_LIMITER_MAX", cls.max_limit)),
+            latency_tolerance=float(
+                env.get("RM_LIMITER_LATENCY_TOLERANCE", cls.latency_tolerance)
+            ),
+            error_threshold=float(
+                env.get("RM_LIMITER_ERROR_THRESHOLD", cls.error_threshold)
+            ),
+            max_rate=float(max_rate) if max_rate else None,
+        )
+
+
+def _new_state(config: LimiterConfig) -> dict[str, Any]:
+    return {
+        "limit": config.initial_limit,
+        "leases": {},
+        # Latency baseline per sentence: a slow query is not overload just
+        # because a fast one shares the limit.
+        "baselines": {},
+        "error_rate": 0.0,
+        "last_decrease": 0.0,
+        "next_slot": 0.0,
+    }
+
+
+def _try_lease(state: dict[str, Any], config: LimiterConfig, now: float) -> Optional[str]:
+    leases: dict[str, float] = state["leases"]
+    for token, expires in list(leases.items()):
+        if expires < now:
+            del leases[token]
+
+    if len(leases) >= int(state["limit"]):
+        return None
+    if config.max_rate and state["next_slot"] > now:
+        return None
+
+    token = uuid.uuid4().hex
+    leases[token] = now + config.lease_seconds
+    if config.max_rate:
+        state["next_slot"] = max(state["next_slot"], now) + 1.0 / config.max_rate
+    return token
+
+
+def _apply_outcome(
+    state: dict[str, Any],
+    config: LimiterConfig,
+    *,
+    latency: float,
+    failed: bool,
+    now: float,
+    latency_key: str = "",
+) -> None:
+    """Additive increase on healthy calls, multiplicative decrease on overload."""
+    baselines: dict[str, float] = state.setdefault("baselines", {})
+    baseline = baselines.get(latency_key)
+    if not failed:
+        # Minimum latency seen, drifting slowly upwards so it can recover.
+        baseline = latency if baseline is None else min(latency, baseline * 1.01)
+        baselines[latency_key] = baseline
+
+    state["error_rate"] = state["error_rate"] * 0.9 + (0.1 if failed else 0.0)
+    overloaded = (
+        failed
+        or state["error_rate"] > config.error_threshold
+        or (baseline is not None and latency > baseline * config.latency_tolerance)
+    )
+
+    limit = state["limit"]
+    if overloaded:
+        if now - state["last_decrease"] >= config.decrease_cooldown:
+            state["limit"] = max(config.min_limit, limit * config.multiplicative_decrease)
+            state["last_decrease"] = now
+    else:
+        state["limit"] = min(config.max_limit, limit + config.additive_increase / limit)
+
+
+class MemoryLimiterBackend:
+    """Limiter state kept in this process."""
+
+    def __init__(self) -> None:
+        self._states: dict[str, dict[str, Any]] = {}
+        self._condition = threading.Condition()
+
+    def try_acquire(
+        self,
+        key: str,
+        config: LimiterConfig,
+        *,
+        deadline: Optional[float] = None,
+    ) -> Optional[str]:
+        with self._condition:
+            state = self._states.setdefault(key, _new_state(config))
+            return _try_lease(state, config, time.time())
+
+    def release(
+        self,
+        key: str,
+        token: str,
+        config: LimiterConfig,
+        *,
+        latency: float,
+        failed: bool,
+        latency_key: str = "",
+    ) -> float:
+        with self._condition:
+            state = self._states.setdefault(key, _new_state(config))
+            state["leases"].pop(token, None)
+            _apply_outcome(
+                state,
+                config,
+                latency=latency,
+                failed=failed,
+                now=time.time(),
+                latency_key=latency_key,
+            )
+            self._condition.notify_all()
+            return state["limit"]
+
+    def wait(self, timeout: float) -> None:
+        with self._condition:
+            self._condition.wait(timeout)
+
+
+class FileLimiterBackend:
+    """Limiter state shared between processes through JSON files and a lock file.
+
+    The lock file is held with an OS advisory lock (``fcntl`` on POSIX,
+    ``msvcrt`` on Windows), which the system releases when the holder exits,
+    so there is no stale lock to steal. In-flight slots are leases with an
+    expiry, so a crashed process cannot hold capacity forever either.
+    """
+
+    LOCK_POLL_SECONDS = 0.005
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def try_acquire(
+        self,
+        key: str,
+        config: LimiterConfig,
+        *,
+        deadline: Optional[float] = None,
+    ) -> Optional[str]:
+        with self._locked_state(key, config, deadline=deadline) as state:
+            return _try_lease(state, config, time.time())
+
+    def release(
+        self,
+        key: str,
+        token: str,
+        config: LimiterConfig,
+        *,
+        latency: float,
+        failed: bool,
+        latency_key: str = "",
+    ) -> float:
+        with self._locked_state(key, config) as state:
+            state["leases"].pop(token, None)
+            _apply_outcome(
+                state,
+                config,
+                latency=latency,
+                failed=failed,
+                now=time.time(),
+                latency_key=latency_key,
+            )
+            return state["limit"]
+
+    def wait(self, timeout: float) -> None:
+        time.sleep(timeout)
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        safe_key = "".join(char if char.isalnum() else "_" for char in key)
+        return (
+            self.directory / f"{safe_key}.json",
+            self.directory / f"{safe_key}.lock",
+        )
+
+    @contextmanager
+    def _locked_state(
+        self,
+        key: str,
+        config: LimiterConfig,
+        *,
+        deadline: Optional[float] = None,
+    ) -> Iterator[dict[str, Any]]:
+        state_path, lock_path = self._paths(key)
+        fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+        try:
+            self._acquire_lock(fd, lock_path, deadline)
+            try:
+                try:
+                    state = json.loads(state_path.read_text(encoding="utf-8"))
+                except (FileNotFoundError, ValueError):
+                    state = _new_state(config)
+                yield state
+                tmp_path = state_path.with_suffix(
+                    f".{os.getpid()}.{threading.get_ident()}.tmp"
+                )
+                tmp_path.write_text(json.dumps(state), encoding="utf-8")
+                os.replace(tmp_path, state_path)
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def _acquire_lock(self, fd: int, lock_path: Path, deadline: Optional[float]) -> None:
+        while not _try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LimiterTimeout(f"Lock do limitador ocupado: {lock_path}")
+            time.sleep(self.LOCK_POLL_SECONDS)
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class AdaptiveConcurrencyLimiter:
+    """Bound in-flight requests per key, adapting the bound with AIMD.
+
+    Calls under one key share the limit, but latency is compared with the
+    baseline of their own ``latency_key`` (the sentence), so mixing fast and
+    slow sentences is not mistaken for overload.
+    """
+
+    def __init__(
+        self,
+        config: Optional[LimiterConfig] = None,
+        backend: MemoryLimiterBackend | FileLimiterBackend | None = None,
+        *,
+        poll_interval: float = 0.05,
+    ) -> None:
+        self.config = config or LimiterConfig()
+        self.backend = backend or MemoryLimiterBackend()
+        self.poll_interval = poll_interval
+
+    @contextmanager
+    def acquire(
+        self,
+        key: str,
+        *,
+        latency_key: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Iterator["LimiterSlot"]:
+        """Hold a slot for the ``with`` block.
+
+        ``deadline`` is a ``time.monotonic()`` instant; waiting past it raises
+        ``LimiterTimeout``.
+        """
+        token = self.backend.try_acquire(key, self.config, deadline=deadline)
+        while token is None:
+            wait = self.poll_interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LimiterTimeout(f"Sem vaga no limitador para {key}.")
+                wait = min(wait, remaining)
+            self.backend.wait(wait)
+            token = self.backend.try_acquire(key, self.config, deadline=deadline)
+
+        slot = LimiterSlot()
+        started = time.monotonic()
+        try:
+            yield slot
+        except BaseException:
+            slot.failed = True
+            raise
+        finally:
+            limit = self.backend.release(
+                key,
+                token,
+                self.config,
+                latency=time.monotonic() - started,
+                failed=slot.failed,
+                latency_key=latency_key or "",
+            )
+            logger.debug("Limite de concorrência para %s: %.2f", key, limit)
+
+
+class LimiterSlot:
+    """Handle yielded by ``acquire``; mark ``failed`` for overload responses."""
+
+    __slots__ = ("failed",)
+
+    def __init__(self) -> None:
+        self.failed = False
+
+
+def build_limiter(env: Mapping[str, str] = ENV) -> Optional[AdaptiveConcurrencyLimiter]:
+    """Factory reading ``RM_LIMITER`` (``off``, ``memory`` or ``file``)."""
+    mode = env.get("RM_LIMITER", "off").strip().lower()
+    if mode in ("", "off", "false", "0"):
+        return None
+
+    config = LimiterConfig.from_env(env)
+    if mode == "file":
+        directory = Path(env.get("RM_LIMITER_DIR", ".rm_limiter"))
+        return AdaptiveConcurrencyLimiter(config, FileLimiterBackend(directory))
+    if mode == "memory":
+        return AdaptiveConcurrencyLimiter(config, MemoryLimiterBackend())
+    raise ValueError(f"RM_LIMITER inválido: {mode}")
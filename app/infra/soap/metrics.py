@@ -0,0 +1,242 @@
+"""Per-stage timing of the RM pipeline, exportable as Prometheus text or JSON."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+from app.config import ENV
+
+# Upper bounds, in seconds, of the duration histogram buckets.
+DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+@dataclass
+class StageMetrics:
+    """Totals of every span recorded for one stage and label set."""
+
+    calls: int = 0
+    errors: int = 0
+    seconds_total: float = 0.0
+    seconds_max: float = 0.0
+    bytes_total: int = 0
+    rows_total: int = 0
+    buckets: list[int] = field(default_factory=lambda: [0] * len(DURATION_BUCKETS))
+
+    def observe(self, seconds: float, size: int, rows: int, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.seconds_total += seconds
+        self.seconds_max = max(self.seconds_max, seconds)
+        self.bytes_total += size
+        self.rows_total += rows
+        for position, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                self.buckets[position] += 1
+                break
+
+
+class Span:
+    """Times one execution of a stage; use as a context manager.
+
+    Call ``record`` inside the block to attach the bytes processed (characters
+    for text stages) and rows produced.
+    """
+
+    __slots__ = ("_registry", "_key", "_started", "bytes", "rows")
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        key: tuple[str, tuple[tuple[str, str], ...]],
+    ) -> None:
+        self._registry = registry
+        self._key = key
+        self._started = 0.0
+        self.bytes = 0
+        self.rows = 0
+
+    def record(self, *, bytes: int = 0, rows: int = 0) -> None:  # noqa: A002
+        self.bytes += bytes
+        self.rows += rows
+
+    def __enter__(self) -> "Span":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, *_exc: Any) -> None:
+        self._registry._observe(
+            self._key,
+            time.perf_counter() - self._started,
+            self.bytes,
+            self.rows,
+            exc_type is not None,
+        )
+
+
+class _NullSpan:
+    """Shared span returned while metrics are disabled; does nothing."""
+
+    __slots__ = ()
+
+    def record(self, *, bytes: int = 0, rows: int = 0) -> None:  # noqa: A002
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class MetricsRegistry:
+    """Collect stage spans in memory while ``enabled``.
+
+    Disabled registries hand out a shared no-op span, so an instrumented stage
+    costs one method call and an empty ``with`` block.
+    """
+
+    def __init__(self, *, enabled: bool = False, prefix: str = "rm") -> None:
+        self.enabled = enabled
+        self.prefix = prefix
+        self.started_at = datetime.now()
+        self._stages: dict[tuple[str, tuple[tuple[str, str], ...]], StageMetrics] = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage: str, **labels: str) -> Span | _NullSpan:
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, (stage, tuple(sorted(labels.items()))))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self.started_at = datetime.now()
+
+    def _observe(
+        self,
+        key: tuple[str, tuple[tuple[str, str], ...]],
+        seconds: float,
+        size: int,
+        rows: int,
+        failed: bool,
+    ) -> None:
+        with self._lock:
+            metrics = self._stages.get(key)
+            if metrics is None:
+                metrics = self._stages[key] = StageMetrics()
+            metrics.observe(seconds, size, rows, failed)
+
+    def snapshot(self) -> dict[tuple[str, tuple[tuple[str, str], ...]], StageMetrics]:
+        with self._lock:
+            return {
+                key: StageMetrics(
+                    calls=value.calls,
+                    errors=value.errors,
+                    seconds_total=value.seconds_total,
+                    seconds_max=value.seconds_max,
+                    bytes_total=value.bytes_total,
+                    rows_total=value.rows_total,
+                    buckets=list(value.buckets),
+                )
+                for key, value in self._stages.items()
+            }
+
+    def to_json(self) -> dict[str, Any]:
+        """Run report: one entry per stage with totals and mean duration."""
+        stages = []
+        for (stage, labels), metrics in sorted(self.snapshot().items()):
+            stages.append(
+                {
+                    "stage": stage,
+                    "labels": dict(labels),
+                    "calls": metrics.calls,
+                    "errors": metrics.errors,
+                    "seconds_total": round(metrics.seconds_total, 6),
+                    "seconds_mean": round(metrics.seconds_total / metrics.calls, 6),
+                    "seconds_max": round(metrics.seconds_max, 6),
+                    "bytes_total": metrics.bytes_total,
+                    "rows_total": metrics.rows_total,
+                }
+            )
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "stages": stages,
+        }
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        name = f"{self.prefix}_stage"
+        lines = [
+            f"# HELP {name}_duration_seconds Wall time of each pipeline stage.",
+            f"# TYPE {name}_duration_seconds histogram",
+        ]
+        snapshot = sorted(self.snapshot().items())
+        for (stage, labels), metrics in snapshot:
+            base = _labels({"stage": stage, **dict(labels)})
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, metrics.buckets):
+                cumulative += count
+                bucket = _labels({"stage": stage, **dict(labels), "le": f"{bound:g}"})
+                lines.append(f"{name}_duration_seconds_bucket{bucket} {cumulative}")
+            bucket = _labels({"stage": stage, **dict(labels), "le": "+Inf"})
+            lines.append(f"{name}_duration_seconds_bucket{bucket} {metrics.calls}")
+            lines.append(f"{name}_duration_seconds_sum{base} {metrics.seconds_total:.6f}")
+            lines.append(f"{name}_duration_seconds_count{base} {metrics.calls}")
+
+        for metric, help_text, attribute in (
+            ("bytes_total", "Bytes (or characters) processed by each stage.", "bytes_total"),
+            ("rows_total", "Rows produced by each stage.", "rows_total"),
+            ("errors_total", "Stage executions that raised an exception.", "errors"),
+        ):
+            lines.append(f"# HELP {name}_{metric} {help_text}")
+            lines.append(f"# TYPE {name}_{metric} counter")
+            for (stage, labels), metrics in snapshot:
+                base = _labels({"stage": stage, **dict(labels)})
+                lines.append(f"{name}_{metric}{base} {getattr(metrics, attribute)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> Path:
+        """Write the Prometheus text (``.prom``/``.txt``) or the JSON report."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix.lower() in (".prom", ".txt"):
+            path.write_text(self.to_prometheus(), encoding="utf-8")
+        else:
+            path.write_text(json.dumps(self.to_json(), indent=2), encoding="utf-8")
+        return path
+
+
+def _labels(labels: Mapping[str, str]) -> str:
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _enabled(env: Mapping[str, str]) -> bool:
+    if env.get("METRICS_OUTPUT"):
+        return True
+    return (env.get("METRICS") or "").strip().lower() in ("1", "true", "yes", "sim")
+
+
+METRICS = MetricsRegistry(enabled=_enabled(ENV))
+
+
+def write_metrics_report(env: Mapping[str, str] = ENV) -> Optional[Path]:
+    """Write ``METRICS`` to ``METRICS_OUTPUT`` when both are configured."""
+    output = env.get("METRICS_OUTPUT")
+    if not output or not METRICS.enabled:
+        return None
+    return METRICS.write(Path(output))
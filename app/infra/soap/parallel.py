@@ -0,0 +1,154 @@
+"""Offload SOAP decoding and DataFrame building to worker processes."""
+
+from __future__ import annotations
+
+import atexit
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+import pandas as pd
+
+from app.config import ENV
+from app.logging import logger
+
+try:  # pragma: no cover - depends on the environment
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+
+
+@dataclass(frozen=True)
+class ParsedDataset:
+    """Columnar parse result sent back by a worker process.
+
+    With pyarrow the rows travel as one Arrow IPC buffer instead of millions
+    of pickled strings. It is still copied on the way: pickling (protocol
+    below 5, the pool default) turns it into ``bytes``, and the result pipe
+    copies it again. The parent reads the IPC stream in place, but
+    ``to_dataframe`` builds new Python strings for the object columns.
+    Without pyarrow, ``columns`` holds one list per column.
+    """
+
+    rows: int = 0
+    arrow: Optional["pa.Buffer"] = None
+    columns: Optional[dict[str, list[Optional[str]]]] = None
+    fault_message: Optional[str] = None
+
+    def to_dataframe(self) -> pd.DataFrame:
+        if not self.rows:
+            return pd.DataFrame()
+        if self.arrow is not None:
+            with pa.ipc.open_stream(self.arrow) as reader:
+                return reader.read_all().to_pandas()
+        return pd.DataFrame(self.columns, index=pd.RangeIndex(self.rows))
+
+
+def parse_payload(
+    payload: bytes,
+    row_tag: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> ParsedDataset:
+    """Decode a SOAP response into columns; runs inside the worker processes."""
+    from .parser import DatasetDataFrameBuilder, DatasetNormalizer, SoapResponseParser
+    from .xml_backend import get_xml_backend
+
+    xml_backend = get_xml_backend(backend)
+    soap_parser = SoapResponseParser(xml_backend)
+    envelope = soap_parser.decode(payload.decode("utf-8"))
+    if envelope.fault_message:
+        return ParsedDataset(fault_message=envelope.fault_message)
+
+    dataset_root = DatasetNormalizer(xml_backend).parse(soap_parser.result_xml(envelope))
+    if dataset_root is None:
+        return ParsedDataset()
+
+    columns = DatasetDataFrameBuilder().to_columns(dataset_root, row_tag=row_tag)
+    rows = len(next(iter(columns.values()), []))
+    if not rows:
+        return ParsedDataset()
+    if pa is None:
+        return ParsedDataset(rows=rows, columns=columns)
+
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return ParsedDataset(rows=rows, arrow=sink.getvalue())
+
+
+class ParallelParser:
+    """Pool of worker processes running ``parse_payload``.
+
+    The pool starts on first use. Faults reported by the server are logged in
+    the calling process and produce an empty DataFrame, as in the in-process
+    path.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        payload: str | bytes,
+        *,
+        row_tag: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> Future[ParsedDataset]:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        return self._get_executor().submit(parse_payload, payload, row_tag, backend)
+
+    def parse(
+        self,
+        payload: str | bytes,
+        *,
+        query_name: str = "",
+        row_tag: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> pd.DataFrame:
+        future = self.submit(payload, row_tag=row_tag, backend=backend)
+        return self.result(future, query_name=query_name)
+
+    @staticmethod
+    def result(future: Future[ParsedDataset], *, query_name: str = "") -> pd.DataFrame:
+        parsed = future.result()
+        if parsed.fault_message:
+            logger.error(
+                "Consulta %s retornou Fault do servidor: %s",
+                query_name,
+                parsed.fault_message,
+            )
+        return parsed.to_dataframe()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+
+_SHARED: Optional[ParallelParser] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def get_parallel_parser(env: Mapping[str, str] = ENV) -> Optional[ParallelParser]:
+    """Shared pool sized by ``PARSE_WORKERS``; ``None`` when unset or ``0``."""
+    global _SHARED
+    workers = int(env.get("PARSE_WORKERS") or 0)
+    if workers <= 0:
+        return None
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = ParallelParser(max_workers=workers)
+            atexit.register(_SHARED.close)
+        return _SHARED
@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
 
 import pandas as pd
 import re
 from xml.etree import ElementTree
+from xml.parsers import expat
 
 from app.logging import logger
+from .metrics import METRICS
+from .xml_backend import XmlBackend, get_xml_backend
 
 SOAP_NAMESPACES = {
     "soapenv": "http://schemas.xmlsoap.org/soap/envelope/",
@@ -33,34 +37,159 @@ class SoapResponseParser:
         "&#x0A;": "\n",
     }
 
+    # Single-pass engine: what may follow each "&" once the text is split on it.
+    ENTITY_PREFIX_PATTERN = re.compile(
+        r"(lt;|gt;|quot;|apos;)|#(?:([0-9]+)|x([0-9A-Fa-f]+));"
+        r"|[a-zA-Z_]+;|#[0-9]+;|#x[0-9A-Fa-f]+;"
+    )
+    NAMED_ENTITIES = {"lt;": "<", "gt;": ">", "quot;": '"', "apos;": "'"}
+    CONTROL_BYTES = bytes([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20)])
+    # Decoded characters that could form a new entity with their neighbours in
+    # the sequential chain; when one shows up the chain is used instead.
+    CASCADE_CHARS = frozenset(
+        "&#;_0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    )
+    # Above roughly one "&" every 40 characters the per-entity Python work of
+    # the single-pass engine costs more than the C-level replace chain.
+    DENSE_ENTITY_RATIO = 40
+
+    SOAP_ENV_NAMESPACE = SOAP_NAMESPACES["soapenv"]
+    RESULT_TAG = f"{{{SOAP_NAMESPACES['tot']}}}RealizarConsultaSQLResult"
+    FAULT_TAGS = (f"{{{SOAP_ENV_NAMESPACE}}}Fault", "Fault")
+
+    def __init__(self, backend: Optional[XmlBackend] = None) -> None:
+        self.backend = backend or get_xml_backend()
+
+    def decode(self, soap_payload: str | None) -> "DecodedEnvelope":
+        """Walk the envelope once, collecting the Fault and the result text."""
+        if not soap_payload:
+            return DecodedEnvelope()
+
+        pull_parser = self.backend.pull_parser(("end",))
+        result_text: Optional[str] = None
+        found_result = False
+        fault_message: Optional[str] = None
+        with METRICS.span("envelope") as span:
+            span.record(bytes=len(soap_payload))
+            try:
+                pull_parser.feed(soap_payload)
+                pull_parser.close()
+                for _event, element in pull_parser.read_events():
+                    if element.tag == self.RESULT_TAG and not found_result:
+                        found_result = True
+                        result_text = element.text
+                    elif element.tag in self.FAULT_TAGS and fault_message is None:
+                        fault_message = self._fault_message(element)
+            except self.backend.ParseError as exc:
+                return DecodedEnvelope(parse_error=exc)
+
+        return DecodedEnvelope(
+            result_text=result_text,
+            found_result=found_result,
+            fault_message=fault_message,
+        )
+
+    def extract_fault_message(self, soap_payload: str | None) -> Optional[str]:
+        """Return the soap fault message when present."""
+        if not soap_payload or "Fault" not in soap_payload:
+            return None
+        return self.decode(soap_payload).fault_message
+
     def extract_result_xml(self, soap_payload: str | None) -> str | None:
         if not soap_payload:
             return None
+        return self.result_xml(self.decode(soap_payload))
 
-        try:
-            root = ElementTree.fromstring(soap_payload)
-        except ElementTree.ParseError as exc:
+    def result_xml(self, envelope: "DecodedEnvelope") -> str | None:
+        """Return the sanitised dataset XML of an already decoded envelope."""
+        if envelope.parse_error is not None:
             logger.error(
                 "Não foi possível interpretar o envelope SOAP: %s",
-                exc,
-                exc_info=True,
+                envelope.parse_error,
+                exc_info=envelope.parse_error,
             )
             return None
 
-        result_node = root.find(
-            ".//tot:RealizarConsultaSQLResult",
-            namespaces=SOAP_NAMESPACES,
-        )
-        if result_node is None:
+        if not envelope.found_result:
             logger.error("Elemento RealizarConsultaSQLResult não encontrado.")
             return None
 
-        raw_xml = (result_node.text or "").strip()
+        raw_xml = (envelope.result_text or "").strip()
         if not raw_xml:
             logger.warning("Campo RealizarConsultaSQLResult vazio.")
             return None
 
-        decoded = self._decode_basic_entities(raw_xml)
+        with METRICS.span("sanitise") as span:
+            span.record(bytes=len(raw_xml))
+            return self.sanitise(raw_xml)
+
+    def _fault_message(self, fault: ElementTree.Element) -> str:
+        faultstring = fault.findtext("faultstring")
+        if faultstring:
+            return faultstring.strip()
+
+        detail_message = fault.findtext(".//Message")
+        if detail_message:
+            return detail_message.strip()
+
+        return self.backend.tostring(fault)
+
+    def sanitise(self, text: str) -> str:
+        """Decode entities, escape stray ampersands and drop control chars.
+
+        The text is split once on "&" and every entity is resolved where it
+        starts, producing the same output as the sequential chain in
+        ``_sanitise_chain`` without copying the whole payload per step.
+        """
+        parts = text.split("&")
+        if len(parts) == 1:
+            return self._strip_control_chars(text)
+        if len(parts) * self.DENSE_ENTITY_RATIO > len(text):
+            return self._sanitise_chain(text)
+
+        output = [parts[0]]
+        append = output.append
+        match_prefix = self.ENTITY_PREFIX_PATTERN.match
+        for part in parts[1:]:
+            match = match_prefix(part)
+            if match is None:
+                append("&amp;")
+                append(part)
+                continue
+
+            group = match.lastindex
+            if group is None:
+                # Entity-like reference that is kept as-is (e.g. "&amp;").
+                append("&")
+                append(part)
+                continue
+
+            if group == 1:
+                append(self.NAMED_ENTITIES[match.group(1)])
+            else:
+                codepoint = int(match.group(group), 10 if group == 2 else 16)
+                if not self._is_valid_xml_codepoint(codepoint):
+                    return self._sanitise_chain(text)
+                char = chr(codepoint)
+                if char in self.CASCADE_CHARS:
+                    return self._sanitise_chain(text)
+                append(char)
+            append(part[match.end() :])
+
+        return self._strip_control_chars("".join(output))
+
+    def _strip_control_chars(self, text: str) -> str:
+        # Control characters never occur inside multi-byte UTF-8 sequences, so
+        # they can be removed with a C-level bytes translate.
+        encoded = text.encode("utf-8", "surrogatepass")
+        stripped = encoded.translate(None, self.CONTROL_BYTES)
+        if len(stripped) == len(encoded):
+            return text
+        return stripped.decode("utf-8", "surrogatepass")
+
+    def _sanitise_chain(self, text: str) -> str:
+        """Reference implementation: one full pass per decoding step."""
+        decoded = self._decode_basic_entities(text)
         decoded = self._decode_numeric_entities(decoded)
         decoded = self.AMP_PATTERN.sub("&amp;", decoded)
         return self.CONTROL_CHARS_PATTERN.sub("", decoded)
@@ -100,16 +229,31 @@ class SoapResponseParser:
         )
 
 
+@dataclass(frozen=True)
+class DecodedEnvelope:
+    """Outcome of a single pass over a SOAP response envelope."""
+
+    result_text: Optional[str] = None
+    found_result: bool = False
+    fault_message: Optional[str] = None
+    parse_error: Optional[Exception] = None
+
+
 class DatasetNormalizer:
     """Turns the dataset XML payload into an ElementTree.Element."""
 
+    def __init__(self, backend: Optional[XmlBackend] = None) -> None:
+        self.backend = backend or get_xml_backend()
+
     def parse(self, dataset_xml: str | None) -> ElementTree.Element | None:
         if not dataset_xml:
             return None
 
         try:
-            return ElementTree.fromstring(dataset_xml)
-        except ElementTree.ParseError as exc:
+            with METRICS.span("dataset_parse") as span:
+                span.record(bytes=len(dataset_xml))
+                return self.backend.fromstring(dataset_xml)
+        except self.backend.ParseError as exc:
             logger.error(
                 "XML retornado pela consulta está inválido: %s",
                 exc,
@@ -119,30 +263,80 @@ class DatasetNormalizer:
 
 
 class DatasetDataFrameBuilder:
-    """Converts the dataset XML into a pandas DataFrame."""
+    """Converts the dataset XML into a pandas DataFrame.
+
+    Values are appended straight into one list per column, and each distinct
+    tag is decoded to its column name only once. Cells that RM omits for null
+    values are filled with ``None``.
+    """
 
     ENCODED_NAME_PATTERN = re.compile(r"_x([0-9A-Fa-f]{4})_")
 
+    def __init__(self) -> None:
+        self._names: dict[str, str] = {}
+
     def to_dataframe(
         self,
         dataset_root: ElementTree.Element,
         *,
         row_tag: Optional[str] = None,
     ) -> pd.DataFrame:
-        rows = self._find_rows(dataset_root, row_tag=row_tag)
-        records = [
-            {
-                self._decode_name(child.tag): (child.text or "").strip()
-                for child in row
-                if isinstance(child.tag, str)
-            }
-            for row in rows
-        ]
+        with METRICS.span("dataframe") as span:
+            rows = self._find_rows(dataset_root, row_tag=row_tag)
+            if not rows:
+                return pd.DataFrame()
 
-        if not records:
-            return pd.DataFrame()
+            columns = self.rows_to_columns(rows)
+            span.record(rows=len(rows))
+            return pd.DataFrame(columns, index=pd.RangeIndex(len(rows)))
 
-        return pd.DataFrame(records)
+    def to_columns(
+        self,
+        dataset_root: ElementTree.Element,
+        *,
+        row_tag: Optional[str] = None,
+    ) -> dict[str, list[Optional[str]]]:
+        """Same rows as ``to_dataframe``, as one list of values per column."""
+        return self.rows_to_columns(self._find_rows(dataset_root, row_tag=row_tag))
+
+    def rows_to_columns(
+        self,
+        rows: Iterable[ElementTree.Element],
+    ) -> dict[str, list[Optional[str]]]:
+        """Return one list of values per column, padded to the number of rows."""
+        columns: dict[str, list[Optional[str]]] = {}
+        by_tag: dict[str, list[Optional[str]]] = {}
+        row_count = 0
+
+        for row in rows:
+            for child in row:
+                tag = child.tag
+                values = by_tag.get(tag)
+                if values is None:
+                    if not isinstance(tag, str):
+                        continue
+                    name = self._decode_name(tag)
+                    values = columns.get(name)
+                    if values is None:
+                        values = columns[name] = []
+                    by_tag[tag] = values
+
+                text = child.text
+                value = text.strip() if text else ""
+                missing = row_count - len(values)
+                if missing < 0:
+                    # Repeated tag in the same row: the last value wins.
+                    values[-1] = value
+                    continue
+                if missing:
+                    values.extend([None] * missing)
+                values.append(value)
+            row_count += 1
+
+        for values in columns.values():
+            if len(values) < row_count:
+                values.extend([None] * (row_count - len(values)))
+        return columns
 
     def _find_rows(
         self,
@@ -171,8 +365,220 @@ class DatasetDataFrameBuilder:
         return candidates[:1] if candidates else []
 
     def _decode_name(self, name: str) -> str:
-        return self.ENCODED_NAME_PATTERN.sub(
-            lambda match: chr(int(match.group(1), 16)),
-            name,
-        )
+        decoded = self._names.get(name)
+        if decoded is None:
+            decoded = self.ENCODED_NAME_PATTERN.sub(
+                lambda match: chr(int(match.group(1), 16)),
+                name,
+            )
+            self._names[name] = decoded
+        return decoded
+
+
+class StreamingDatasetReader:
+    """Extract dataset rows from a chunked SOAP response as they arrive.
+
+    The envelope is consumed with expat and the text of
+    ``RealizarConsultaSQLResult`` is sanitised and fed to a pull parser chunk
+    by chunk, so only the current batch of rows is kept in memory. Batches are
+    built column by column with ``DatasetDataFrameBuilder.rows_to_columns``,
+    like the in-memory path. Without a ``row_tag`` the rows are the direct
+    children of the dataset root.
+    """
+
+    RESULT_TAG = "RealizarConsultaSQLResult"
+    FAULT_TAG = "Fault"
+    # An entity split across two chunks must not be sanitised half-way.
+    PARTIAL_ENTITY_PATTERN = re.compile(
+        r"&(?:[a-zA-Z_]*|#[0-9]*|#x[0-9A-Fa-f]*)\Z"
+    )
+
+    def __init__(
+        self,
+        soap_parser: Optional[SoapResponseParser] = None,
+        df_builder: Optional[DatasetDataFrameBuilder] = None,
+        *,
+        batch_size: int = 5000,
+    ) -> None:
+        self.soap_parser = soap_parser or SoapResponseParser()
+        self.df_builder = df_builder or DatasetDataFrameBuilder()
+        self.batch_size = batch_size
+
+    def iter_dataframes(
+        self,
+        chunks: Iterable[bytes],
+        *,
+        row_tag: Optional[str] = None,
+    ) -> Iterator[pd.DataFrame]:
+        for row_count, columns in self._iter_columns(chunks, row_tag=row_tag):
+            yield pd.DataFrame(columns, index=pd.RangeIndex(row_count))
 
+    def iter_batches(
+        self,
+        chunks: Iterable[bytes],
+        *,
+        row_tag: Optional[str] = None,
+    ) -> Iterator[dict[str, list[Optional[str]]]]:
+        """Yield each batch as one list of values per column."""
+        for _row_count, columns in self._iter_columns(chunks, row_tag=row_tag):
+            yield columns
+
+    def _iter_columns(
+        self,
+        chunks: Iterable[bytes],
+        *,
+        row_tag: Optional[str],
+    ) -> Iterator[tuple[int, dict[str, list[Optional[str]]]]]:
+        state = _StreamState(self, row_tag=row_tag)
+        envelope_parser = state.create_envelope_parser()
+
+        try:
+            for chunk in chunks:
+                envelope_parser.Parse(chunk, False)
+                yield from state.drain()
+            envelope_parser.Parse(b"", True)
+            state.close_dataset()
+        except expat.ExpatError as exc:
+            logger.error(
+                "Não foi possível interpretar o envelope SOAP: %s",
+                exc,
+                exc_info=True,
+            )
+            return
+        except self.soap_parser.backend.ParseError as exc:
+            logger.error(
+                "XML retornado pela consulta está inválido: %s",
+                exc,
+                exc_info=True,
+            )
+            return
+
+        yield from state.drain(final=True)
+        state.report()
+
+
+class _StreamState:
+    """Mutable state shared by the expat handlers of a single stream."""
+
+    def __init__(
+        self,
+        reader: StreamingDatasetReader,
+        *,
+        row_tag: Optional[str],
+    ) -> None:
+        self.reader = reader
+        self.row_tag = row_tag
+        self.in_result = False
+        self.result_found = False
+        self.leading = True
+        self.pending = ""
+        self.fault_found = False
+        self.fault_depth = 0
+        self.fault_text: list[str] = []
+        self.fault_string: list[str] = []
+        self.in_faultstring = False
+        self.pull_parser = reader.soap_parser.backend.pull_parser(("start", "end"))
+        self.stack: list[ElementTree.Element] = []
+        # Completed rows, already detached from the tree, waiting for a batch.
+        self.rows: list[ElementTree.Element] = []
+        self.total_rows = 0
+
+    def create_envelope_parser(self) -> "expat.XMLParserType":
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+        parser.StartElementHandler = self._on_start
+        parser.EndElementHandler = self._on_end
+        parser.CharacterDataHandler = self._on_text
+        return parser
+
+    def _on_start(self, name: str, _attributes: dict[str, str]) -> None:
+        local_name = name.rpartition(" ")[2]
+        if local_name == StreamingDatasetReader.RESULT_TAG:
+            self.in_result = True
+            self.result_found = True
+        elif self.fault_depth or local_name == StreamingDatasetReader.FAULT_TAG:
+            self.fault_found = True
+            self.fault_depth += 1
+            self.in_faultstring = local_name == "faultstring"
+
+    def _on_end(self, name: str) -> None:
+        local_name = name.rpartition(" ")[2]
+        if local_name == StreamingDatasetReader.RESULT_TAG:
+            self._feed_dataset("", final=True)
+            self.in_result = False
+        elif self.fault_depth:
+            self.fault_depth -= 1
+            self.in_faultstring = False
+
+    def _on_text(self, text: str) -> None:
+        if self.in_result:
+            self._feed_dataset(text)
+        elif self.fault_depth:
+            self.fault_text.append(text)
+            if self.in_faultstring:
+                self.fault_string.append(text)
+
+    def _feed_dataset(self, text: str, *, final: bool = False) -> None:
+        if self.leading:
+            text = text.lstrip()
+            if not text:
+                return
+            self.leading = False
+
+        text = self.pending + text
+        self.pending = ""
+        if not final:
+            partial = StreamingDatasetReader.PARTIAL_ENTITY_PATTERN.search(text)
+            if partial:
+                self.pending = text[partial.start() :]
+                text = text[: partial.start()]
+        if text:
+            self.pull_parser.feed(self.reader.soap_parser.sanitise(text))
+            self._collect_rows()
+
+    def _collect_rows(self) -> None:
+        for event, element in self.pull_parser.read_events():
+            if event == "start":
+                self.stack.append(element)
+                continue
+
+            self.stack.pop()
+            if not isinstance(element.tag, str):
+                continue
+            depth = len(self.stack)
+            if self.row_tag:
+                is_row = element.tag == self.row_tag
+            else:
+                is_row = depth == 1 and len(element) > 0
+            if is_row:
+                self.rows.append(element)
+            if depth and (is_row or depth == 1):
+                self.stack[-1].remove(element)
+
+    def close_dataset(self) -> None:
+        if self.result_found and not self.leading:
+            self.pull_parser.close()
+            self._collect_rows()
+
+    def drain(
+        self,
+        *,
+        final: bool = False,
+    ) -> Iterator[tuple[int, dict[str, list[Optional[str]]]]]:
+        batch_size = self.reader.batch_size
+        while len(self.rows) >= batch_size or (final and self.rows):
+            batch = self.rows[:batch_size]
+            del self.rows[:batch_size]
+            self.total_rows += len(batch)
+            yield len(batch), self.reader.df_builder.rows_to_columns(batch)
+
+    def report(self) -> None:
+        if self.fault_found:
+            fault_message = "".join(self.fault_string or self.fault_text).strip()
+            logger.error("Servidor retornou Fault: %s", fault_message)
+        elif not self.result_found:
+            logger.error("Elemento RealizarConsultaSQLResult não encontrado.")
+        elif self.leading:
+            logger.warning("Campo RealizarConsultaSQLResult vazio.")
+        else:
+            logger.info("Leitura em streaming concluída: %s linhas.", self.total_rows)
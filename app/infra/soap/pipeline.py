@@ -2,95 +2,175 @@
 
 from __future__ import annotations
 
+import itertools
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 import pandas as pd
-import re
 
 from app.config import ENV
 from app.logging import logger
-from .parser import DatasetDataFrameBuilder, DatasetNormalizer, SoapResponseParser
+from .delta import DeltaResult, DeltaTracker, build_delta_tracker
+from .exporters import DataFrameExporter, build_exporter
+from .parallel import ParallelParser, get_parallel_parser
+from .parser import (
+    DatasetDataFrameBuilder,
+    DatasetNormalizer,
+    SoapResponseParser,
+    StreamingDatasetReader,
+)
+from .schema import SCHEMA_REGISTRY, SchemaRegistry
 
 
 @dataclass
 class RMQueryETLPipeline:
-    """Run the SOAP query pipeline producing a DataFrame and optional CSV export."""
+    """Run the SOAP query pipeline producing a DataFrame and an exported file.
+
+    When ``schemas`` is set, the DataFrame is typed with the query schema
+    before export so formats such as Parquet keep the column dtypes. Every
+    format keeps the RM column names; only the dtypes change. With a
+    ``delta`` tracker, ``run_delta`` exports only the rows that changed, and
+    with ``parallel`` the payload is parsed in a worker process.
+    """
 
     soap_parser: SoapResponseParser
     normalizer: DatasetNormalizer
     df_builder: DatasetDataFrameBuilder
-    exporter: "CSVExporter"
+    exporter: DataFrameExporter
     row_tag: Optional[str] = None
+    schemas: Optional[SchemaRegistry] = None
+    delta: Optional[DeltaTracker] = None
+    parallel: Optional[ParallelParser] = None
 
     def run(
         self,
         soap_payload: str | None,
         query_name: str,
     ) -> tuple[pd.DataFrame, Path] | None:
-        dataset_xml = self.soap_parser.extract_result_xml(soap_payload)
-        if not dataset_xml:
+        dataframe = self._build_dataframe(soap_payload, query_name)
+        if dataframe is None:
             return None
 
-        dataset_root = self.normalizer.parse(dataset_xml)
-        if dataset_root is None:
+        dataframe = self._typed(query_name, dataframe)
+        output_path = self.exporter.export(dataframe, query_name)
+        return dataframe, output_path
+
+    def run_delta(
+        self,
+        soap_payload: str | None,
+        query_name: str,
+    ) -> tuple[DeltaResult, dict[str, Path]] | None:
+        """Export only the rows inserted, updated and deleted since the last run.
+
+        Each kind goes to its own output (``<query>.inserted``,
+        ``<query>.updated`` and ``<query>.deleted``); the snapshot index is
+        replaced only after all of them were written.
+        """
+        if self.delta is None:
+            raise RuntimeError("Modo delta não configurado (defina DELTA_DIR).")
+
+        dataframe = self._build_dataframe(soap_payload, query_name)
+        if dataframe is None:
             return None
 
-        dataframe = self.df_builder.to_dataframe(
-            dataset_root,
-            row_tag=self.row_tag,
-        )
+        result = self.delta.diff(query_name, dataframe.fillna(""), commit=False)
+        paths: dict[str, Path] = {}
+        for kind, rows in result.outputs().items():
+            rows = self._typed(query_name, rows)
+            paths[kind] = self.exporter.export(rows, f"{query_name}.{kind}")
+
+        self.delta.commit(query_name, result)
+        return result, paths
+
+    def _build_dataframe(
+        self,
+        soap_payload: str | None,
+        query_name: str = "",
+    ) -> pd.DataFrame | None:
+        if self.parallel is not None:
+            if not soap_payload:
+                return None
+            dataframe = self.parallel.parse(
+                soap_payload,
+                query_name=query_name,
+                row_tag=self.row_tag,
+                backend=self.soap_parser.backend.name,
+            )
+        else:
+            dataset_xml = self.soap_parser.extract_result_xml(soap_payload)
+            if not dataset_xml:
+                return None
+
+            dataset_root = self.normalizer.parse(dataset_xml)
+            if dataset_root is None:
+                return None
+
+            dataframe = self.df_builder.to_dataframe(
+                dataset_root,
+                row_tag=self.row_tag,
+            )
         if dataframe.empty:
             logger.warning("Nenhum registro encontrado para montar o DataFrame.")
             return None
+        return dataframe
 
-        csv_path = self.exporter.export(dataframe, query_name)
-        return dataframe, csv_path
+    def run_stream(
+        self,
+        chunks: Iterable[bytes],
+        query_name: str,
+        *,
+        batch_size: int = 5000,
+    ) -> Path | None:
+        """Export a chunked SOAP response while it is read.
+
+        Exporters with ``export_batches`` (CSV) receive each batch as soon as
+        it is parsed; the others get the concatenated DataFrame at the end.
+        """
+        reader = StreamingDatasetReader(
+            self.soap_parser,
+            self.df_builder,
+            batch_size=batch_size,
+        )
+        batches = reader.iter_dataframes(chunks, row_tag=self.row_tag)
+        first = next(batches, None)
+        if first is None:
+            logger.warning("Nenhum registro encontrado para montar o DataFrame.")
+            return None
 
+        batches = itertools.chain([first], batches)
+        export_batches = getattr(self.exporter, "export_batches", None)
+        if export_batches is not None:
+            return export_batches(self._typed_batches(query_name, batches), query_name)
 
-class CSVExporter:
-    """Persist the DataFrame generated by the pipeline into a CSV file."""
+        dataframe = pd.concat(list(batches), ignore_index=True)
+        return self.exporter.export(self._typed(query_name, dataframe), query_name)
 
-    SAFE_FILENAME_PATTERN = DatasetDataFrameBuilder.ENCODED_NAME_PATTERN
+    def _typed(self, query_name: str, dataframe: pd.DataFrame) -> pd.DataFrame:
+        if self.schemas is None:
+            return dataframe
+        return self.schemas.apply(query_name, dataframe, rename=False)
 
-    def __init__(
+    def _typed_batches(
         self,
-        directory: Path,
-        *,
-        encoding: str = "utf-8-sig",
-        include_index: bool = False,
-    ) -> None:
-        self.directory = directory
-        self.encoding = encoding
-        self.include_index = include_index
-        self.directory.mkdir(parents=True, exist_ok=True)
-
-    def export(self, dataframe: pd.DataFrame, query_name: str) -> Path:
-        safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", query_name.strip())
-        safe_name = safe_name.strip("._") or "consulta"
-        csv_path = self.directory / f"{safe_name}.csv"
-        dataframe.to_csv(
-            csv_path,
-            index=self.include_index,
-            encoding=self.encoding,
-            sep=";",
-        )
-        logger.info("Resultado salvo em %s", csv_path.resolve())
-        return csv_path
+        query_name: str,
+        batches: Iterable[pd.DataFrame],
+    ) -> Iterator[pd.DataFrame]:
+        for dataframe in batches:
+            yield self._typed(query_name, dataframe)
 
 
 def build_pipeline() -> RMQueryETLPipeline:
     """Factory configured via environment variables."""
+    # Registers the domain schemas in SCHEMA_REGISTRY. Imported here because
+    # the domain package imports this one.
+    from app.domain.beneficios_planos import schemas as _domain_schemas  # noqa: F401
+
     soap_parser = SoapResponseParser()
     normalizer = DatasetNormalizer()
     df_builder = DatasetDataFrameBuilder()
 
-    exporter = CSVExporter(
-        directory=Path(ENV.get("CSV_OUTPUT_DIR", "consultas_csv")),
-        encoding=ENV.get("CSV_OUTPUT_ENCODING", "utf-8-sig"),
-        include_index=ENV.get("CSV_INCLUDE_INDEX", "false").lower() == "true",
-    )
+    exporter = build_exporter(ENV)
 
     row_tag = ENV.get("DATAFRAME_ROW_TAG")
     return RMQueryETLPipeline(
@@ -99,4 +179,7 @@ def build_pipeline() -> RMQueryETLPipeline:
         df_builder=df_builder,
         exporter=exporter,
         row_tag=row_tag,
+        schemas=SCHEMA_REGISTRY,
+        delta=build_delta_tracker(ENV),
+        parallel=get_parallel_parser(ENV),
     )
@@ -0,0 +1,101 @@
+"""Deadline, retry and hedging policy applied to SOAP calls."""
+
+from __future__ import annotations
+
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Mapping, Optional, TypeVar
+
+from app.config import ENV
+
+T = TypeVar("T", float, int, None)
+
+
+def _env_float(env: Mapping[str, str], key: str, default: T) -> float | T:
+    value = (env.get(key) or "").strip()
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """Timeouts and retry behaviour for a ``SoapOperation``.
+
+    ``hedge_percentile`` enables hedged requests: when an attempt takes longer
+    than that latency percentile of recent calls, a second identical request
+    is sent and the first response to arrive wins.
+    """
+
+    connect_timeout: float = 10.0
+    read_timeout: float = 300.0
+    deadline: Optional[float] = None
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    idempotent: bool = True
+    retry_statuses: frozenset[int] = frozenset({429, 502, 503, 504})
+    hedge_percentile: Optional[float] = None
+    hedge_min_delay: float = 1.0
+    hedge_min_samples: int = 20
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str] = ENV) -> "CallPolicy":
+        """Read the ``RM_*`` settings; empty values (``RM_DEADLINE=``) are unset."""
+        return cls(
+            connect_timeout=_env_float(env, "RM_CONNECT_TIMEOUT", cls.connect_timeout),
+            read_timeout=_env_float(env, "RM_READ_TIMEOUT", cls.read_timeout),
+            deadline=_env_float(env, "RM_DEADLINE", None),
+            max_attempts=int(_env_float(env, "RM_MAX_ATTEMPTS", cls.max_attempts)),
+            backoff_base=_env_float(env, "RM_BACKOFF_BASE", cls.backoff_base),
+            backoff_max=_env_float(env, "RM_BACKOFF_MAX", cls.backoff_max),
+            hedge_percentile=_env_float(env, "RM_HEDGE_PERCENTILE", None),
+            hedge_min_delay=_env_float(env, "RM_HEDGE_MIN_DELAY", cls.hedge_min_delay),
+        )
+
+    @property
+    def attempts(self) -> int:
+        return max(1, self.max_attempts) if self.idempotent else 1
+
+    def timeout_for(self, remaining: Optional[float]) -> tuple[float, float]:
+        """Return the (connect, read) timeout, capped by the remaining deadline."""
+        if remaining is None:
+            return self.connect_timeout, self.read_timeout
+        remaining = max(remaining, 0.001)
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number ``attempt``."""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class LatencyTracker:
+    """Rolling window of call latencies used to pick the hedging delay."""
+
+    def __init__(self, size: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(fraction * len(samples)))
+        return samples[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def hedge_delay(self, policy: CallPolicy) -> Optional[float]:
+        if policy.hedge_percentile is None or len(self) < policy.hedge_min_samples:
+            return None
+        threshold = self.percentile(policy.hedge_percentile)
+        if threshold is None:
+            return None
+        return max(policy.hedge_min_delay, threshold)
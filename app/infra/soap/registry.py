@@ -0,0 +1,98 @@
+"""Process-wide registry of shared RM query services."""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import threading
+from typing import Callable, Optional
+
+from app.config import ENV
+from app.logging import logger
+from .client import RMQueryService, build_rm_service
+
+ServiceKey = tuple[str, str, str]
+
+
+class RMServiceRegistry:
+    """Hand out one ``RMQueryService`` per endpoint and credentials.
+
+    Services share their ``SoapClient`` session, so repositories, gateways and
+    batch jobs reuse the same pooled (and already TLS-negotiated) connections.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[..., RMQueryService] = build_rm_service,
+    ) -> None:
+        self.factory = factory
+        self._services: dict[ServiceKey, RMQueryService] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        *,
+        endpoint: Optional[str] = None,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> RMQueryService:
+        endpoint = endpoint or ENV["SOAP_ACTION_ENDPOINT"]
+        user = user or ENV["USER"]
+        password = password or ENV["PASSWORD"]
+        key = self._make_key(endpoint, user, password)
+
+        with self._lock:
+            service = self._services.get(key)
+            if service is None:
+                logger.debug("Criando serviço RM compartilhado para %s", endpoint)
+                service = self.factory(endpoint=endpoint, user=user, password=password)
+                self._services[key] = service
+            return service
+
+    def close(
+        self,
+        *,
+        endpoint: Optional[str] = None,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> None:
+        key = self._make_key(
+            endpoint or ENV["SOAP_ACTION_ENDPOINT"],
+            user or ENV["USER"],
+            password or ENV["PASSWORD"],
+        )
+        with self._lock:
+            service = self._services.pop(key, None)
+        if service is not None:
+            service.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            services = list(self._services.values())
+            self._services.clear()
+        for service in services:
+            service.close()
+
+    @staticmethod
+    def _make_key(endpoint: str, user: str, password: str) -> ServiceKey:
+        secret = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        return endpoint, user, secret
+
+
+_registry = RMServiceRegistry()
+atexit.register(_registry.close_all)
+
+
+def get_rm_service(
+    *,
+    endpoint: Optional[str] = None,
+    user: Optional[str] = None,
+    password: Optional[str] = None,
+) -> RMQueryService:
+    """Return the shared service for the given (or configured) endpoint."""
+    return _registry.get(endpoint=endpoint, user=user, password=password)
+
+
+def close_rm_services() -> None:
+    """Close every shared service; they are recreated on the next request."""
+    _registry.close_all()
@@ -0,0 +1,148 @@
+"""Per-query column schemas applied to the DataFrames built from RM datasets."""
+
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Mapping, Optional
+
+import pandas as pd
+
+from app.logging import logger
+
+try:  # pragma: no cover - depends on the environment
+    import pyarrow  # noqa: F401
+except ImportError:  # pragma: no cover - depends on the environment
+    TEXT_DTYPE = "string"
+else:  # pragma: no cover - depends on the environment
+    TEXT_DTYPE = "string[pyarrow]"
+
+# Kinds accepted in ``QuerySchema.dtypes``.
+CATEGORY = "category"
+INTEGER = "Int64"
+FLOAT = "Float64"
+DATE = "date"
+TEXT = "text"
+
+_UTC_OFFSET_PATTERN = re.compile(r"(?:Z|[+-]\d{2}:?\d{2})$")
+
+
+@dataclass(frozen=True)
+class QuerySchema:
+    """Rename map and column dtypes of a query result.
+
+    ``rename`` maps RM column names to the names used by the application and
+    ``dtypes`` maps the renamed columns to one of ``category``, ``Int64``,
+    ``Float64``, ``date`` or ``text`` (``string[pyarrow]`` when pyarrow is
+    installed). Missing text and category cells become ``""`` as with the
+    untyped frames, while empty numeric and date cells become ``<NA>``.
+    Columns not listed keep the object dtype. With ``rename=False`` the RM
+    column names are kept and typed as their renamed counterparts.
+    """
+
+    rename: Mapping[str, str] = field(default_factory=dict)
+    dtypes: Mapping[str, str] = field(default_factory=dict)
+    date_format: Optional[str] = None
+
+    def apply(self, dataframe: pd.DataFrame, *, rename: bool = True) -> pd.DataFrame:
+        if dataframe.empty:
+            return dataframe
+
+        if rename:
+            dataframe = dataframe.rename(columns=self.rename)
+            kinds = {column: self.dtypes.get(column) for column in dataframe.columns}
+        else:
+            dataframe = dataframe.copy()
+            kinds = {
+                column: self.dtypes.get(self.rename.get(column, column))
+                for column in dataframe.columns
+            }
+        converted: dict[str, pd.Series] = {}
+        for column, kind in kinds.items():
+            if kind is None:
+                continue
+            try:
+                converted[column] = self._convert(dataframe[column], kind, column)
+            except (TypeError, ValueError) as exc:
+                logger.warning(
+                    "Não foi possível converter a coluna %s para %s: %s",
+                    column,
+                    kind,
+                    exc,
+                )
+
+        untyped = [column for column in dataframe.columns if column not in converted]
+        if untyped:
+            dataframe[untyped] = dataframe[untyped].fillna("")
+        for column, series in converted.items():
+            dataframe[column] = series
+        return dataframe
+
+    def _convert(self, series: pd.Series, kind: str, column: str) -> pd.Series:
+        if kind == CATEGORY:
+            return series.fillna("").astype("category")
+        if kind == TEXT:
+            return series.fillna("").astype(TEXT_DTYPE)
+        if kind in (INTEGER, FLOAT):
+            values = series.replace("", None)
+            numbers = pd.to_numeric(values, errors="coerce")
+            _warn_coerced(values, numbers, column, kind)
+            return numbers.astype(kind)
+        if kind == DATE:
+            # RM writes dates with the server's UTC offset, which changes with
+            # daylight saving; keep the wall-clock value instead of mixing zones.
+            values = series.replace("", None).str.replace(
+                _UTC_OFFSET_PATTERN, "", regex=True
+            )
+            dates = pd.to_datetime(values, format=self.date_format, errors="coerce")
+            _warn_coerced(values, dates, column, kind)
+            return dates
+        raise ValueError(f"Tipo de coluna desconhecido: {kind}")
+
+
+def _warn_coerced(values: pd.Series, converted: pd.Series, column: str, kind: str) -> None:
+    """Log the cells that had a value but could not be converted to ``kind``."""
+    lost = int((values.notna() & converted.isna()).sum())
+    if lost:
+        logger.warning(
+            "%s valor(es) da coluna %s não puderam ser convertidos para %s e "
+            "ficaram vazios.",
+            lost,
+            column,
+            kind,
+        )
+
+
+class SchemaRegistry:
+    """Map query names (``CodSentenca``) to their ``QuerySchema``."""
+
+    def __init__(self) -> None:
+        self._schemas: dict[str, QuerySchema] = {}
+        self._lock = threading.Lock()
+
+    def register(self, query_name: str, schema: QuerySchema) -> None:
+        with self._lock:
+            self._schemas[query_name] = schema
+
+    def get(self, query_name: str) -> Optional[QuerySchema]:
+        return self._schemas.get(query_name)
+
+    def apply(
+        self,
+        query_name: str,
+        dataframe: pd.DataFrame,
+        *,
+        rename: bool = True,
+    ) -> pd.DataFrame:
+        """Type ``dataframe`` with the query schema, or blank-fill it as before."""
+        schema = self.get(query_name)
+        if schema is None:
+            return dataframe.fillna("")
+        return schema.apply(dataframe, rename=rename)
+
+    def __contains__(self, query_name: object) -> bool:
+        return query_name in self._schemas
+
+
+SCHEMA_REGISTRY = SchemaRegistry()
@@ -0,0 +1,119 @@
+"""HTTP transport settings shared by the SOAP clients."""
+
+from __future__ import annotations
+
+import gzip
+import zlib
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+
+from app.config import ENV
+
+
+def _env_flag(env: Mapping[str, str], key: str, default: bool) -> bool:
+    value = env.get(key)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "sim")
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """Connection pool, keep-alive and compression options for the session."""
+
+    pool_connections: int = 4
+    pool_maxsize: int = 10
+    pool_block: bool = False
+    keep_alive: bool = True
+    accept_encoding: Optional[str] = "gzip, deflate"
+    compress_requests: Optional[str] = None
+    compress_min_bytes: int = 1024
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str] = ENV) -> "TransportConfig":
+        accept_encoding = env.get("RM_ACCEPT_ENCODING", cls.accept_encoding)
+        compress_requests = env.get("RM_COMPRESS_REQUESTS", "").strip().lower()
+        return cls(
+            pool_connections=int(env.get("RM_POOL_CONNECTIONS", cls.pool_connections)),
+            pool_maxsize=int(env.get("RM_POOL_MAXSIZE", cls.pool_maxsize)),
+            pool_block=_env_flag(env, "RM_POOL_BLOCK", cls.pool_block),
+            keep_alive=_env_flag(env, "RM_KEEP_ALIVE", cls.keep_alive),
+            accept_encoding=accept_encoding or None,
+            compress_requests=compress_requests or None,
+            compress_min_bytes=int(
+                env.get("RM_COMPRESS_MIN_BYTES", cls.compress_min_bytes)
+            ),
+        )
+
+    def build_session(self) -> Session:
+        session = Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request_headers(self) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        headers["Accept-Encoding"] = self.accept_encoding or "identity"
+        if not self.keep_alive:
+            headers["Connection"] = "close"
+        return headers
+
+    def encode_body(self, body: bytes) -> tuple[bytes, dict[str, str]]:
+        """Compress the request body when enabled and worth it."""
+        if not self.compress_requests or len(body) < self.compress_min_bytes:
+            return body, {}
+        if self.compress_requests == "gzip":
+            return gzip.compress(body), {"Content-Encoding": "gzip"}
+        if self.compress_requests == "deflate":
+            return zlib.compress(body), {"Content-Encoding": "deflate"}
+        raise ValueError(
+            f"Compressão de requisição não suportada: {self.compress_requests}"
+        )
+
+
+@dataclass(frozen=True)
+class CallStats:
+    """Bytes exchanged by a single SOAP call."""
+
+    operation: str
+    bytes_sent: int
+    bytes_received: int
+    bytes_decoded: int
+    content_encoding: str = ""
+    status_code: int = 0
+
+    @property
+    def compression_ratio(self) -> float:
+        if not self.bytes_received:
+            return 1.0
+        return self.bytes_decoded / self.bytes_received
+
+    @classmethod
+    def from_response(
+        cls,
+        operation: str,
+        bytes_sent: int,
+        response: Response,
+        bytes_decoded: int,
+    ) -> "CallStats":
+        raw = getattr(response, "raw", None)
+        try:
+            bytes_received = int(raw.tell()) if raw is not None else bytes_decoded
+        except (AttributeError, TypeError, ValueError, OSError):
+            bytes_received = bytes_decoded
+        return cls(
+            operation=operation,
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received or bytes_decoded,
+            bytes_decoded=bytes_decoded,
+            content_encoding=response.headers.get("Content-Encoding", ""),
+            status_code=response.status_code,
+        )
@@ -0,0 +1,113 @@
+"""Pluggable XML parser backend: lxml when installed, stdlib otherwise."""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Iterator, Mapping, Optional
+from xml.etree import ElementTree
+
+from app.config import ENV
+from app.logging import logger
+
+try:  # pragma: no cover - depends on the environment
+    from lxml import etree as lxml_etree
+except ImportError:  # pragma: no cover - depends on the environment
+    lxml_etree = None
+
+# lxml refuses ``str`` input that carries an encoding declaration.
+XML_DECLARATION_PATTERN = re.compile(r"\A\s*<\?xml[^>]*\?>")
+
+
+class StdlibXmlBackend:
+    """``xml.etree.ElementTree`` based backend."""
+
+    name = "stdlib"
+    ParseError: tuple[type[Exception], ...] = (ElementTree.ParseError,)
+
+    def fromstring(self, text: str) -> Any:
+        return ElementTree.fromstring(text)
+
+    def pull_parser(self, events: tuple[str, ...]) -> Any:
+        return ElementTree.XMLPullParser(events=events)
+
+    def tostring(self, element: Any) -> str:
+        return ElementTree.tostring(element, encoding="unicode")
+
+
+class LxmlXmlBackend:
+    """lxml backend using ``huge_tree`` and optional error recovery."""
+
+    name = "lxml"
+
+    def __init__(self, *, recover: bool = False) -> None:
+        if lxml_etree is None:
+            raise ImportError("lxml não está instalado.")
+        self.recover = recover
+        self.ParseError: tuple[type[Exception], ...] = (lxml_etree.XMLSyntaxError,)
+        self._parser_options = {
+            "huge_tree": True,
+            "recover": recover,
+            "resolve_entities": False,
+            "no_network": True,
+        }
+
+    def fromstring(self, text: str) -> Any:
+        parser = lxml_etree.XMLParser(**self._parser_options)
+        return lxml_etree.fromstring(XML_DECLARATION_PATTERN.sub("", text, 1), parser)
+
+    def pull_parser(self, events: tuple[str, ...]) -> Any:
+        return _LxmlPullParser(
+            lxml_etree.XMLPullParser(events=events, **self._parser_options)
+        )
+
+    def tostring(self, element: Any) -> str:
+        return lxml_etree.tostring(element, encoding="unicode")
+
+
+class _LxmlPullParser:
+    """Adapts lxml's pull parser to the ``ElementTree.XMLPullParser`` API."""
+
+    def __init__(self, parser: Any) -> None:
+        self._parser = parser
+        self._started = False
+
+    def feed(self, data: str) -> None:
+        if not self._started:
+            data = XML_DECLARATION_PATTERN.sub("", data, 1)
+            self._started = bool(data.strip())
+        self._parser.feed(data)
+
+    def close(self) -> None:
+        self._parser.close()
+
+    def read_events(self) -> Iterator[tuple[str, Any]]:
+        return self._parser.read_events()
+
+
+XmlBackend = StdlibXmlBackend | LxmlXmlBackend
+
+
+@lru_cache(maxsize=None)
+def _cached_backend(name: str, recover: bool) -> XmlBackend:
+    if name == "stdlib":
+        return StdlibXmlBackend()
+    if name == "lxml":
+        return LxmlXmlBackend(recover=recover)
+    if lxml_etree is not None:
+        return LxmlXmlBackend(recover=recover)
+    logger.debug("lxml indisponível; usando xml.etree.ElementTree.")
+    return StdlibXmlBackend()
+
+
+def get_xml_backend(
+    name: Optional[str] = None,
+    *,
+    env: Mapping[str, str] = ENV,
+) -> XmlBackend:
+    """Return the backend named by ``name`` or ``XML_BACKEND`` (auto|lxml|stdlib)."""
+    name = (name or env.get("XML_BACKEND", "auto")).strip().lower()
+    recover = env.get("XML_RECOVER", "false").strip().lower() == "true"
+    if name not in ("auto", "lxml", "stdlib"):
+        raise ValueError(f"XML_BACKEND inválido: {name}")
+    return _cached_backend(name, recover)
@@ -1,41 +1,143 @@
 from __future__ import annotations
 
-from app.infra.soap.client import build_rm_service
+import argparse
+import asyncio
+import multiprocessing
+from pathlib import Path
+from typing import Optional, Sequence
+
+from app.infra.soap.async_client import QueryRequest, build_async_rm_service
+from app.infra.soap.batch import BatchRunner, QueryReport, format_summary, load_manifest
+from app.infra.soap.metrics import write_metrics_report
 from app.infra.soap.pipeline import build_pipeline
+from app.infra.soap.registry import close_rm_services, get_rm_service
 from app.logging import logger
+from app.profiling import profiled
 from app.ui.plano_odonto import main as odontologia_ui_main
 
 
-def run_query(query_name: str) -> None:
-    """Execute uma consulta RM e registra o resultado no CSV configurado."""
-    rm_service = build_rm_service()
-    soap_payload = rm_service.execute(query_name, timeout=None)
+@profiled()
+def run_query(query_name: str, *, delta: bool = False) -> None:
+    """Execute uma consulta RM e exporta o resultado no formato configurado.
+
+    Com ``delta=True`` exporta apenas as linhas inseridas, alteradas e
+    removidas desde a execucao anterior (requer ``DELTA_DIR``).
+    """
+    rm_service = get_rm_service()
+    soap_payload = rm_service.execute(query_name)
 
     if not soap_payload:
         logger.error("Consulta nao retornou payload.")
         return
 
     pipeline = build_pipeline()
+    if delta:
+        delta_result = pipeline.run_delta(soap_payload, query_name)
+        if not delta_result:
+            logger.error("Pipeline ETL nao produziu dados.")
+            return
+        changes, paths = delta_result
+        for kind, rows in changes.outputs().items():
+            logger.info("%s: %s linhas salvas em %s", kind, len(rows), paths[kind])
+        return
+
     result = pipeline.run(soap_payload, query_name)
     if not result:
         logger.error("Pipeline ETL nao produziu dados.")
         return
 
-    dataframe, csv_path = result
+    dataframe, output_path = result
     logger.info(
-        "DataFrame com %s linhas e %s colunas. CSV salvo em %s",
+        "DataFrame com %s linhas e %s colunas. Arquivo salvo em %s",
         len(dataframe),
         len(dataframe.columns),
-        csv_path,
+        output_path,
     )
     print(dataframe.head())
 
 
-def main() -> None:
-    """Inicializa a interface do gerador TXT odontologico."""
-    odontologia_ui_main()
+def run_queries(query_names: list[str]) -> None:
+    """Execute varias consultas RM em paralelo e exporta cada uma delas."""
+    rm_service = build_async_rm_service()
+    try:
+        payloads = asyncio.run(
+            rm_service.execute_many(
+                [QueryRequest(query_name) for query_name in query_names],
+                return_exceptions=True,
+            )
+        )
+    finally:
+        rm_service.close()
+
+    pipeline = build_pipeline()
+    for query_name, soap_payload in zip(query_names, payloads):
+        if isinstance(soap_payload, BaseException):
+            logger.error("Consulta %s falhou: %s", query_name, soap_payload)
+            continue
+        if not soap_payload:
+            logger.error("Consulta %s nao retornou payload.", query_name)
+            continue
+
+        result = pipeline.run(soap_payload, query_name)
+        if not result:
+            logger.error("Pipeline ETL nao produziu dados para %s.", query_name)
+            continue
+
+        dataframe, output_path = result
+        logger.info(
+            "%s: %s linhas e %s colunas. Arquivo salvo em %s",
+            query_name,
+            len(dataframe),
+            len(dataframe.columns),
+            output_path,
+        )
+
+
+@profiled()
+def run_manifest(path: str | Path) -> list[QueryReport]:
+    """Execute as consultas listadas em um manifesto JSON/TOML/YAML.
+
+    Todas usam o mesmo servico RM; imprime ao final latencia, bytes e linhas
+    de cada consulta.
+    """
+    manifest = load_manifest(Path(path))
+    reports = BatchRunner(get_rm_service()).run(manifest)
+    print(format_summary(reports))
+    return reports
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Inicializa a interface do gerador TXT odontologico.
+
+    Com ``--manifest arquivo`` executa as consultas do manifesto em lote e com
+    ``--consultas SENTENCA ...`` exporta as sentencas em paralelo, sem abrir a
+    interface.
+    """
+    parser = argparse.ArgumentParser(description="Gerador TXT odontologico / RM")
+    parser.add_argument("--manifest", help="manifesto de consultas (JSON, TOML ou YAML)")
+    parser.add_argument(
+        "--consultas",
+        nargs="+",
+        metavar="SENTENCA",
+        help="sentencas RM executadas em paralelo e exportadas",
+    )
+    args, _ = parser.parse_known_args(argv)
+    try:
+        if args.manifest:
+            run_manifest(args.manifest)
+        elif args.consultas:
+            run_queries(args.consultas)
+        else:
+            odontologia_ui_main()
+    finally:
+        close_rm_services()
+        metrics_path = write_metrics_report()
+        if metrics_path is not None:
+            logger.info("Métricas por etapa salvas em %s", metrics_path)
 
 
 if __name__ == "__main__":
+    # Needed by the parse worker processes in PyInstaller builds.
+    multiprocessing.freeze_support()
     main()
 
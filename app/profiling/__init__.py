@@ -0,0 +1,258 @@
+"""Optional cProfile / tracemalloc capture controlled by ``PROFILE``.
+
+``PROFILE=cpu`` profiles every wrapped section with cProfile, ``PROFILE=mem``
+traces allocations with tracemalloc and ``PROFILE=all`` does both. Results go
+to ``profiles/<timestamp>-<pid>/`` next to the executable (the project root
+during development) or below ``PROFILE_DIR``, and are written when the
+application exits:
+
+* ``<section>.prof``: cProfile stats merged over every call of the section,
+  readable with ``pstats`` or snakeviz;
+* ``<section>.txt``: the top functions by cumulative time;
+* ``secoes.log``: one line per call with duration and, for ``mem``, peak and
+  current traced memory;
+* ``tracemalloc_top.txt`` and ``final.tracemalloc``: top allocation sites at
+  exit and the raw snapshot for offline comparison.
+
+With ``PROFILE`` unset, ``profiled`` returns the function unchanged and
+``profile_section`` is an empty context manager.
+"""
+
+from __future__ import annotations
+
+import atexit
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, ContextManager, Iterator, Mapping, Optional, TypeVar
+
+from app.config import ENV
+from app.logging import logger
+
+F = TypeVar("F", bound=Callable[..., object])
+
+TRACEMALLOC_FRAMES = 25
+TOP_FUNCTIONS = 60
+TOP_ALLOCATIONS = 50
+
+
+def _base_directory() -> Path:
+    if getattr(sys, "frozen", False):
+        return Path(sys.executable).parent
+    return Path(__file__).resolve().parents[2]
+
+
+class Profiler:
+    """Collect CPU and memory profiles of named sections of the application.
+
+    Only the outermost section of each thread is profiled; nested sections
+    are folded into it and just logged with their duration. cProfile allows a
+    single active profiler per process on Python 3.12+, so while one thread
+    holds it, outermost sections of other threads are timed without CPU
+    stats. Profiling failures are logged and never reach the profiled code.
+    """
+
+    def __init__(self, *, cpu: bool, mem: bool, directory: Path) -> None:
+        self.cpu = cpu
+        self.mem = mem
+        self.directory = directory
+        self._stats: dict[str, pstats.Stats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cpu_busy = False
+        self._log_lines: list[str] = []
+        if self.mem and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @property
+    def enabled(self) -> bool:
+        return self.cpu or self.mem
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        if getattr(self._local, "active", False):
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                self._log(f"  {name}: {time.perf_counter() - started:.3f}s (aninhada)")
+            return
+
+        self._local.active = True
+        profile = self._start_cpu(name)
+        if self.mem:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._local.active = False
+            self._stop_cpu(name, profile)
+            line = f"{name}: {elapsed:.3f}s"
+            if self.mem:
+                current, peak = tracemalloc.get_traced_memory()
+                line += f" pico={peak / 1_000_000:.1f}MB atual={current / 1_000_000:.1f}MB"
+            elif self.cpu and profile is None:
+                line += " (sem CPU: outro perfil ativo)"
+            self._log(line)
+
+    def _start_cpu(self, name: str) -> Optional[cProfile.Profile]:
+        if not self.cpu:
+            return None
+        with self._lock:
+            if self._cpu_busy:
+                return None
+            self._cpu_busy = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as exc:
+            # Another profiler (a debugger, an outer cProfile run) owns the hook.
+            logger.debug("Perfil de CPU de %s ignorado: %s", name, exc)
+            with self._lock:
+                self._cpu_busy = False
+            return None
+        return profile
+
+    def _stop_cpu(self, name: str, profile: Optional[cProfile.Profile]) -> None:
+        if profile is None:
+            return
+        try:
+            profile.disable()
+            self._merge(name, profile)
+        except Exception as exc:  # noqa: BLE001 - never break the profiled code
+            logger.error("Falha ao coletar o perfil de %s: %s", name, exc)
+        finally:
+            with self._lock:
+                self._cpu_busy = False
+
+    def _merge(self, name: str, profile: cProfile.Profile) -> None:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                self._stats[name] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+
+    def _log(self, line: str) -> None:
+        stamp = datetime.now().strftime("%H:%M:%S")
+        with self._lock:
+            self._log_lines.append(f"{stamp} [{threading.current_thread().name}] {line}")
+
+    def write(self) -> Optional[Path]:
+        """Write everything collected so far; called automatically at exit."""
+        with self._lock:
+            stats = dict(self._stats)
+            log_lines = list(self._log_lines)
+        if not stats and not log_lines and not self.mem:
+            return None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for name, section_stats in stats.items():
+            safe_name = "".join(c if c.isalnum() or c in "._-" else "_" for c in name)
+            section_stats.dump_stats(str(self.directory / f"{safe_name}.prof"))
+            buffer = io.StringIO()
+            section_stats.stream = buffer
+            section_stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+            (self.directory / f"{safe_name}.txt").write_text(buffer.getvalue(), encoding="utf-8")
+
+        (self.directory / "secoes.log").write_text(
+            "\n".join(log_lines) + "\n",
+            encoding="utf-8",
+        )
+        if self.mem and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, cProfile.__file__),
+                    tracemalloc.Filter(False, pstats.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                )
+            )
+            snapshot.dump(str(self.directory / "final.tracemalloc"))
+            lines = [
+                str(statistic)
+                for statistic in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+            ]
+            (self.directory / "tracemalloc_top.txt").write_text(
+                "\n".join(lines) + "\n",
+                encoding="utf-8",
+            )
+        return self.directory
+
+
+def _setting(env: Mapping[str, str], key: str) -> str:
+    # Also read the process environment, so a user can run the frozen
+    # executable with PROFILE=cpu without editing the bundled .env.
+    return env.get(key) or os.environ.get(key) or ""
+
+
+def build_profiler(env: Mapping[str, str] = ENV) -> Optional[Profiler]:
+    """Factory enabled by ``PROFILE=cpu|mem|all``."""
+    modes = {
+        mode.strip().lower()
+        for mode in _setting(env, "PROFILE").split(",")
+        if mode.strip()
+    }
+    if "all" in modes:
+        modes = {"cpu", "mem"}
+    if not modes & {"cpu", "mem"}:
+        return None
+
+    base = Path(_setting(env, "PROFILE_DIR") or _base_directory() / "profiles")
+    directory = base / f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+    profiler = Profiler(cpu="cpu" in modes, mem="mem" in modes, directory=directory)
+    atexit.register(_write_at_exit, profiler)
+    logger.info("Perfilamento ativo (%s); resultados em %s", ",".join(sorted(modes)), directory)
+    return profiler
+
+
+def _write_at_exit(profiler: Profiler) -> None:
+    try:
+        path = profiler.write()
+    except Exception as exc:  # noqa: BLE001 - never break the shutdown
+        logger.error("Falha ao gravar o perfilamento: %s", exc)
+        return
+    if path is not None:
+        logger.info("Perfilamento salvo em %s", path)
+
+
+PROFILER = build_profiler()
+
+
+def profile_section(name: str) -> ContextManager[None]:
+    """Profile the ``with`` block as ``name`` when ``PROFILE`` is set."""
+    if PROFILER is None:
+        return nullcontext()
+    return PROFILER.section(name)
+
+
+def profiled(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator form of ``profile_section``; a no-op when ``PROFILE`` is unset."""
+
+    def decorator(function: F) -> F:
+        if PROFILER is None:
+            return function
+        section_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args: object, **kwargs: object) -> object:
+            with PROFILER.section(section_name):
+                return function(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+__all__ = ["PROFILER", "Profiler", "build_profiler", "profile_section", "profiled"]
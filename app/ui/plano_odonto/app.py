@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import threading
 import tkinter as tk
 from pathlib import Path
 from datetime import datetime
@@ -19,6 +20,7 @@ from app.domain.beneficios_planos import (
     RegistroBeneficioDependente,
 )
 from app.logging import logger
+from app.profiling import profiled
 
 
 class OdontoApp(ttk.Frame):
@@ -34,6 +36,13 @@ class OdontoApp(ttk.Frame):
         self.planos_repo = PlanosRepository()
         self.generator = OdontoTxtGenerator()
 
+        # Plans load in the background while the dependents query runs.
+        threading.Thread(
+            target=self.planos_repo.carregar_cache,
+            name="planos-cache",
+            daemon=True,
+        ).start()
+
         self._colaboradores = self.dep_repo.listar_colaboradores()
         self._planos: list[PlanoOdonto] = []
         self._flag_options = ["Ativa", "Inativa"]
@@ -262,6 +271,7 @@ class OdontoApp(ttk.Frame):
             180, lambda: self._apply_colaborador_filtro(termo, reset_selection=False)
         )
 
+    @profiled()
     def _apply_colaborador_filtro(self, termo: str, reset_selection: bool = True) -> None:
         self._colaborador_filter_id = None
         texto_atual = self.combo_colaborador.get()
@@ -283,6 +293,7 @@ class OdontoApp(ttk.Frame):
         self._colaborador_atual = None
         self._update_plano_state()
 
+    @profiled()
     def _on_colaborador_selected(self, event=None) -> None:
         idx = self.combo_colaborador.current()
         if idx < 0:
@@ -306,6 +317,7 @@ class OdontoApp(ttk.Frame):
         self._colaborador_atual = colaborador
         self._update_plano_state()
 
+    @profiled()
     def _on_dependente_selected(self, event=None) -> None:
         idx = self.combo_dependente.current()
         if idx < 0 or idx >= len(self._dependentes_atuais):
@@ -347,6 +359,7 @@ class OdontoApp(ttk.Frame):
                 self.entry_data_saude.insert(0, data_saude)
         self._update_plano_state()
 
+    @profiled()
     def _on_adicionar(self) -> None:
         if self._colaborador_atual is None:
             messagebox.showwarning("Selecao incompleta", "Escolha um colaborador primeiro.")
@@ -449,6 +462,7 @@ class OdontoApp(ttk.Frame):
             self.tree.delete(item)
             self._registros.pop(index)
 
+    @profiled()
     def _on_exportar(self) -> None:
         if not self._registros:
             messagebox.showinfo("Nada a exportar", "Adicione pelo menos uma linha.")
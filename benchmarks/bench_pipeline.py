@@ -0,0 +1,249 @@
+"""Throughput and peak memory of each stage of the RM parsing stack.
+
+Usage::
+
+    python -m benchmarks.bench_pipeline [--sizes 1000 10000 100000 1000000]
+        [--columns 9] [--entity-density 0.05] [--encoded-names 1]
+        [--control-density 0.001] [--repeat 3] [--output results.json]
+        [--compare baseline.json] [--threshold 0.10]
+
+Each stage is timed best-of-``repeat`` and then run once more under
+``tracemalloc`` for its peak Python allocation (memory allocated inside C
+libraries such as lxml is not traced). Results are written as JSON;
+``--compare`` prints the ratio against an earlier file and exits with status
+1 when any stage got slower than ``--threshold``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import pandas as pd
+
+from app.domain.beneficios_planos.generator import OdontoTxtGenerator
+from app.domain.beneficios_planos.models import RegistroBeneficioDependente
+from app.infra.soap.exporters import CSVExporter
+from app.infra.soap.parser import (
+    DatasetDataFrameBuilder,
+    DatasetNormalizer,
+    SoapResponseParser,
+    StreamingDatasetReader,
+)
+from benchmarks.payloads import PayloadSpec, build_envelope, iter_envelope_chunks
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+@dataclass
+class StageResult:
+    stage: str
+    rows: int
+    input_mb: float
+    seconds: float
+    rows_per_second: float
+    mb_per_second: float
+    peak_mb: float
+
+
+def measure(
+    stage: str,
+    function: Callable[[], Any],
+    *,
+    rows: int,
+    input_mb: float,
+    repeat: int,
+) -> StageResult:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return StageResult(
+        stage=stage,
+        rows=rows,
+        input_mb=round(input_mb, 3),
+        seconds=round(best, 4),
+        rows_per_second=round(rows / best, 1) if best else 0.0,
+        mb_per_second=round(input_mb / best, 2) if best else 0.0,
+        peak_mb=round(peak / 1_000_000, 2),
+    )
+
+
+def _size_mb(text: str) -> float:
+    return len(text.encode("utf-8")) / 1_000_000
+
+
+def _registros(dataframe: pd.DataFrame) -> list[RegistroBeneficioDependente]:
+    frame = dataframe.fillna("")
+    return [
+        RegistroBeneficioDependente(
+            cod_coligada=str(row.CODCOLIGADA),
+            chapa=str(row.CHAPA),
+            nro_depend=str(getattr(row, "NRODEPEND", "")),
+            cod_plano=str(getattr(row, "PLANO_ODONTO", "")),
+        )
+        for row in frame.itertuples(index=False)
+    ]
+
+
+def run_size(spec: PayloadSpec, repeat: int, workdir: Path) -> list[StageResult]:
+    """Run every stage for one payload size."""
+    soap_parser = SoapResponseParser()
+    normalizer = DatasetNormalizer()
+    builder = DatasetDataFrameBuilder()
+    exporter = CSVExporter(workdir)
+    generator = OdontoTxtGenerator()
+    rows = spec.rows
+
+    envelope = build_envelope(spec)
+    dataset_xml = soap_parser.extract_result_xml(envelope)
+    dataset_root = normalizer.parse(dataset_xml)
+    dataframe = builder.to_dataframe(dataset_root)
+    registros = _registros(dataframe)
+
+    stages: list[tuple[str, Callable[[], Any], float]] = [
+        ("envelope", lambda: soap_parser.extract_result_xml(envelope), _size_mb(envelope)),
+        ("dataset_parse", lambda: normalizer.parse(dataset_xml), _size_mb(dataset_xml)),
+        ("dataframe", lambda: builder.to_dataframe(dataset_root), _size_mb(dataset_xml)),
+        (
+            "streaming",
+            lambda: sum(
+                len(frame)
+                for frame in StreamingDatasetReader(soap_parser, builder).iter_dataframes(
+                    iter_envelope_chunks(envelope)
+                )
+            ),
+            _size_mb(envelope),
+        ),
+        ("csv_export", lambda: exporter.export(dataframe, "bench"), 0.0),
+        ("txt_export", lambda: generator.export(registros, workdir / "bench.txt"), 0.0),
+    ]
+
+    results = []
+    for stage, function, input_mb in stages:
+        result = measure(stage, function, rows=rows, input_mb=input_mb, repeat=repeat)
+        results.append(result)
+        print(
+            f"{stage:<14} {rows:>9} {result.seconds:>9.3f}s {result.rows_per_second:>12.0f} "
+            f"{result.mb_per_second:>9.1f} {result.peak_mb:>10.1f}"
+        )
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict[str, Any]:
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "xml_backend": SoapResponseParser().backend.name,
+    }
+
+
+def compare(current: list[dict[str, Any]], baseline_path: Path, threshold: float) -> bool:
+    """Print current/baseline time ratios; return ``True`` when a stage regressed."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    previous = {(item["stage"], item["rows"]): item for item in baseline["results"]}
+    regressed = False
+    print(f"\nComparação com {baseline_path} ({baseline['environment'].get('git_revision')})")
+    print(f"{'etapa':<14} {'linhas':>9} {'antes':>9} {'agora':>9} {'razão':>7}")
+    for item in current:
+        old = previous.get((item["stage"], item["rows"]))
+        if old is None or not old["seconds"]:
+            continue
+        ratio = item["seconds"] / old["seconds"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- regressão"
+            regressed = True
+        print(
+            f"{item['stage']:<14} {item['rows']:>9} {old['seconds']:>8.3f}s "
+            f"{item['seconds']:>8.3f}s {ratio:>6.2f}x{flag}"
+        )
+    return regressed
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    arg_parser.add_argument("--columns", type=int, default=9)
+    arg_parser.add_argument("--entity-density", type=float, default=0.05)
+    arg_parser.add_argument("--encoded-names", type=int, default=1)
+    arg_parser.add_argument("--control-density", type=float, default=0.001)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--output", type=Path)
+    arg_parser.add_argument("--compare", type=Path)
+    arg_parser.add_argument("--threshold", type=float, default=0.10)
+    args = arg_parser.parse_args()
+
+    specs = [
+        PayloadSpec(
+            rows=rows,
+            columns=args.columns,
+            entity_density=args.entity_density,
+            encoded_names=args.encoded_names,
+            control_density=args.control_density,
+        )
+        for rows in args.sizes
+    ]
+
+    print(
+        f"{'etapa':<14} {'linhas':>9} {'tempo':>10} {'linhas/s':>12} "
+        f"{'MB/s':>9} {'pico MB':>10}"
+    )
+    results: list[StageResult] = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for spec in specs:
+            results.extend(run_size(spec, args.repeat, Path(workdir)))
+
+    report = {
+        "environment": environment(),
+        "payload": {key: value for key, value in specs[0].as_dict().items() if key != "rows"},
+        "results": [asdict(result) for result in results],
+    }
+    output = args.output or RESULTS_DIR / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nResultados salvos em {output}")
+
+    if args.compare and compare(report["results"], args.compare, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
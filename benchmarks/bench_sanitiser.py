@@ -0,0 +1,51 @@
+"""Compare the single-pass sanitiser with the sequential replace chain.
+
+Inputs come from ``benchmarks.payloads`` at several entity densities.
+
+Usage: ``python -m benchmarks.bench_sanitiser [--rows 100000] [--repeat 3]``
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+from app.infra.soap.parser import SoapResponseParser
+from benchmarks.payloads import PayloadSpec, build_dataset
+
+
+def throughput(function: Callable[[str], str], text: str, repeat: int) -> float:
+    """Best-of-``repeat`` throughput in MB/s."""
+    size_mb = len(text.encode("utf-8")) / 1_000_000
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(text)
+        best = min(best, time.perf_counter() - started)
+    return size_mb / best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--rows", type=int, default=100_000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    parser = SoapResponseParser()
+    print(f"{'densidade':>10} {'MB':>7} {'cadeia MB/s':>12} {'single MB/s':>12} {'ganho':>7}")
+    for density in (0.0, 0.01, 0.1, 0.5):
+        text = build_dataset(PayloadSpec(rows=args.rows, entity_density=density))
+        if parser.sanitise(text) != parser._sanitise_chain(text):
+            raise SystemExit(f"Saídas divergentes para densidade {density}")
+        chain = throughput(parser._sanitise_chain, text, args.repeat)
+        single = throughput(parser.sanitise, text, args.repeat)
+        size_mb = len(text.encode("utf-8")) / 1_000_000
+        print(
+            f"{density:>10.2f} {size_mb:>7.1f} {chain:>12.1f} {single:>12.1f} "
+            f"{single / chain:>6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""Local stand-in for the RM ``RealizarConsultaSQL`` endpoint.
+
+Usage::
+
+    python -m benchmarks.fake_rm [--port 8765] [--rows 10000]
+        [--latency lognormal:0.2:0.5] [--fault-rate 0.01] [--busy-rate 0.0]
+        [--truncate-rate 0.0] [--no-gzip] [--chunked]
+        [--sentence INFO.DEPENDENTES=50000]
+
+Point ``SOAP_ACTION_ENDPOINT`` at the printed URL (any user and password are
+accepted). Each ``codSentenca`` serves a synthetic dataset from
+``benchmarks.payloads``; a ``ROWS`` parameter in the request overrides the row
+count. Responses honour ``Accept-Encoding: gzip`` and can be sent with chunked
+transfer encoding. Faults come back as HTTP 500 with a SOAP Fault, ``busy``
+answers HTTP 503 (retried by the client) and truncated responses close the
+connection halfway through the body.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Mapping, Optional
+from xml.sax.saxutils import escape, unescape
+
+from benchmarks.payloads import PayloadSpec, build_envelope
+
+FAULT_TEMPLATE = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">'
+    "<s:Body><s:Fault>"
+    "<faultcode>s:Server</faultcode>"
+    "<faultstring>{message}</faultstring>"
+    "</s:Fault></s:Body></s:Envelope>"
+)
+SENTENCE_PATTERN = re.compile(r"<(?:\w+:)?codSentenca>(.*?)</(?:\w+:)?codSentenca>", re.S)
+PARAMETERS_PATTERN = re.compile(r"<(?:\w+:)?parameters>(.*?)</(?:\w+:)?parameters>", re.S)
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """Server-side delay in seconds: ``fixed``, ``uniform``, ``exponential`` or ``lognormal``.
+
+    ``mean`` is the average delay; ``spread`` is the half-width for
+    ``uniform`` and the sigma of the underlying normal for ``lognormal``.
+    """
+
+    kind: str = "fixed"
+    mean: float = 0.0
+    spread: float = 0.0
+
+    @classmethod
+    def parse(cls, value: str) -> "LatencyModel":
+        """Build from ``kind:mean[:spread]``, e.g. ``lognormal:0.2:0.5``."""
+        kind, _, rest = value.partition(":")
+        numbers = [float(item) for item in rest.split(":") if item]
+        if kind not in ("fixed", "uniform", "exponential", "lognormal"):
+            raise ValueError(f"Distribuição de latência desconhecida: {kind}")
+        return cls(kind, *numbers[:2])
+
+    def sample(self, rng: random.Random) -> float:
+        if self.mean <= 0:
+            return 0.0
+        if self.kind == "uniform":
+            return max(0.0, rng.uniform(self.mean - self.spread, self.mean + self.spread))
+        if self.kind == "exponential":
+            return rng.expovariate(1 / self.mean)
+        if self.kind == "lognormal":
+            # Keep the requested mean: E[X] = exp(mu + sigma² / 2).
+            mu = math.log(self.mean) - self.spread**2 / 2
+            return rng.lognormvariate(mu, self.spread)
+        return self.mean
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """How the server answers one sentence."""
+
+    payload: PayloadSpec = field(default_factory=PayloadSpec)
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    fault_rate: float = 0.0
+    busy_rate: float = 0.0
+    truncate_rate: float = 0.0
+
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    faults: int = 0
+    busy: int = 0
+    truncated: int = 0
+    bytes_sent: int = 0
+
+
+class FakeRMServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering ``RealizarConsultaSQL`` envelopes.
+
+    ``scenarios`` maps sentence codes to a ``Scenario``; other sentences use
+    ``default``. Generated envelopes are cached per sentence and row count,
+    so after the first request the cost seen by clients is transfer only.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        default: Optional[Scenario] = None,
+        scenarios: Optional[Mapping[str, Scenario]] = None,
+        gzip_responses: bool = True,
+        chunked: bool = False,
+        chunk_size: int = 64 * 1024,
+        seed: int = 7,
+    ) -> None:
+        super().__init__((host, port), _Handler)
+        self.default = default or Scenario()
+        self.scenarios = dict(scenarios or {})
+        self.gzip_responses = gzip_responses
+        self.chunked = chunked
+        self.chunk_size = chunk_size
+        self.stats = ServerStats()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies: dict[tuple[str, int, bool], bytes] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/wsConsultaSQL/IwsConsultaSQL"
+
+    def start(self) -> "FakeRMServer":
+        """Serve from a daemon thread; returns ``self`` for chaining."""
+        self._thread = threading.Thread(
+            target=self.serve_forever,
+            name="fake-rm",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "FakeRMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def scenario_for(self, cod_sentenca: str) -> Scenario:
+        return self.scenarios.get(cod_sentenca, self.default)
+
+    def decide(self, scenario: Scenario) -> tuple[float, str]:
+        """Draw the delay and the outcome (``ok``, ``fault``, ``busy``, ``truncated``)."""
+        with self._lock:
+            self.stats.requests += 1
+            delay = scenario.latency.sample(self._rng)
+            draw = self._rng.random()
+            outcome = "ok"
+            for name, rate in (
+                ("fault", scenario.fault_rate),
+                ("busy", scenario.busy_rate),
+                ("truncated", scenario.truncate_rate),
+            ):
+                if draw < rate:
+                    outcome = name
+                    break
+                draw -= rate
+            if outcome == "fault":
+                self.stats.faults += 1
+            elif outcome == "busy":
+                self.stats.busy += 1
+            elif outcome == "truncated":
+                self.stats.truncated += 1
+        return delay, outcome
+
+    def body_for(self, cod_sentenca: str, payload: PayloadSpec, compressed: bool) -> bytes:
+        key = (cod_sentenca, payload.rows, compressed)
+        with self._lock:
+            body = self._bodies.get(key)
+        if body is None:
+            body = build_envelope(payload).encode("utf-8")
+            if compressed:
+                body = gzip.compress(body, compresslevel=6)
+            with self._lock:
+                body = self._bodies.setdefault(key, body)
+        return body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeRMServer
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        request = self._read_request()
+        match = SENTENCE_PATTERN.search(request)
+        if match is None:
+            self._send(400, b"codSentenca ausente", close=True)
+            return
+
+        cod_sentenca = unescape(match.group(1).strip())
+        scenario = self.server.scenario_for(cod_sentenca)
+        payload = scenario.payload
+        rows = _parameters(request).get("ROWS")
+        if rows and rows.isdigit():
+            payload = replace(payload, rows=int(rows))
+
+        delay, outcome = self.server.decide(scenario)
+        if delay:
+            time.sleep(delay)
+
+        if outcome == "busy":
+            self._send(503, b"Servidor ocupado")
+            return
+        if outcome == "fault":
+            message = escape(f"Falha simulada ao executar a sentença {cod_sentenca}.")
+            self._send(500, FAULT_TEMPLATE.format(message=message).encode("utf-8"))
+            return
+
+        compressed = self.server.gzip_responses and "gzip" in self.headers.get(
+            "Accept-Encoding", ""
+        )
+        body = self.server.body_for(cod_sentenca, payload, compressed)
+        self._send(
+            200,
+            body,
+            content_encoding="gzip" if compressed else None,
+            truncate=outcome == "truncated",
+        )
+
+    def _read_request(self) -> str:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        encoding = self.headers.get("Content-Encoding", "").lower()
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+        return body.decode("utf-8", errors="replace")
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        *,
+        content_encoding: Optional[str] = None,
+        truncate: bool = False,
+        close: bool = False,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        if content_encoding:
+            self.send_header("Content-Encoding", content_encoding)
+        if self.server.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+        if close or truncate:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+
+        data = body[: len(body) // 2] if truncate else body
+        try:
+            if self.server.chunked:
+                size = self.server.chunk_size
+                for start in range(0, len(data), size):
+                    piece = data[start : start + size]
+                    self.wfile.write(f"{len(piece):X}\r\n".encode("ascii") + piece + b"\r\n")
+                if not truncate:
+                    self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            return
+        with self.server._lock:
+            self.server.stats.bytes_sent += len(data)
+
+
+def _parameters(request: str) -> dict[str, str]:
+    match = PARAMETERS_PATTERN.search(request)
+    if match is None:
+        return {}
+    pairs = (item.split("=", 1) for item in unescape(match.group(1)).split(";") if "=" in item)
+    return {key.strip().upper(): value.strip() for key, value in pairs}
+
+
+def _parse_sentences(items: list[str], default: Scenario) -> dict[str, Scenario]:
+    scenarios = {}
+    for item in items:
+        name, _, rows = item.partition("=")
+        scenarios[name] = replace(default, payload=replace(default.payload, rows=int(rows)))
+    return scenarios
+
+
+def add_server_arguments(arg_parser: argparse.ArgumentParser) -> None:
+    """Options shared by this module and ``benchmarks.load_test``."""
+    arg_parser.add_argument("--rows", type=int, default=10_000)
+    arg_parser.add_argument("--columns", type=int, default=9)
+    arg_parser.add_argument("--latency", type=LatencyModel.parse, default=LatencyModel())
+    arg_parser.add_argument("--fault-rate", type=float, default=0.0)
+    arg_parser.add_argument("--busy-rate", type=float, default=0.0)
+    arg_parser.add_argument("--truncate-rate", type=float, default=0.0)
+    arg_parser.add_argument("--no-gzip", action="store_true")
+    arg_parser.add_argument("--chunked", action="store_true")
+    arg_parser.add_argument(
+        "--sentence",
+        action="append",
+        default=[],
+        metavar="NOME=LINHAS",
+        help="Número de linhas de uma sentença específica (pode repetir).",
+    )
+
+
+def server_from_args(args: argparse.Namespace, *, port: int = 0) -> FakeRMServer:
+    default = Scenario(
+        payload=PayloadSpec(rows=args.rows, columns=args.columns),
+        latency=args.latency,
+        fault_rate=args.fault_rate,
+        busy_rate=args.busy_rate,
+        truncate_rate=args.truncate_rate,
+    )
+    return FakeRMServer(
+        port=port,
+        default=default,
+        scenarios=_parse_sentences(args.sentence, default),
+        gzip_responses=not args.no_gzip,
+        chunked=args.chunked,
+    )
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    arg_parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    server = server_from_args(args, port=args.port)
+    print(f"RM simulado em {server.endpoint} (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stats = server.stats
+        print(
+            f"{stats.requests} requisições, {stats.faults} faults, {stats.busy} ocupado, "
+            f"{stats.truncated} truncadas, {stats.bytes_sent / 1_000_000:.1f} MB enviados."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""End-to-end load test of the RM client stack against the fake RM server.
+
+Usage::
+
+    python -m benchmarks.load_test [--mode service|gateway|pipeline|stream]
+        [--requests 200] [--concurrency 8] [--endpoint URL]
+        [--rows 10000] [--latency lognormal:0.2:0.5] [--fault-rate 0.01]
+        [--truncate-rate 0.0] [--chunked] [--output result.json]
+        [--metrics stages.prom]
+
+Without ``--endpoint`` a ``benchmarks.fake_rm`` server is started in-process
+with the given options. Each mode drives a different layer:
+
+* ``service``: ``RMQueryService.execute`` (download and decompression only);
+* ``gateway``: ``RMQueryGateway.fetch_dataframe``;
+* ``pipeline``: ``RMQueryService.execute`` + ``RMQueryETLPipeline.run``
+  exporting CSVs to a temporary directory;
+* ``stream``: ``RMQueryGateway.iter_dataframes``.
+
+The response cache is disabled and every request carries a distinct
+parameter, so neither the cache nor single-flight hide server calls. Retry,
+hedging and limiter settings come from the environment as in production.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import logging
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.infra.gateways.rm_query import RMQueryGateway
+from app.infra.soap.client import RMQueryService, build_rm_service
+from app.infra.soap.exporters import CSVExporter
+from app.infra.soap.metrics import METRICS
+from app.infra.soap.pipeline import RMQueryETLPipeline, build_pipeline
+from app.infra.soap.transport import TransportConfig
+from benchmarks.fake_rm import FakeRMServer, add_server_arguments, server_from_args
+
+MODES = ("service", "gateway", "pipeline", "stream")
+
+
+@dataclass
+class Sample:
+    seconds: float
+    outcome: str
+    rows: int = 0
+    bytes_received: int = 0
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class LoadTest:
+    """Fire ``requests`` calls through one layer with ``concurrency`` threads."""
+
+    def __init__(
+        self,
+        service: RMQueryService,
+        *,
+        mode: str,
+        sentence: str,
+        workdir: Path,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Modo desconhecido: {mode}")
+        self.service = service
+        self.mode = mode
+        self.sentence = sentence
+        self.gateway = RMQueryGateway(rm_service=service)
+        self.pipeline: RMQueryETLPipeline = dataclasses.replace(
+            build_pipeline(),
+            exporter=CSVExporter(workdir),
+        )
+
+    def run(self, requests: int, concurrency: int) -> tuple[list[Sample], float]:
+        call = self._call_for_mode()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=max(1, concurrency),
+            thread_name_prefix="load-test",
+        ) as executor:
+            samples = list(executor.map(lambda index: self._timed(call, index), range(requests)))
+        return samples, time.perf_counter() - started
+
+    def _timed(self, call: Callable[[int], tuple[int, str]], index: int) -> Sample:
+        self.service.client.last_stats = None
+        started = time.perf_counter()
+        try:
+            rows, outcome = call(index)
+        except Exception as exc:  # noqa: BLE001 - counted in the report
+            rows, outcome = 0, f"erro:{type(exc).__name__}"
+        elapsed = time.perf_counter() - started
+        stats = self.service.client.last_stats
+        return Sample(elapsed, outcome, rows, stats.bytes_received if stats else 0)
+
+    def _call_for_mode(self) -> Callable[[int], tuple[int, str]]:
+        return {
+            "service": self._service,
+            "gateway": self._gateway,
+            "pipeline": self._pipeline,
+            "stream": self._stream,
+        }[self.mode]
+
+    def _parameters(self, index: int) -> dict[str, int]:
+        return {"REQUISICAO": index}
+
+    def _service(self, index: int) -> tuple[int, str]:
+        payload = self.service.execute(self.sentence, parameters=self._parameters(index))
+        if not payload:
+            return 0, "vazio"
+        return 0, "fault" if "Fault" in payload[:2048] else "ok"
+
+    def _gateway(self, index: int) -> tuple[int, str]:
+        dataframe = self.gateway.fetch_dataframe(
+            self.sentence,
+            parameters=self._parameters(index),
+        )
+        return len(dataframe), "ok" if len(dataframe) else "vazio"
+
+    def _pipeline(self, index: int) -> tuple[int, str]:
+        payload = self.service.execute(self.sentence, parameters=self._parameters(index))
+        result = self.pipeline.run(payload, f"{self.sentence}.{index}")
+        if result is None:
+            return 0, "vazio"
+        return len(result[0]), "ok"
+
+    def _stream(self, index: int) -> tuple[int, str]:
+        rows = sum(
+            len(dataframe)
+            for dataframe in self.gateway.iter_dataframes(
+                self.sentence,
+                parameters=self._parameters(index),
+            )
+        )
+        return rows, "ok" if rows else "vazio"
+
+
+def summarise(samples: list[Sample], elapsed: float) -> dict[str, object]:
+    latencies = sorted(sample.seconds for sample in samples)
+    ok = [sample for sample in samples if sample.outcome == "ok"]
+    rows = sum(sample.rows for sample in samples)
+    received = sum(sample.bytes_received for sample in samples)
+    return {
+        "requests": len(samples),
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "ok": len(ok),
+        "outcomes": dict(Counter(sample.outcome for sample in samples)),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed else 0.0,
+        "mb_received": round(received / 1_000_000, 2),
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 0.50), 4),
+            "p90": round(percentile(latencies, 0.90), 4),
+            "p99": round(percentile(latencies, 0.99), 4),
+            "max": round(latencies[-1], 4) if latencies else 0.0,
+        },
+    }
+
+
+def format_report(report: dict[str, object]) -> str:
+    latency = report["latency_seconds"]
+    outcomes = ", ".join(f"{name}={count}" for name, count in report["outcomes"].items())
+    return "\n".join(
+        [
+            f"Requisições:  {report['requests']} em {report['elapsed_seconds']:.2f}s "
+            f"({report['requests_per_second']:.1f} req/s)",
+            f"Resultados:   {outcomes}",
+            f"Linhas/s:     {report['rows_per_second']:.0f}",
+            f"MB recebidos: {report['mb_received']:.1f}",
+            f"Latência:     p50={latency['p50']:.3f}s p90={latency['p90']:.3f}s "
+            f"p99={latency['p99']:.3f}s max={latency['max']:.3f}s",
+        ]
+    )
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    arg_parser.add_argument("--mode", choices=MODES, default="gateway")
+    arg_parser.add_argument("--requests", type=int, default=200)
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("--endpoint", help="Usa um servidor já em execução.")
+    arg_parser.add_argument("--query", default="BENCH.CONSULTA", help="codSentenca enviado.")
+    arg_parser.add_argument("--output", type=Path)
+    arg_parser.add_argument(
+        "--metrics",
+        type=Path,
+        help="Grava as métricas por etapa (.json ou .prom) coletadas durante o teste.",
+    )
+    arg_parser.add_argument(
+        "--log-level",
+        default="CRITICAL",
+        help="Nível de log do cliente RM durante o teste (padrão: silencioso).",
+    )
+    add_server_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    logging.getLogger("rm_api").setLevel(args.log_level.upper())
+    if args.metrics:
+        METRICS.enabled = True
+
+    server: Optional[FakeRMServer] = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        server = server_from_args(args).start()
+        endpoint = server.endpoint
+
+    transport = TransportConfig.from_env()
+    transport = dataclasses.replace(
+        transport,
+        pool_maxsize=max(transport.pool_maxsize, args.concurrency),
+    )
+    service = build_rm_service(transport, endpoint=endpoint, user="bench", password="bench")
+    service.cache = None  # measure the server round trip, not the response cache
+
+    print(
+        f"Modo {args.mode}: {args.requests} requisições, concorrência {args.concurrency}, "
+        f"endpoint {endpoint}"
+    )
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            load_test = LoadTest(
+                service,
+                mode=args.mode,
+                sentence=args.query,
+                workdir=Path(workdir),
+            )
+            samples, elapsed = load_test.run(args.requests, args.concurrency)
+    finally:
+        service.close()
+        if server is not None:
+            server.stop()
+
+    report = summarise(samples, elapsed)
+    report["mode"] = args.mode
+    report["concurrency"] = args.concurrency
+    if server is not None:
+        report["server"] = dataclasses.asdict(server.stats)
+    print(format_report(report))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Resultados salvos em {args.output}")
+    if args.metrics:
+        print(f"Métricas por etapa salvas em {METRICS.write(args.metrics)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Synthetic ``RealizarConsultaSQL`` responses for the benchmarks.
+
+The dataset is escaped into the envelope the same way RM does it, so every
+stage of the parser (envelope decode, sanitise, dataset parse) sees realistic
+input: entities in the values, ``_xHHHH_`` encoded column names and control
+characters sent as numeric character references.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import asdict, dataclass
+from typing import Iterator
+from xml.sax.saxutils import escape
+
+ENVELOPE_HEAD = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">'
+    "<s:Body>"
+    '<RealizarConsultaSQLResponse xmlns="http://www.totvs.com/">'
+    "<RealizarConsultaSQLResult>"
+)
+ENVELOPE_TAIL = (
+    "</RealizarConsultaSQLResult>"
+    "</RealizarConsultaSQLResponse>"
+    "</s:Body>"
+    "</s:Envelope>"
+)
+
+# The first columns mimic INFO.DEPENDENTES; extra ones are generic text.
+BASE_COLUMNS = (
+    "CODCOLIGADA",
+    "CHAPA",
+    "NOME",
+    "NRODEPEND",
+    "DEPENDENTE",
+    "GRAUPARENTESCO",
+    "PLANO_ODONTO",
+    "FLAG_PLANO_SAUDE",
+    "DTINIASSISTMEDICA",
+)
+ENCODED_COLUMNS = ("NOME_x0020_SOCIAL", "DATA_x002F_HORA", "VALOR_x0025_")
+# As they appear in RM datasets: stray ampersands, quote entities and numeric
+# character references, all resolved by ``SoapResponseParser.sanitise``.
+ENTITY_SNIPPETS = (" & Cia", " Jo&#227;o", " &#xE9;", " &quot;X&quot;", " &apos;Y&apos;")
+CONTROL_SNIPPETS = ("&#x1;", "&#xB;", "&#x1F;")
+
+
+@dataclass(frozen=True)
+class PayloadSpec:
+    """Shape of a generated response."""
+
+    rows: int = 10_000
+    columns: int = 9
+    entity_density: float = 0.05
+    encoded_names: int = 1
+    control_density: float = 0.001
+    null_density: float = 0.05
+    seed: int = 7
+
+    def as_dict(self) -> dict[str, object]:
+        return asdict(self)
+
+    def column_names(self) -> list[str]:
+        names = list(BASE_COLUMNS[: self.columns])
+        names.extend(f"CAMPO_{index}" for index in range(len(names), self.columns))
+        for position in range(min(self.encoded_names, len(ENCODED_COLUMNS), len(names))):
+            names[-(position + 1)] = ENCODED_COLUMNS[position]
+        return names
+
+
+def _value(rng: random.Random, spec: PayloadSpec, column: str, row: int) -> str:
+    if column == "CODCOLIGADA":
+        value = str(row % 5 + 1)
+    elif column == "CHAPA":
+        value = f"{row // 3:06d}"
+    elif column == "NRODEPEND":
+        value = str(row % 3 + 1)
+    elif column in ("GRAUPARENTESCO", "FLAG_PLANO_SAUDE", "PLANO_ODONTO"):
+        value = str(rng.randint(0, 4))
+    elif column == "DTINIASSISTMEDICA":
+        value = f"20{rng.randint(10, 24)}-0{rng.randint(1, 9)}-01T00:00:00"
+    else:
+        value = f"{column.title()} {row} da Silva"
+
+    if rng.random() < spec.entity_density:
+        value += rng.choice(ENTITY_SNIPPETS)
+    if rng.random() < spec.control_density:
+        value += rng.choice(CONTROL_SNIPPETS)
+    return value
+
+
+def iter_dataset(spec: PayloadSpec) -> Iterator[str]:
+    """Yield the dataset XML in pieces, one row at a time."""
+    rng = random.Random(spec.seed)
+    names = spec.column_names()
+    yield "<NewDataSet>"
+    for row in range(spec.rows):
+        cells = ["<Resultado>"]
+        for name in names:
+            if name not in ("CODCOLIGADA", "CHAPA") and rng.random() < spec.null_density:
+                continue  # RM omits null columns
+            cells.append(f"<{name}>{_value(rng, spec, name, row)}</{name}>")
+        cells.append("</Resultado>")
+        yield "".join(cells)
+    yield "</NewDataSet>"
+
+
+def build_dataset(spec: PayloadSpec) -> str:
+    return "".join(iter_dataset(spec))
+
+
+def build_envelope(spec: PayloadSpec) -> str:
+    """Return the full SOAP response with the dataset escaped as text."""
+    return ENVELOPE_HEAD + escape(build_dataset(spec)) + ENVELOPE_TAIL
+
+
+def iter_envelope_chunks(envelope: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Split the envelope into network-sized chunks for the streaming reader."""
+    data = envelope.encode("utf-8")
+    for start in range(0, len(data), chunk_size):
+        yield data[start : start + chunk_size]
@@ -0,0 +1,97 @@
+"""Response cache classification, corruption handling and concurrent eviction."""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.infra.soap.cache import ResponseCache
+
+ENVELOPE = (
+    '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>'
+    '<RealizarConsultaSQLResponse xmlns="http://www.totvs.com/">'
+    "<RealizarConsultaSQLResult>{}</RealizarConsultaSQLResult>"
+    "</RealizarConsultaSQLResponse></s:Body></s:Envelope>"
+)
+FAULT = (
+    '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>'
+    "<s:Fault><faultcode>s:Client</faultcode><faultstring>Sentença inválida"
+    "</faultstring></s:Fault></s:Body></s:Envelope>"
+)
+OK = ENVELOPE.format(
+    "&lt;NewDataSet&gt;"
+    + "&lt;R&gt;&lt;A&gt;1&lt;/A&gt;&lt;/R&gt;" * 200
+    + "&lt;/NewDataSet&gt;"
+)
+
+
+@pytest.mark.parametrize(
+    ("payload", "status_code", "kind"),
+    [
+        (OK, 200, ResponseCache.KIND_OK),
+        (OK, None, ResponseCache.KIND_OK),
+        (OK[:-40], 200, None),
+        (OK, 502, None),
+        (FAULT, 500, ResponseCache.KIND_FAULT),
+        (None, 200, ResponseCache.KIND_EMPTY),
+        (None, 503, None),
+        ("<html>Bad gateway</html>", 502, None),
+    ],
+)
+def test_classify(tmp_path: Path, payload, status_code, kind) -> None:
+    cache = ResponseCache(tmp_path)
+    assert cache.classify(payload, status_code=status_code) == kind
+
+
+def test_round_trip_and_corrupt_meta(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path)
+    key = "ab" + "0" * 62
+    cache.put(key, OK, cod_sentenca="S", status_code=200)
+    assert cache.get(key).payload == OK
+
+    meta_path, _data_path = cache._paths(key)
+    meta_path.write_text('{"kind": "ok"}', encoding="utf-8")
+    assert cache.get(key) is None
+    assert not meta_path.exists()
+
+
+def test_concurrent_puts_stay_within_max_bytes(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path, max_bytes=16_000)
+    payloads = [OK, FAULT, None]
+    errors: list[BaseException] = []
+
+    def worker(number: int) -> None:
+        try:
+            for step in range(80):
+                key = f"{(number * 80 + step) % 200:064x}"
+                cache.put(key, payloads[step % 3], cod_sentenca="S")
+                cache.get(key)
+                if step % 10 == 0:
+                    cache.evict()
+        except BaseException as exc:  # noqa: BLE001 - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    on_disk = sum(path.stat().st_size for path in tmp_path.glob("*/*"))
+    assert errors == []
+    assert on_disk <= cache.max_bytes
+    assert cache._total == on_disk
+
+
+def test_reopened_cache_counts_existing_entries(tmp_path: Path) -> None:
+    first = ResponseCache(tmp_path)
+    for number in range(5):
+        first.put(f"{number:064x}", None, cod_sentenca="S")
+    on_disk = sum(path.stat().st_size for path in tmp_path.glob("*/*"))
+
+    second = ResponseCache(tmp_path, max_bytes=on_disk // 2)
+    second.evict()
+
+    assert sum(path.stat().st_size for path in tmp_path.glob("*/*")) <= on_disk // 2
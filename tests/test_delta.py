@@ -0,0 +1,66 @@
+"""DeltaTracker reports inserted, updated and deleted rows between extracts."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from app.infra.soap.delta import DeltaTracker
+
+
+def _frame(rows: list[tuple[str, str, str]]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["CHAPA", "NRODEPEND", "NOME"])
+
+
+def test_first_run_inserts_everything(tmp_path: Path) -> None:
+    tracker = DeltaTracker(tmp_path, default_key=["CHAPA", "NRODEPEND"])
+
+    result = tracker.diff("Q", _frame([("1", "1", "Ana"), ("1", "2", "Rafael")]))
+
+    assert result.first_run
+    assert len(result.inserted) == 2
+    assert result.updated.empty and result.deleted.empty
+    assert tracker.snapshot_path("Q").exists()
+
+
+def test_changes_against_previous_snapshot(tmp_path: Path) -> None:
+    tracker = DeltaTracker(tmp_path, keys={"Q": ["CHAPA", "NRODEPEND"]})
+    tracker.diff("Q", _frame([("1", "1", "Ana"), ("1", "2", "Rafael"), ("2", "1", "Paulo")]))
+
+    result = tracker.diff(
+        "Q",
+        _frame([("1", "1", "Ana"), ("1", "2", "Rafaela"), ("3", "1", "Luíza")]),
+    )
+
+    assert not result.first_run
+    assert result.inserted["NOME"].tolist() == ["Luíza"]
+    assert result.updated["NOME"].tolist() == ["Rafaela"]
+    assert result.deleted.to_dict("records") == [{"CHAPA": "2", "NRODEPEND": "1"}]
+    assert result.changed == 3
+
+
+def test_commit_false_keeps_the_baseline(tmp_path: Path) -> None:
+    tracker = DeltaTracker(tmp_path, default_key=["CHAPA", "NRODEPEND"])
+    tracker.diff("Q", _frame([("1", "1", "Ana")]))
+
+    tracker.diff("Q", _frame([("1", "1", "Ana Maria")]), commit=False)
+    result = tracker.diff("Q", _frame([("1", "1", "Ana Maria")]))
+
+    assert result.updated["NOME"].tolist() == ["Ana Maria"]
+
+
+def test_column_order_and_duplicated_keys(tmp_path: Path) -> None:
+    tracker = DeltaTracker(tmp_path, default_key=["CHAPA", "NRODEPEND"])
+    frame = _frame([("1", "1", "Ana"), ("1", "2", "Rafael")])
+    tracker.diff("Q", frame)
+
+    reordered = tracker.diff("Q", frame[["NOME", "NRODEPEND", "CHAPA"]])
+    assert reordered.changed == 0
+
+    duplicated = tracker.diff(
+        "Q",
+        _frame([("1", "1", "Ana"), ("1", "1", "Ana B"), ("1", "2", "Rafael")]),
+    )
+    assert duplicated.updated["NOME"].tolist() == ["Ana B"]
+    assert duplicated.inserted.empty and duplicated.deleted.empty
@@ -0,0 +1,83 @@
+"""File-backed limiter: shared bound, persisted state and acquisition deadline."""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.infra.soap.limiter import (
+    AdaptiveConcurrencyLimiter,
+    FileLimiterBackend,
+    LimiterConfig,
+    LimiterTimeout,
+)
+
+CONFIG = LimiterConfig(initial_limit=2.0, max_limit=2.0)
+
+
+def test_limit_is_shared_between_backends(tmp_path: Path) -> None:
+    # Two backends on one directory stand in for two processes.
+    limiters = [
+        AdaptiveConcurrencyLimiter(
+            CONFIG, FileLimiterBackend(tmp_path), poll_interval=0.005
+        )
+        for _ in range(2)
+    ]
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+    errors: list[BaseException] = []
+
+    def worker(limiter: AdaptiveConcurrencyLimiter) -> None:
+        nonlocal in_flight, peak
+        try:
+            for _ in range(15):
+                with limiter.acquire("RealizarConsultaSQL", latency_key="S"):
+                    with lock:
+                        in_flight += 1
+                        peak = max(peak, in_flight)
+                    time.sleep(0.002)
+                    with lock:
+                        in_flight -= 1
+        except BaseException as exc:  # noqa: BLE001 - reported below
+            errors.append(exc)
+
+    threads = [
+        threading.Thread(target=worker, args=(limiters[number % 2],))
+        for number in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert errors == []
+    assert peak <= 2
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_acquire_gives_up_at_the_deadline(tmp_path: Path) -> None:
+    limiter = AdaptiveConcurrencyLimiter(CONFIG, FileLimiterBackend(tmp_path))
+    with limiter.acquire("op"), limiter.acquire("op"):
+        started = time.monotonic()
+        with pytest.raises(LimiterTimeout):
+            with limiter.acquire("op", deadline=started + 0.2):
+                pass
+        assert 0.15 <= time.monotonic() - started < 2.0
+
+    with limiter.acquire("op", deadline=time.monotonic() + 0.2):
+        pass
+
+
+def test_outcomes_persist_across_backends(tmp_path: Path) -> None:
+    config = LimiterConfig(initial_limit=8.0, decrease_cooldown=0.0)
+    first = FileLimiterBackend(tmp_path)
+    token = first.try_acquire("op", config)
+    limit = first.release("op", token, config, latency=0.1, failed=True)
+
+    assert limit == 4.0
+    second = FileLimiterBackend(tmp_path)
+    assert second.release("op", "gone", config, latency=0.1, failed=True) == 2.0
@@ -0,0 +1,116 @@
+"""The single-pass sanitiser and the streaming reader match the reference paths."""
+
+from __future__ import annotations
+
+import random
+from xml.sax.saxutils import escape
+
+import pandas as pd
+import pytest
+
+from app.infra.soap.parser import (
+    DatasetDataFrameBuilder,
+    DatasetNormalizer,
+    SoapResponseParser,
+    StreamingDatasetReader,
+)
+
+SNIPPETS = [
+    " & Cia",
+    " Jo&#227;o",
+    " &#xE9;",
+    " &quot;X&quot;",
+    " &apos;Y&apos;",
+    "&lt;b&gt;",
+    "&amp;",
+    "&#38;lt;",
+    "&#x1;",
+    "&#xB;",
+    "&",
+    "&#",
+    "&nbsp;",
+]
+# What RM actually leaves in dataset values; the rest only exercise sanitise.
+DATASET_SNIPPETS = SNIPPETS[:5] + ["&amp;", "&#x1;", "&#xB;", "&"]
+COLUMNS = ["CODCOLIGADA", "CHAPA", "NOME", "NOME_x0020_SOCIAL", "DTINIASSISTMEDICA"]
+ENVELOPE_HEAD = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>'
+    '<RealizarConsultaSQLResponse xmlns="http://www.totvs.com/">'
+    "<RealizarConsultaSQLResult>"
+)
+ENVELOPE_TAIL = (
+    "</RealizarConsultaSQLResult></RealizarConsultaSQLResponse></s:Body></s:Envelope>"
+)
+
+
+def _dataset(
+    rows: int,
+    density: float,
+    seed: int = 5,
+    snippets: list[str] = SNIPPETS,
+) -> str:
+    rng = random.Random(seed)
+    parts = ["<NewDataSet>"]
+    for row in range(rows):
+        parts.append("<Resultado>")
+        for column in COLUMNS:
+            if column not in ("CODCOLIGADA", "CHAPA") and rng.random() < 0.1:
+                continue  # RM omits null columns
+            value = f"{column.title()} {row}"
+            while rng.random() < density:
+                value += rng.choice(snippets)
+            parts.append(f"<{column}>{value}</{column}>")
+        parts.append("</Resultado>")
+    parts.append("</NewDataSet>")
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("density", [0.0, 0.05, 0.5, 0.9])
+def test_sanitise_matches_reference_chain(density: float) -> None:
+    parser = SoapResponseParser()
+    text = _dataset(300, density)
+    assert parser.sanitise(text) == parser._sanitise_chain(text)
+
+
+@pytest.mark.parametrize(
+    "text", SNIPPETS + ["", "\x01", "&&&", "a&#x26;amp;b", "&#x0D;&#x0A;"]
+)
+def test_sanitise_matches_reference_chain_on_fragments(text: str) -> None:
+    parser = SoapResponseParser()
+    assert parser.sanitise(text) == parser._sanitise_chain(text)
+
+
+def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+@pytest.mark.parametrize(
+    ("chunk_size", "batch_size"), [(7, 3), (1024, 50), (1 << 20, 5000)]
+)
+def test_streaming_matches_in_memory(chunk_size: int, batch_size: int) -> None:
+    envelope = ENVELOPE_HEAD + escape(_dataset(400, 0.2, snippets=DATASET_SNIPPETS)) + ENVELOPE_TAIL
+    parser = SoapResponseParser()
+    builder = DatasetDataFrameBuilder()
+    expected = builder.to_dataframe(
+        DatasetNormalizer().parse(parser.extract_result_xml(envelope))
+    )
+
+    reader = StreamingDatasetReader(parser, DatasetDataFrameBuilder(), batch_size=batch_size)
+    frames = list(reader.iter_dataframes(_chunks(envelope.encode("utf-8"), chunk_size)))
+    streamed = pd.concat(frames, ignore_index=True)
+
+    assert all(len(frame) <= batch_size for frame in frames)
+    assert "NOME SOCIAL" in streamed.columns
+    pd.testing.assert_frame_equal(streamed[expected.columns], expected)
+
+
+def test_streaming_fault_yields_nothing() -> None:
+    fault = (
+        '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>'
+        "<s:Fault><faultcode>s:Client</faultcode><faultstring>Erro</faultstring>"
+        "</s:Fault></s:Body></s:Envelope>"
+    )
+    reader = StreamingDatasetReader()
+    assert list(reader.iter_dataframes([fault.encode("utf-8")])) == []
@@ -0,0 +1,87 @@
+"""Repositories load the dataset and build their indexes once under contention."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pandas as pd
+
+from app.domain.beneficios_planos.repositories import DependentesRepository
+
+COLUMNS = {
+    "cod_coligada": ["1", "1", "2"],
+    "chapa": ["001", "001", "002"],
+    "colaborador": ["Maria Silva", "Maria Silva", "João Costa"],
+    "nro_depend": [1, 2, 1],
+    "dependente": ["Ana", "Rafael", "Paulo"],
+    "grau_parentesco": ["F", "F", "C"],
+    "plano_odonto": ["P1", "0", "P2"],
+    "flag_plano_saude": ["1", "0", ""],
+    "data_inicio_plano_saude": pd.to_datetime(["2020-03-01", None, "2019-01-10"]),
+}
+
+
+class _SlowGateway:
+    def __init__(self) -> None:
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def fetch_dataframe(self, query_name: str) -> pd.DataFrame:
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.1)  # keep the other threads racing for the lock
+        return pd.DataFrame(COLUMNS)
+
+
+def _race(function, threads: int = 8) -> list[object]:
+    barrier = threading.Barrier(threads)
+    results: list[object] = []
+    lock = threading.Lock()
+
+    def run() -> None:
+        barrier.wait()
+        value = function()
+        with lock:
+            results.append(value)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(5)
+    return results
+
+
+def test_dataset_is_fetched_once() -> None:
+    gateway = _SlowGateway()
+    repository = DependentesRepository(gateway, query_name="TESTE")
+
+    frames = _race(repository._ensure_cache)
+
+    assert gateway.calls == 1
+    assert all(frame is frames[0] for frame in frames)
+
+
+def test_indexes_are_built_once() -> None:
+    gateway = _SlowGateway()
+    repository = DependentesRepository(gateway, query_name="TESTE")
+
+    indexes = _race(repository._ensure_index)
+    search_indexes = _race(repository._ensure_search_index)
+
+    assert gateway.calls == 1
+    assert all(index is indexes[0] for index in indexes)
+    assert all(index is search_indexes[0] for index in search_indexes)
+
+
+def test_dependentes_are_grouped_by_collaborator() -> None:
+    repository = DependentesRepository(_SlowGateway(), query_name="TESTE")
+
+    dependentes = repository.dependentes_do_colaborador("1", "001")
+
+    assert [dependente.nome for dependente in dependentes] == ["Ana", "Rafael"]
+    assert [dependente.plano_odonto for dependente in dependentes] == ["P1", None]
+    assert dependentes[0].data_inicio_plano_saude == "2020-03-01"
+    assert dependentes[1].data_inicio_plano_saude is None
+    assert [c.chapa for c in repository.buscar_por_nome("joao")] == ["002"]
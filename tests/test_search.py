@@ -0,0 +1,73 @@
+"""The name index must rank exactly like scoring every name."""
+
+from __future__ import annotations
+
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from app.domain.beneficios_planos.search import MIN_SCORE, NameSearchIndex, fold
+
+FIRST = ["Maria", "Mário", "Rafael", "Ana", "João", "José", "Luíza", "Paulo", "Rafaela"]
+LAST = ["Silva", "Castro", "Gomes", "Lima", "Souza", "Santos", "Oliveira", "Costa"]
+LINKS = ["", "", "da ", "de ", "dos "]
+
+
+def _names(count: int, seed: int = 11) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(
+            [rng.choice(FIRST)]
+            + [rng.choice(LINKS) + rng.choice(LAST) for _ in range(rng.randint(1, 3))]
+        )
+        for _ in range(count)
+    ]
+
+
+def _exhaustive(names: list[str], term: str, limit: int) -> list[tuple[float, int]]:
+    needle = fold(term.strip())
+    scored = []
+    for position, name in enumerate(names):
+        folded = fold(name)
+        score = 1.0 if needle in folded else SequenceMatcher(None, needle, folded).ratio()
+        if score >= MIN_SCORE:
+            scored.append((score, position))
+    scored.sort(key=lambda item: -item[0])
+    return scored[:limit]
+
+
+@pytest.fixture(scope="module")
+def names() -> list[str]:
+    return _names(20_000)
+
+
+@pytest.mark.parametrize(
+    "term",
+    [
+        "Mria Slva Cstro",
+        "Rafael Gomes dos Lima",
+        "jose  costa",
+        "Luiza Santos Oliveira da Costa",
+        "maria",
+        "Paulo Sousa",
+        "xyz",
+    ],
+)
+@pytest.mark.parametrize("limit", [1, 5, 25])
+def test_search_matches_exhaustive_scan(names: list[str], term: str, limit: int) -> None:
+    index = NameSearchIndex(list(range(len(names))), names)
+
+    assert index.search(term, limit) == [
+        position for _, position in _exhaustive(names, term, limit)
+    ]
+
+
+def test_search_handles_rare_characters() -> None:
+    names = [f"Nome {chr(0x4E00 + offset)} Silva" for offset in range(60)] + ["Zoë Ñandú"]
+    index = NameSearchIndex(list(range(len(names))), names)
+
+    for term in ("Zoe Nandu", "nome silvä", "一 Silva"):
+        assert index.search(term, 5) == [
+            position for _, position in _exhaustive(names, term, 5)
+        ]
@@ -0,0 +1,83 @@
+"""Concurrent identical calls share one execution, its result and its error."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from app.infra.gateways.rm_query import SingleFlight
+
+
+def _run_concurrently(flight: SingleFlight, function, followers: int = 8):
+    """Start a leader, wait until it is running, then pile followers on it."""
+    started = threading.Event()
+    release = threading.Event()
+    results: list[object] = []
+    lock = threading.Lock()
+
+    def leader_function():
+        started.set()
+        release.wait(5)
+        return function()
+
+    def call(target):
+        try:
+            value = flight.do("key", target)
+        except BaseException as exc:  # noqa: BLE001 - collected for the asserts
+            value = exc
+        with lock:
+            results.append(value)
+
+    threads = [threading.Thread(target=call, args=(leader_function,))]
+    threads[0].start()
+    assert started.wait(5)
+    threads += [
+        threading.Thread(target=call, args=(function,)) for _ in range(followers)
+    ]
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.2)  # followers only need to reach do() while the leader waits
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_calls_share_one_execution() -> None:
+    flight = SingleFlight()
+    calls = []
+    result = object()
+
+    def function():
+        calls.append(1)
+        return result
+
+    results = _run_concurrently(flight, function)
+
+    assert len(calls) == 1
+    assert len(results) == 9
+    assert all(value is result for value in results)
+    assert not flight._calls
+
+
+def test_error_reaches_every_waiter() -> None:
+    flight = SingleFlight()
+    error = RuntimeError("falhou")
+
+    def function():
+        raise error
+
+    results = _run_concurrently(flight, function)
+
+    assert len(results) == 9
+    assert all(value is error for value in results)
+    assert not flight._calls
+
+
+def test_key_is_released_after_the_call() -> None:
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("x")))
+    assert flight.do("key", lambda: 42) == 42